@@ -1,16 +1,26 @@
 import asyncio
 import logging
 
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram import Dispatcher
 
-from config.settings import BOT_TOKEN
+from config.settings import (
+    BOT_MODE, DB_NAME, DROP_PENDING_UPDATES, SHARD_COUNT, THROTTLE_MESSAGE_RATE, THROTTLE_MESSAGE_BURST,
+    THROTTLE_CALLBACK_RATE, THROTTLE_CALLBACK_BURST, THROTTLE_WARN, METRICS_HOST, METRICS_PORT,
+    FSM_CACHE_SIZE, FSM_TTL_SECONDS, FSM_FLUSH_INTERVAL, FSM_FLUSH_BATCH, UPDATE_CONCURRENCY, UPDATE_QUEUE_PER_USER
+)
 from database.models import init_db
-from config.settings import DB_NAME
-from services.scheduler import setup_scheduler
-from handlers import notifications, start
+from database.fsm import SQLiteStorage
+from database.repository import close_pool, flush_writes, pool
+from services.scheduler import setup_scheduler, shutdown_scheduler
+from services.webhook import require_webhook_secret, run_webhook
+from services.sharding import require_sharded_mode, run_sharded
+from handlers import admin, notifications, settings, start
+from middlewares.lanes import UserLanesMiddleware
 from middlewares.throttling import ThrottlingMiddleware
+from middlewares.metrics import HandlerTimingMiddleware
 from utils.cleanup import schedule_smart_cleanup
+from utils.metrics import registry, start_metrics_server
+from utils.telegram import create_bot
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,28 +28,77 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def main():
-    bot = Bot(token=BOT_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+def create_dispatcher() -> Dispatcher:
+    storage = SQLiteStorage(pool, FSM_CACHE_SIZE, FSM_TTL_SECONDS, FSM_FLUSH_INTERVAL, FSM_FLUSH_BATCH)
+    # FSM подключается вручную после очередей пользователей: состояние читается в порядке апдейтов
+    dp = Dispatcher(storage=storage, disable_fsm=True)
+    lanes = UserLanesMiddleware(UPDATE_CONCURRENCY, UPDATE_QUEUE_PER_USER)
+    dp.update.outer_middleware(lanes)
+    dp.update.outer_middleware(dp.fsm)
+    
+    registry.gauge("bot_update_lanes", "Пользователи, у которых обрабатывается или ждёт апдейт", lambda: lanes.lanes)
+    registry.gauge("bot_update_queue_depth", "Апдейты, ожидающие в очередях пользователей", lambda: lanes.queued)
+    registry.gauge("bot_updates_running", "Апдейты, обрабатываемые сейчас", lambda: lanes.running)
+    registry.counter("bot_updates_dropped_total", "Апдейты, отброшенные из-за переполнения очереди пользователя", lambda: lanes.dropped)
+    registry.gauge("bot_fsm_cached_keys", "Состояния FSM в памяти", lambda: storage.get_stats()['cached'])
+    registry.gauge("bot_fsm_dirty_keys", "Изменённые состояния FSM, ожидающие записи", lambda: storage.get_stats()['dirty'])
+    registry.counter(
+        "bot_fsm_events_total", "Попадания и промахи кэша состояний FSM и записанные изменения",
+        lambda: {'hit': storage.hits, 'miss': storage.misses, 'flushed': storage.flushed}, label="event"
+    )
     
-    dp.message.middleware(ThrottlingMiddleware(rate_limit=0.7))
+    warning = "⏳ Слишком много запросов, подождите немного." if THROTTLE_WARN else None
+    dp.message.middleware(ThrottlingMiddleware(THROTTLE_MESSAGE_RATE, THROTTLE_MESSAGE_BURST, warning))
+    dp.callback_query.middleware(ThrottlingMiddleware(THROTTLE_CALLBACK_RATE, THROTTLE_CALLBACK_BURST, warning))
+    
+    # После ограничителя: замеряется только сам обработчик
+    dp.message.middleware(HandlerTimingMiddleware())
+    dp.callback_query.middleware(HandlerTimingMiddleware())
     
     dp.include_router(start.router)
+    dp.include_router(settings.router)
+    dp.include_router(admin.router)
     dp.include_router(notifications.router)
     
-    init_db(DB_NAME)
+    return dp
+
+async def main():
+    if BOT_MODE in ("webhook", "sharded"):
+        require_webhook_secret()
+    require_sharded_mode(BOT_MODE, SHARD_COUNT)
+    init_db(DB_NAME, SHARD_COUNT)
+    
+    if BOT_MODE == "sharded":
+        # Планировщик и обработчики работают в процессах-воркерах
+        await run_sharded(create_dispatcher().resolve_used_update_types())
+        return
     
-    setup_scheduler()
+    bot = create_bot()
+    dp = create_dispatcher()
+    
+    await setup_scheduler(bot)
     
     asyncio.create_task(schedule_smart_cleanup())
+    if METRICS_PORT:
+        await start_metrics_server(METRICS_HOST, METRICS_PORT)
     
     logger.info("Бот запущен с поддержкой естественного языка")
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    try:
+        if BOT_MODE == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            await bot.delete_webhook(drop_pending_updates=DROP_PENDING_UPDATES)
+            # Сессию закрываем сами, после отправки очереди доставки
+            await dp.start_polling(bot, close_bot_session=False)
+    finally:
+        await shutdown_scheduler()
+        await dp.storage.close()
+        await bot.session.close()
+        await flush_writes()
+        close_pool()
 
 if __name__ == "__main__":
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        logger.info("Бот остановлен")
\ No newline at end of file
+        logger.info("Бот остановлен")
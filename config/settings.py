@@ -4,8 +4,110 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+# Адрес сервера Bot API: пусто - api.telegram.org; локальный Bot API или тестовый (python -m loadtest)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+# Общая HTTP-сессия Bot API на процесс: соединений в пуле, keep-alive и кэш DNS (сек), тайм-аут запроса (сек)
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", 100))
+TELEGRAM_KEEPALIVE_SECONDS = float(os.getenv("TELEGRAM_KEEPALIVE_SECONDS", 60))
+TELEGRAM_DNS_CACHE_SECONDS = int(os.getenv("TELEGRAM_DNS_CACHE_SECONDS", 3600))
+TELEGRAM_TIMEOUT_SECONDS = float(os.getenv("TELEGRAM_TIMEOUT_SECONDS", 30))
+# Telegram id администраторов через запятую: им доступны служебные команды (/admin_lag)
+ADMIN_IDS = {int(admin_id) for admin_id in os.getenv("ADMIN_IDS", "").split(",") if admin_id.strip()}
 
-DB_NAME = "notifications.db"
+# Приём апдейтов: polling или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# 0 - сохранить накопившиеся за время простоя апдейты
+DROP_PENDING_UPDATES = os.getenv("DROP_PENDING_UPDATES", "1") == "1"
+
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+# Обязателен в режимах webhook и sharded: Telegram передаёт его в заголовке каждого апдейта
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", 100))
+
+# Режим sharded: фронтовый процесс принимает вебхук и распределяет пользователей по SHARD_COUNT воркерам
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 1))
+SHARD_HEARTBEAT_SECONDS = int(os.getenv("SHARD_HEARTBEAT_SECONDS", 30))
+
+DB_NAME = os.getenv("DB_NAME", "notifications.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 4))
+# Групповая фиксация создания и удаления напоминаний: записи, накопившиеся, пока фиксировалась предыдущая пачка,
+# и пришедшие за DB_WRITE_BATCH_WINDOW секунд (не более DB_WRITE_BATCH_SIZE), фиксируются одной транзакцией
+DB_WRITE_BATCH_WINDOW = float(os.getenv("DB_WRITE_BATCH_WINDOW", 0))
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", 256))
+
+# Кэш активных напоминаний в памяти: общий лимит строк и лимит на пользователя (более активные читаются из базы)
+CACHE_MAX_ROWS = int(os.getenv("CACHE_MAX_ROWS", 100000))
+CACHE_MAX_ROWS_PER_USER = int(os.getenv("CACHE_MAX_ROWS_PER_USER", 200))
+
+# Эндпоинт метрик Prometheus (/metrics); 0 - отключён. Воркер шарда N слушает METRICS_PORT + N
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9100))
+
+# Ограничение частоты запросов: токенов в секунду и размер пачки для сообщений и нажатий кнопок
+THROTTLE_MESSAGE_RATE = float(os.getenv("THROTTLE_MESSAGE_RATE", 1.5))
+THROTTLE_MESSAGE_BURST = float(os.getenv("THROTTLE_MESSAGE_BURST", 3))
+THROTTLE_CALLBACK_RATE = float(os.getenv("THROTTLE_CALLBACK_RATE", 3))
+THROTTLE_CALLBACK_BURST = float(os.getenv("THROTTLE_CALLBACK_BURST", 5))
+# Однократный ответ "слишком часто" при превышении лимита (0 - молча отбрасывать)
+THROTTLE_WARN = os.getenv("THROTTLE_WARN", "1") == "1"
+# Апдейты одного пользователя обрабатываются по очереди, разных - параллельно, но не больше UPDATE_CONCURRENCY
+# одновременно; апдейты сверх UPDATE_QUEUE_PER_USER в очереди пользователя отбрасываются
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", 100))
+UPDATE_QUEUE_PER_USER = int(os.getenv("UPDATE_QUEUE_PER_USER", 50))
+
+# Часовой пояс пользователей, не указавших свой (/timezone); пусто - пояс сервера
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "")
+TIMEZONE_CACHE_SIZE = int(os.getenv("TIMEZONE_CACHE_SIZE", 100000))
+
+# Состояния FSM в SQLite: в памяти - не более FSM_CACHE_SIZE последних пользователей,
+# изменения записываются пачкой раз в FSM_FLUSH_INTERVAL секунд; состояние без изменений дольше FSM_TTL_SECONDS сбрасывается
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", 100000))
+FSM_TTL_SECONDS = int(os.getenv("FSM_TTL_SECONDS", 86400))
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", 1.0))
+FSM_FLUSH_BATCH = int(os.getenv("FSM_FLUSH_BATCH", 500))
+
+# Постраничный вывод /list: сообщение Telegram ограничено 4096 символами
+LIST_PAGE_SIZE = 10
+LIST_TEXT_LIMIT = 200
+
+# Пакетное создание из многострочного сообщения или файла .txt/.csv/.ics
+IMPORT_MAX_FILE_SIZE = int(os.getenv("IMPORT_MAX_FILE_SIZE", 2 * 1024 * 1024))
+IMPORT_MAX_LINES = int(os.getenv("IMPORT_MAX_LINES", 10000))
+# Сколько нераспознанных строк перечислить в ответе
+IMPORT_REPORT_LINES = 10
 
 CLEANUP_INTERVAL_DAYS = 1
-OLD_NOTIFICATION_DAYS = 7
\ No newline at end of file
+OLD_NOTIFICATION_DAYS = 7
+
+# Архивация пачками: размер пачки, пауза между пачками (сек) и страниц за шаг incremental_vacuum
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", 0.05))
+VACUUM_PAGES_PER_STEP = int(os.getenv("VACUUM_PAGES_PER_STEP", 1000))
+
+# Восстановление задач после перезапуска
+RESTORE_BATCH_SIZE = int(os.getenv("RESTORE_BATCH_SIZE", 1000))
+# deliver - отправить пропущенные за время простоя напоминания, skip - только залогировать
+MISFIRE_POLICY = os.getenv("MISFIRE_POLICY", "deliver")
+MISFIRE_GRACE_SECONDS = int(os.getenv("MISFIRE_GRACE_SECONDS", 3600))
+
+# Диспетчер напоминаний держит в памяти только окно ближайших DISPATCH_LOOKAHEAD_SECONDS
+DISPATCH_LOOKAHEAD_SECONDS = int(os.getenv("DISPATCH_LOOKAHEAD_SECONDS", 600))
+DISPATCH_TICK_SECONDS = float(os.getenv("DISPATCH_TICK_SECONDS", 1.0))
+# За сколько секунд до срока напоминания извлекаются из окна и готовятся к отправке
+DISPATCH_PRESTAGE_SECONDS = float(os.getenv("DISPATCH_PRESTAGE_SECONDS", 5.0))
+
+# Очередь доставки: лимиты Telegram - около 30 сообщений в секунду всего и 1 в секунду на чат
+DELIVERY_WORKERS = int(os.getenv("DELIVERY_WORKERS", 8))
+DELIVERY_QUEUE_SIZE = int(os.getenv("DELIVERY_QUEUE_SIZE", 10000))
+DELIVERY_GLOBAL_RATE = float(os.getenv("DELIVERY_GLOBAL_RATE", 30))
+DELIVERY_PER_CHAT_INTERVAL = float(os.getenv("DELIVERY_PER_CHAT_INTERVAL", 1.0))
+DELIVERY_MAX_ATTEMPTS = int(os.getenv("DELIVERY_MAX_ATTEMPTS", 5))
+# Сколько секунд при остановке ждать отправки уже принятых в очередь сообщений
+DELIVERY_DRAIN_SECONDS = float(os.getenv("DELIVERY_DRAIN_SECONDS", 10))
+# Напоминания одного чата, поставленные в очередь в пределах окна (сек), отправляются одним сообщением; 0 - по одному
+DELIVERY_COALESCE_WINDOW = float(os.getenv("DELIVERY_COALESCE_WINDOW", 1.0))
+# Предельная длина сообщения Telegram
+MESSAGE_MAX_LENGTH = 4096
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import sqlite3
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database.pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+def _commit_writes(conn: sqlite3.Connection, writes: List[Tuple[Callable[..., Any], tuple]]) -> List[Tuple[bool, Any]]:
+    """Выполняет записи одной транзакцией, каждую в своей точке сохранения: ошибка откатывает только её."""
+    # IMMEDIATE сразу берёт блокировку записи: транзакция не упадёт на полпути с SQLITE_BUSY
+    conn.execute("BEGIN IMMEDIATE")
+    results = []
+
+    for func, args in writes:
+        conn.execute("SAVEPOINT write")
+        try:
+            results.append((True, func(conn, *args)))
+        except Exception as e:
+            conn.execute("ROLLBACK TO write")
+            results.append((False, e))
+        conn.execute("RELEASE write")
+
+    conn.commit()
+    return results
+
+class WriteBatcher:
+    """Групповая фиксация записей в SQLite.
+
+    Записи обработчиков копятся в очереди, один фоновый писатель забирает их
+    (не более max_batch) и фиксирует одной транзакцией: на пачку приходится одна
+    блокировка записи и один fsync вместо одного на запись. Пока транзакция
+    фиксируется, очередь наполняется следующей пачкой, поэтому под нагрузкой пачки
+    растут сами, а одиночная запись не ждёт. window > 0 добавляет ожидание перед
+    каждой пачкой.
+
+    Функция записи вызывается как func(conn, *args) и не должна делать commit.
+    Вызывающий получает свой результат или своё исключение; ошибка фиксации
+    всей транзакции передаётся всем записям пачки.
+    """
+
+    def __init__(self, pool: ConnectionPool, window: float = 0.0, max_batch: int = 256):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+
+        self._pending: List[Tuple[Callable[..., Any], tuple, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'batches': self.batches,
+            'writes': self.writes,
+            'failed': self.failed,
+            'pending': len(self._pending),
+        }
+
+    async def submit(self, func: Callable[..., Any], *args) -> Any:
+        """Ставит func(conn, *args) в очередь и возвращает её результат после фиксации пачки."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((func, args, future))
+
+        # Писатель запускается в цикле событий первого вызова (и заново, если тот цикл завершился)
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+        return await future
+
+    async def close(self):
+        """Фиксирует накопленные записи и останавливает писателя."""
+        if self._task is None or self._task.done():
+            self._task = None
+            return
+
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+            self._stopping = False
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            if not self._pending:
+                if self._stopping:
+                    return
+                continue
+
+            if self.window and not self._stopping and len(self._pending) < self.max_batch:
+                await asyncio.sleep(self.window)
+
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            if self._pending or self._stopping:
+                self._wakeup.set()
+
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[Tuple[Callable[..., Any], tuple, asyncio.Future]]):
+        try:
+            results = await self.pool.run(_commit_writes, [(func, args) for func, args, _ in batch])
+        except Exception as e:
+            logger.error(f"Ошибка фиксации пачки из {len(batch)} записей: {e}")
+            results = [(False, e)] * len(batch)
+        else:
+            self.batches += 1
+
+        for (_, _, future), (ok, value) in zip(batch, results):
+            self.writes += 1
+            if not ok:
+                self.failed += 1
+            # Вызывающий мог быть отменён, пока пачка фиксировалась
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
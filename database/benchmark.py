@@ -0,0 +1,819 @@
+"""
+Бенчмарк хранения повторяющихся напоминаний: одна строка с правилом против
+заранее созданных строк на каждое срабатывание.
+
+Для ежечасного напоминания на горизонтах от недели до пяти лет измеряются
+число строк и размер базы, время записи, поиск следующего срабатывания
+и первая страница /list.
+
+С --import - пропускная способность импорта: разбор строк, запись пачкой
+одной транзакцией и регистрация в диспетчере против записи по одной строке.
+
+С --formats - запросы горячего пути при хранении времени текстом ISO
+(сравнение с datetime('now')) и целым числом секунд UTC.
+
+С --fsm - хранилища состояний FSM: MemoryStorage против SQLiteStorage
+(время записи и чтения состояния, память после заполнения) на заданном числе пользователей.
+
+С --writes - создание и удаление напоминаний из --concurrency одновременных обработчиков:
+транзакция на каждую запись против групповой фиксации (WriteBatcher) с разным окном сбора;
+записи в секунду и задержка записи.
+
+С --handlers - пропускная способность обработчиков: прежний слой (новое соединение sqlite3
+на каждый вызов прямо в цикле событий, журнал отката) против асинхронного репозитория
+(пул WAL-соединений в отдельных потоках, групповая фиксация, кэш). Смесь обновлений:
+создание, /list и удаление; измеряются обновления в секунду, задержка обработки и
+самая долгая остановка цикла событий.
+
+С --list - /list у пользователя с заданным числом напоминаний: прежний список целиком
+(все строки, одно сообщение и кнопка на каждую строку) против страницы по курсору
+(первая и следующая страница, поиск начала предыдущей); время, размер сообщения и число кнопок.
+
+С --cleanup - задержка обработчиков во время очистки: база с заданным числом строк, из которых
+большая часть - давно доставленные напоминания; апдейты с заданной частотой создают, показывают
+и удаляют напоминания сначала без очистки, затем во время архивации пачками и инкрементальной
+очистки страниц; задержка обработки по фазам.
+
+Запуск:
+    python -m database.benchmark
+    python -m database.benchmark --every 24   - ежедневное напоминание
+    python -m database.benchmark --import 10000
+    python -m database.benchmark --formats 1000000
+    python -m database.benchmark --fsm 1000000
+    python -m database.benchmark --writes 20000 --concurrency 200
+    python -m database.benchmark --handlers 20000 --concurrency 200
+    python -m database.benchmark --list 50000
+    python -m database.benchmark --cleanup 10000000 --rate 200 --users 100000
+"""
+import asyncio
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+import uuid
+from typing import Dict, List
+
+HORIZONS = (("неделя", 7), ("месяц", 30), ("год", 365), ("5 лет", 5 * 365))
+
+PAGE_SQL = (
+    "SELECT id, text, notification_time, job_id, recurrence FROM notifications "
+    "WHERE user_id = ? AND notification_time > ? ORDER BY notification_time, id LIMIT ?"
+)
+NEXT_SQL = (
+    "SELECT notification_time FROM notifications "
+    "WHERE user_id = ? AND notification_time > ? ORDER BY notification_time LIMIT 1"
+)
+INSERT_SQL = "INSERT INTO notifications (user_id, text, notification_time, job_id, recurrence) VALUES (?, ?, ?, ?, ?)"
+
+def _timed_us(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+def measure(db_name: str, rule, days: int, materialize: bool, repeat: int) -> Dict[str, float]:
+    from database.models import init_db
+    from nlp.recurrence import Recurrence
+
+    init_db(db_name)
+    conn = sqlite3.connect(db_name)
+    start = datetime.datetime(2030, 1, 1, 8, 30)
+    end = start + datetime.timedelta(days=days)
+    encoded = rule.encode()
+
+    if materialize:
+        times = []
+        moment = rule.first_after(start)
+        while moment <= end:
+            times.append(moment)
+            moment = rule.next_after(moment, moment)
+        rows = [(1, "Размяться", int(moment.timestamp()), f"job_{index}", None) for index, moment in enumerate(times)]
+    else:
+        rows = [(1, "Размяться", int(rule.first_after(start).timestamp()), "job_0", encoded)]
+
+    started = time.perf_counter()
+    conn.executemany(INSERT_SQL, rows)
+    conn.commit()
+    insert_ms = (time.perf_counter() - started) * 1000
+
+    conn.execute("VACUUM")
+    size_kb = os.path.getsize(db_name) / 1024
+
+    # Следующее срабатывание через неделю от начала: строка в базе против вычисления по правилу
+    previous = start + datetime.timedelta(days=min(days, 7) - 0.5)
+    now = int(previous.timestamp())
+    if materialize:
+        next_us = _timed_us(lambda: conn.execute(NEXT_SQL, (1, now)).fetchone(), repeat)
+    else:
+        next_us = _timed_us(lambda: Recurrence.decode(encoded).next_after(previous, previous), repeat)
+
+    page_us = _timed_us(lambda: conn.execute(PAGE_SQL, (1, now, 11)).fetchall(), repeat)
+    conn.close()
+
+    return {"rows": len(rows), "size_kb": size_kb, "insert_ms": insert_ms, "next_us": next_us, "page_us": page_us}
+
+IMPORT_LINES = (
+    "завтра в 10:00 отправить отчёт {}",
+    "через {} минут позвонить",
+    "в пятницу в 18:30 встреча {}",
+    "каждый день в 9:00 зарядка {}",
+    "{} декабря купить подарок",
+    "строка без времени {}",
+)
+
+async def measure_import(lines: List[str]) -> Dict[str, float]:
+    # Модули с пулом соединений и настройками импортируются после подмены DB_NAME
+    from config.settings import DB_NAME
+    from database.models import init_db
+    from database.repository import save_notification, save_notifications, flush_writes, close_pool
+    from nlp.importer import ReminderImporter
+    from services.dispatcher import ReminderDispatcher
+
+    init_db(DB_NAME)
+    importer = ReminderImporter(zone="UTC")
+
+    async def deliver(reminders):
+        pass
+
+    # Окно на несколько лет: в диспетчер попадает вся пачка
+    dispatcher = ReminderDispatcher(deliver, lookahead=10 ** 8)
+    await dispatcher.start(datetime.datetime.now(datetime.timezone.utc))
+
+    started = time.perf_counter()
+    reminders = [reminder for _, _, reminder in importer.iter_lines(lines) if reminder]
+    parsed = time.perf_counter()
+
+    items = [(r.text, r.time, uuid.uuid4().hex, r.rule.encode() if r.rule else None) for r in reminders]
+    notification_ids = await save_notifications(1, items)
+    saved = time.perf_counter()
+
+    dispatcher.schedule_many(1, [
+        (text, notification_time, notification_id, job_id, recurrence)
+        for notification_id, (text, notification_time, job_id, recurrence) in zip(notification_ids, items)
+    ])
+    scheduled = time.perf_counter()
+
+    # Прежний путь: INSERT и commit на каждое напоминание
+    for text, notification_time, _, recurrence in items:
+        await save_notification(2, text, notification_time, uuid.uuid4().hex, recurrence)
+    single = time.perf_counter() - scheduled
+
+    await dispatcher.stop()
+    await flush_writes()
+    close_pool()
+    return {
+        "lines": len(lines), "created": len(reminders), "scheduled": dispatcher.pending,
+        "parse": parsed - started, "save": saved - parsed, "schedule": scheduled - saved,
+        "total": scheduled - started, "single": single,
+    }
+
+def main_import(count: int) -> int:
+    lines = [IMPORT_LINES[i % len(IMPORT_LINES)].format(i % 28 + 1) for i in range(count)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DB_NAME"] = os.path.join(directory, "import.db")
+        os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+        report = asyncio.run(measure_import(lines))
+
+    print(f"Строк: {report['lines']:,}, создано напоминаний: {report['created']:,}, в окне диспетчера: {report['scheduled']:,}")
+    for key, title in (("parse", "разбор"), ("save", "запись пачкой"), ("schedule", "регистрация")):
+        print(f"  {title:<14} {report[key] * 1000:8.1f} мс")
+    print(f"  {'итого':<14} {report['total'] * 1000:8.1f} мс, {report['lines'] / report['total']:,.0f} строк/с")
+    print(f"  по одной строке: запись {report['single'] * 1000:.1f} мс, {report['created'] / report['single']:,.0f} строк/с")
+    return 0
+
+FORMAT_SCHEMA = (
+    "CREATE TABLE notifications (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, text TEXT NOT NULL, "
+    "notification_time {type} NOT NULL, job_id TEXT NOT NULL, delivered_at {type})",
+    "CREATE INDEX idx_user_time ON notifications (user_id, notification_time)",
+    "CREATE INDEX idx_time ON notifications (notification_time)",
+    "CREATE INDEX idx_pending ON notifications (notification_time) WHERE delivered_at IS NULL",
+)
+
+# Прежние запросы с текстовым временем и их целочисленные аналоги
+FORMAT_QUERIES = (
+    ("страница /list",
+     "SELECT id, text, notification_time FROM notifications WHERE user_id = ? AND notification_time > datetime('now') "
+     "ORDER BY notification_time, id LIMIT 11",
+     "SELECT id, text, notification_time FROM notifications WHERE user_id = ? AND notification_time > ? "
+     "ORDER BY notification_time, id LIMIT 11"),
+    ("число активных",
+     "SELECT COUNT(*) FROM notifications WHERE user_id = ? AND notification_time > datetime('now')",
+     "SELECT COUNT(*) FROM notifications WHERE user_id = ? AND notification_time > ?"),
+    ("окно диспетчера",
+     "SELECT id FROM notifications WHERE delivered_at IS NULL AND notification_time > ? AND notification_time <= ? "
+     "ORDER BY notification_time LIMIT 1000",
+     "SELECT id FROM notifications WHERE delivered_at IS NULL AND notification_time > ? AND notification_time <= ? "
+     "ORDER BY notification_time LIMIT 1000"),
+)
+
+def measure_formats(db_name: str, as_text: bool, count: int, users: int, repeat: int) -> Dict[str, float]:
+    conn = sqlite3.connect(db_name)
+    for statement in FORMAT_SCHEMA:
+        conn.execute(statement.format(type="TIMESTAMP" if as_text else "INTEGER"))
+
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    epoch = int(now.timestamp())
+    rng = random.Random(1)
+
+    def value(seconds: int):
+        if as_text:
+            return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        return seconds
+
+    started = time.perf_counter()
+    conn.executemany(
+        "INSERT INTO notifications (user_id, text, notification_time, job_id) VALUES (?, ?, ?, ?)",
+        ((rng.randrange(users), "Напоминание", value(epoch + rng.randrange(-86400, 30 * 86400)), str(index))
+         for index in range(count))
+    )
+    conn.commit()
+    report = {"insert_ms": (time.perf_counter() - started) * 1000}
+
+    conn.execute("VACUUM")
+    report["size_mb"] = os.path.getsize(db_name) / 2 ** 20
+
+    for title, text_sql, int_sql in FORMAT_QUERIES:
+        user_ids = [rng.randrange(users) for _ in range(repeat)]
+        if title == "окно диспетчера":
+            window = (value(epoch), value(epoch + 600))
+            params = iter([window] * repeat)
+        elif as_text:
+            params = iter([(user_id,) for user_id in user_ids])
+        else:
+            params = iter([(user_id, epoch) for user_id in user_ids])
+
+        sql = text_sql if as_text else int_sql
+        report[title] = _timed_us(lambda: conn.execute(sql, next(params)).fetchall(), repeat)
+
+    conn.close()
+    return report
+
+def main_formats(count: int, repeat: int) -> int:
+    users = max(1, count // 100)
+    print(f"Строк: {count:,}, пользователей: {users:,}")
+    titles = [title for title, _, _ in FORMAT_QUERIES]
+    print(f"{'формат':<8} {'база, МБ':>9} {'запись, мс':>11} " + " ".join(f"{title + ', мкс':>20}" for title in titles))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for as_text, title in ((True, "текст"), (False, "целое")):
+            report = measure_formats(os.path.join(directory, f"{title}.db"), as_text, count, users, repeat)
+            print(
+                f"{title:<8} {report['size_mb']:>9.1f} {report['insert_ms']:>11.0f} "
+                + " ".join(f"{report[name]:>20.1f}" for name in titles)
+            )
+    return 0
+
+async def measure_fsm(storage, users: int, repeat: int, traced: bool) -> Dict[str, float]:
+    from aiogram.fsm.storage.base import StorageKey
+
+    def key(user_id: int) -> StorageKey:
+        return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+    rng = random.Random(1)
+    report = {}
+
+    # Каждый пользователь начал диалог создания напоминания: состояние и данные
+    started = time.perf_counter()
+    for user_id in range(users):
+        await storage.set_state(key(user_id), "NotificationStates:waiting_for_time")
+        await storage.set_data(key(user_id), {"text": f"Напоминание {user_id}"})
+    if hasattr(storage, "flush"):
+        await storage.flush()
+    report["set_us"] = (time.perf_counter() - started) / users * 1e6
+
+    if traced:
+        report["memory_mb"] = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        return report
+
+    # Недавние пользователи (в кэше) и случайные из всех
+    for title, pick in (("hot_us", lambda: users - 1 - rng.randrange(min(users, 1000))), ("cold_us", lambda: rng.randrange(users))):
+        keys = [key(pick()) for _ in range(repeat)]
+        started = time.perf_counter()
+        for storage_key in keys:
+            await storage.get_state(storage_key)
+        report[title] = (time.perf_counter() - started) / repeat * 1e6
+
+    return report
+
+def main_fsm(users: int, repeat: int) -> int:
+    async def run(name: str, traced: bool) -> Dict[str, float]:
+        # Модули с пулом соединений и настройками импортируются после подмены DB_NAME
+        from aiogram.fsm.storage.memory import MemoryStorage
+        from config.settings import DB_NAME, FSM_CACHE_SIZE
+        from database.fsm import SQLiteStorage
+        from database.models import init_db
+        from database.pool import ConnectionPool
+
+        if name == "memory":
+            storage = MemoryStorage()
+        else:
+            db_name = f"{DB_NAME}.{int(traced)}"
+            init_db(db_name)
+            storage = SQLiteStorage(ConnectionPool(db_name, size=1), cache_size=FSM_CACHE_SIZE)
+
+        if traced:
+            tracemalloc.start()
+        try:
+            return await measure_fsm(storage, users, repeat, traced)
+        finally:
+            if traced:
+                tracemalloc.stop()
+            await storage.close()
+            if name != "memory":
+                storage.pool.close()
+
+    print(f"Пользователей: {users:,}")
+    print(f"{'хранилище':<10} {'запись, мкс':>12} {'чтение из кэша, мкс':>20} {'чтение случайного, мкс':>23} {'память, МБ':>11}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DB_NAME"] = os.path.join(directory, "fsm.db")
+        os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+        for name in ("memory", "sqlite"):
+            # Память замеряется отдельным проходом: трассировка замедляет запись
+            report = asyncio.run(run(name, False))
+            report["memory_mb"] = asyncio.run(run(name, True))["memory_mb"]
+            print(
+                f"{name:<10} {report['set_us']:>12.1f} {report['hot_us']:>20.1f} "
+                f"{report['cold_us']:>23.1f} {report['memory_mb']:>11.1f}"
+            )
+    return 0
+
+async def measure_writes(window, count: int, concurrency: int) -> Dict[str, float]:
+    """window=None - транзакция на каждую запись, иначе групповая фиксация с этим окном."""
+    # Модули с пулом соединений и настройками импортируются после подмены DB_NAME
+    from config.settings import DB_NAME
+    from database.batcher import WriteBatcher
+    from database.models import init_db
+    from database.pool import ConnectionPool
+    from database.repository import _insert_notification, _remove_notification
+
+    def _save_notification(conn, *args):
+        notification_id = _insert_notification(conn, *args)
+        conn.commit()
+        return notification_id
+
+    def _delete_notification(conn, notification_id):
+        deleted = _remove_notification(conn, notification_id)
+        conn.commit()
+        return deleted
+
+    db_name = f"{DB_NAME}.{window}"
+    init_db(db_name)
+    pool = ConnectionPool(db_name)
+    writes = WriteBatcher(pool, window=window or 0.0)
+    notification_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    latencies = []
+
+    async def write(func, batched, *args):
+        started = time.perf_counter()
+        result = await (writes.submit(batched, *args) if window is not None else pool.run(func, *args))
+        latencies.append(time.perf_counter() - started)
+        return result
+
+    # Обработчик создаёт напоминания, каждое четвёртое тут же удаляет
+    async def handler(user_id: int, writes_count: int):
+        for index in range(writes_count):
+            notification_id = await write(
+                _save_notification, _insert_notification, user_id, f"Напоминание {index}", notification_time, uuid.uuid4().hex, None
+            )
+            if index % 4 == 3:
+                await write(_delete_notification, _remove_notification, notification_id)
+
+    per_handler = max(1, count // concurrency * 4 // 5)
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(user_id, per_handler) for user_id in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    await writes.close()
+    pool.close()
+
+    latencies.sort()
+    return {
+        "writes": len(latencies), "rate": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000, "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "batch": writes.writes / writes.batches if writes.batches else 1.0,
+    }
+
+def main_writes(count: int, concurrency: int) -> int:
+    print(f"Записей: ~{count:,}, одновременных обработчиков: {concurrency}")
+    print(f"{'фиксация':<16} {'записей/с':>10} {'p50, мс':>8} {'p99, мс':>8} {'записей в транзакции':>21}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DB_NAME"] = os.path.join(directory, "writes.db")
+        os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+        for window, title in ((None, "каждая запись"), (0.0, "пачки, без окна"), (0.002, "пачки, окно 2 мс"), (0.01, "пачки, окно 10 мс")):
+            report = asyncio.run(measure_writes(window, count, concurrency))
+            print(
+                f"{title:<16} {report['rate']:>10,.0f} {report['p50_ms']:>8.1f} "
+                f"{report['p99_ms']:>8.1f} {report['batch']:>21.1f}"
+            )
+    return 0
+
+# Прежний database/repository.py: соединение на каждый вызов, время текстом, запросы без индексов
+LEGACY_SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        notification_time TIMESTAMP NOT NULL,
+        job_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+def _legacy_save(db_name: str, user_id: int, text: str, notification_time: datetime.datetime, job_id: str) -> int:
+    conn = sqlite3.connect(db_name)
+    cursor = conn.execute(
+        "INSERT INTO notifications (user_id, text, notification_time, job_id) VALUES (?, ?, ?, ?)",
+        (user_id, text, notification_time.strftime("%Y-%m-%d %H:%M:%S"), job_id)
+    )
+    conn.commit()
+    conn.close()
+    return cursor.lastrowid
+
+def _legacy_list(db_name: str, user_id: int) -> list:
+    conn = sqlite3.connect(db_name)
+    rows = conn.execute(
+        "SELECT id, text, notification_time, job_id FROM notifications WHERE user_id = ? AND notification_time > datetime('now')",
+        (user_id,)
+    ).fetchall()
+    conn.close()
+    return rows
+
+def _legacy_delete(db_name: str, notification_id: int) -> bool:
+    conn = sqlite3.connect(db_name)
+    job_id = conn.execute("SELECT job_id FROM notifications WHERE id = ?", (notification_id,)).fetchone()
+    conn.close()
+
+    conn = sqlite3.connect(db_name)
+    cursor = conn.execute("DELETE FROM notifications WHERE id = ?", (notification_id,))
+    conn.commit()
+    conn.close()
+    return job_id is not None and cursor.rowcount > 0
+
+async def measure_handlers(legacy: bool, updates: int, concurrency: int, users: int, seeded: int) -> Dict[str, float]:
+    # Модули с пулом соединений и настройками импортируются после подмены DB_NAME
+    from config.settings import DB_NAME
+    from database.models import init_db
+    from database import repository
+
+    notification_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    rng = random.Random(1)
+    if legacy:
+        db_name = f"{DB_NAME}.legacy"
+        conn = sqlite3.connect(db_name)
+        conn.execute(LEGACY_SCHEMA_SQL)
+        conn.commit()
+        conn.close()
+        # Время в прежнем формате: наивное, в поясе сервера
+        notification_time = notification_time.astimezone().replace(tzinfo=None)
+    else:
+        init_db(DB_NAME)
+
+    async def save(user_id: int, index: int) -> int:
+        job_id = uuid.uuid4().hex
+        if legacy:
+            return _legacy_save(db_name, user_id, f"Напоминание {index}", notification_time, job_id)
+        return await repository.save_notification(user_id, f"Напоминание {index}", notification_time, job_id)
+
+    async def show_list(user_id: int):
+        if legacy:
+            return _legacy_list(db_name, user_id)
+        await repository.get_user_notifications_page(user_id, None, 10)
+        return await repository.count_user_notifications(user_id)
+
+    async def delete(notification_id: int):
+        if legacy:
+            return _legacy_delete(db_name, notification_id)
+        await repository.get_job_id(notification_id)
+        return await repository.delete_notification(notification_id)
+
+    created: Dict[int, List[int]] = {user_id: [] for user_id in range(users)}
+    for user_id in range(users):
+        for index in range(seeded):
+            created[user_id].append(await save(user_id, index))
+
+    # Смесь апдейтов: половина - создание, 40% - /list, 10% - удаление
+    kinds = rng.choices(("create", "list", "delete"), weights=(5, 4, 1), k=updates)
+    senders = [rng.randrange(users) for _ in range(updates)]
+    latencies = []
+    # Пробуждения пробы: промежуток между ними - сколько цикл событий был занят чужой работой
+    wakeups = []
+    position = 0
+
+    async def probe():
+        while True:
+            wakeups.append(time.perf_counter())
+            await asyncio.sleep(0.001)
+
+    async def worker():
+        nonlocal position
+        while position < updates:
+            index = position
+            position += 1
+            user_id = senders[index]
+            started = time.perf_counter()
+            if kinds[index] == "create":
+                created[user_id].append(await save(user_id, index))
+            elif kinds[index] == "list":
+                await show_list(user_id)
+            elif created[user_id]:
+                await delete(created[user_id].pop(rng.randrange(len(created[user_id]))))
+            latencies.append(time.perf_counter() - started)
+
+    prober = asyncio.create_task(probe())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    wakeups.append(time.perf_counter())
+    prober.cancel()
+    stall = max((later - earlier for earlier, later in zip(wakeups, wakeups[1:])), default=0.0)
+
+    if not legacy:
+        await repository.flush_writes()
+        repository.close_pool()
+
+    latencies.sort()
+    return {
+        "rate": updates / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "stall_ms": stall * 1000,
+    }
+
+def main_handlers(updates: int, concurrency: int, users: int, seeded: int) -> int:
+    print(f"Апдейтов: {updates:,}, одновременных обработчиков: {concurrency}, пользователей: {users:,} (по {seeded} напоминаний)")
+    print(f"{'слой':<24} {'апдейтов/с':>11} {'p50, мс':>8} {'p99, мс':>8} {'остановка цикла, мс':>20}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DB_NAME"] = os.path.join(directory, "handlers.db")
+        os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+        for legacy, title in ((True, "соединение на вызов"), (False, "асинхронный репозиторий")):
+            report = asyncio.run(measure_handlers(legacy, updates, concurrency, users, seeded))
+            print(
+                f"{title:<24} {report['rate']:>11,.0f} {report['p50_ms']:>8.1f} "
+                f"{report['p99_ms']:>8.1f} {report['stall_ms']:>20.1f}"
+            )
+    return 0
+
+def _legacy_render_list(db_name: str, user_id: int):
+    """Прежний show_notifications_list: все активные напоминания в одном сообщении и кнопка на каждое."""
+    from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+    notifications = _legacy_list(db_name, user_id)
+    text = "📋 <b>Ваши активные напоминания:</b>\n\n"
+    for idx, (notification_id, notification_text, notification_time, _) in enumerate(notifications, start=1):
+        time_obj = datetime.datetime.fromisoformat(notification_time)
+        minutes = int((time_obj - datetime.datetime.now()).total_seconds() / 60)
+        text += f"{idx}. <b>{notification_text}</b>\n⏰ {time_obj.strftime('%d.%m.%Y %H:%M')} (через {minutes // 60} ч {minutes % 60} мин)\n\n"
+
+    # Прежний код собирал клавиатуру через InlineKeyboardBuilder, который копирует все кнопки
+    # при добавлении каждой - на десятках тысяч строк это часы. Готовая разметка того же вида
+    # даёт нижнюю оценку времени прежнего списка.
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=f"❌ Удалить #{idx}", callback_data=f"delete_{notification_id}")]
+        for idx, (notification_id, _, _, _) in enumerate(notifications, start=1)
+    ])
+    return text, keyboard
+
+def _buttons(keyboard) -> int:
+    return sum(len(row) for row in keyboard.inline_keyboard)
+
+async def measure_list(reminders: int, repeat: int) -> List[tuple]:
+    # Модули с пулом соединений и настройками импортируются после подмены DB_NAME
+    from config.settings import DB_NAME, LIST_PAGE_SIZE
+    from database.models import init_db
+    from database import repository
+    from handlers.notifications import render_notifications_page
+    from keyboards.inline import decode_cursor
+
+    user_id = 1
+    base = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    times = [base + datetime.timedelta(minutes=index) for index in range(reminders)]
+
+    legacy_db = f"{DB_NAME}.legacy"
+    conn = sqlite3.connect(legacy_db)
+    conn.execute(LEGACY_SCHEMA_SQL)
+    conn.executemany(
+        "INSERT INTO notifications (user_id, text, notification_time, job_id) VALUES (?, ?, ?, ?)",
+        [
+            (user_id, f"Напоминание {index}", moment.astimezone().strftime("%Y-%m-%d %H:%M:%S"), uuid.uuid4().hex)
+            for index, moment in enumerate(times)
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+    init_db(DB_NAME)
+    for chunk in range(0, reminders, 1000):
+        await repository.save_notifications(user_id, [
+            (f"Напоминание {index}", times[index], uuid.uuid4().hex, None)
+            for index in range(chunk, min(chunk + 1000, reminders))
+        ])
+    await repository.flush_writes()
+
+    async def timed(render):
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            page = await render()
+            durations.append(time.perf_counter() - started)
+        durations.sort()
+        text, keyboard = page
+        return durations[len(durations) // 2] * 1000, len(text), _buttons(keyboard), keyboard
+
+    async def legacy():
+        return _legacy_render_list(legacy_db, user_id)
+
+    results = [("прежний список целиком", *(await timed(legacy))[:3])]
+
+    first = await timed(lambda: render_notifications_page(user_id))
+    results.append(("первая страница", *first[:3]))
+
+    # Курсор следующей страницы - из кнопки "Вперёд", как его получает обработчик
+    offset, cursor = decode_cursor(first[3].inline_keyboard[-1][-1].callback_data.split("_", 1)[1])
+    following = await timed(lambda: render_notifications_page(user_id, cursor, offset))
+    results.append(("следующая страница", *following[:3]))
+
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await repository.get_previous_page_start(user_id, cursor, LIST_PAGE_SIZE)
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    results.append(("начало предыдущей", durations[len(durations) // 2] * 1000, 0, 0))
+
+    repository.close_pool()
+    return results
+
+def main_list(reminders: int, repeat: int) -> int:
+    print(f"Напоминаний у пользователя: {reminders:,}, повторов: {repeat} (медиана)")
+    print(f"{'вариант':<24} {'время, мс':>10} {'символов':>10} {'кнопок':>8}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DB_NAME"] = os.path.join(directory, "list.db")
+        os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+        for title, elapsed_ms, chars, buttons in asyncio.run(measure_list(reminders, repeat)):
+            print(f"{title:<24} {elapsed_ms:>10.2f} {chars:>10,} {buttons:>8,}")
+
+    print("Лимиты Telegram: 4,096 символов в сообщении, 100 кнопок в клавиатуре")
+    return 0
+
+async def measure_cleanup(rows: int, rate: float, users: int, idle: float) -> List[tuple]:
+    # Модули с пулом соединений и настройками импортируются после подмены DB_NAME
+    from config.settings import DB_NAME, ARCHIVE_BATCH_SIZE, ARCHIVE_BATCH_PAUSE, VACUUM_PAGES_PER_STEP
+    from database.models import init_db
+    from database import repository
+
+    init_db(DB_NAME)
+
+    # Девять из десяти строк - доставленные месяц назад, остальные - активные напоминания пользователей
+    now = int(time.time())
+    conn = sqlite3.connect(DB_NAME)
+    for chunk in range(0, rows, 200000):
+        conn.executemany(
+            "INSERT INTO notifications (user_id, text, notification_time, job_id, shard, delivered_at) VALUES (?, ?, ?, ?, 0, ?)",
+            (
+                (index % users, f"Напоминание {index}", moment, f"seed{index}", moment if index % 10 else None)
+                for index in range(chunk, min(chunk + 200000, rows))
+                for moment in (now - 30 * 86400 + index % 86400 if index % 10 else now + 86400 + index % 86400,)
+            )
+        )
+        conn.commit()
+    conn.close()
+    size_before = os.path.getsize(DB_NAME)
+
+    rng = random.Random(1)
+    notification_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    phase = "без очистки"
+    latencies: Dict[str, List[float]] = {}
+    created: List[int] = []
+    handlers = set()
+
+    async def handle(kind: str, user_id: int):
+        started = time.perf_counter()
+        current = phase
+        if kind == "create":
+            created.append(await repository.save_notification(user_id, "Напоминание", notification_time, uuid.uuid4().hex))
+        elif kind == "list":
+            await repository.get_user_notifications_page(user_id, None, 10)
+            await repository.count_user_notifications(user_id)
+        elif created:
+            await repository.delete_notification(created.pop(rng.randrange(len(created))))
+        latencies.setdefault(current, []).append(time.perf_counter() - started)
+
+    async def traffic():
+        # Открытая нагрузка: апдейты приходят с заданной частотой, сколько бы ни длилась обработка
+        while True:
+            await asyncio.sleep(rng.expovariate(rate))
+            kind = rng.choices(("create", "list", "delete"), weights=(5, 4, 1))[0]
+            task = asyncio.create_task(handle(kind, rng.randrange(users)))
+            handlers.add(task)
+            task.add_done_callback(handlers.discard)
+
+    generator = asyncio.create_task(traffic())
+    await asyncio.sleep(idle)
+
+    phase = "архивация"
+    started = time.perf_counter()
+    archived = await repository.archive_notifications(ARCHIVE_BATCH_SIZE, ARCHIVE_BATCH_PAUSE)
+    archive_seconds = time.perf_counter() - started
+
+    phase = "очистка страниц"
+    started = time.perf_counter()
+    await repository.vacuum_free_pages(VACUUM_PAGES_PER_STEP, ARCHIVE_BATCH_PAUSE)
+    vacuum_seconds = time.perf_counter() - started
+
+    generator.cancel()
+    await asyncio.gather(*handlers)
+    await repository.flush_writes()
+    repository.close_pool()
+
+    print(
+        f"Строк: {rows:,}, размер базы {size_before / 2**20:,.0f} -> {os.path.getsize(DB_NAME) / 2**20:,.0f} МБ; "
+        f"в архив перенесено {archived:,} за {archive_seconds:.0f} с, очистка страниц {vacuum_seconds:.1f} с"
+    )
+
+    report = []
+    for title, values in latencies.items():
+        values.sort()
+        report.append((
+            title, len(values), values[len(values) // 2] * 1000,
+            values[int(len(values) * 0.99)] * 1000, values[-1] * 1000
+        ))
+    return report
+
+def main_cleanup(rows: int, rate: float, users: int, idle: float) -> int:
+    print(f"Апдейтов в секунду: {rate:,.0f}, пользователей: {users:,}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DB_NAME"] = os.path.join(directory, "cleanup.db")
+        os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+        report = asyncio.run(measure_cleanup(rows, rate, users, idle))
+
+    print(f"{'фаза':<18} {'обработок':>10} {'p50, мс':>8} {'p99, мс':>8} {'max, мс':>8}")
+    for title, count, p50, p99, worst in report:
+        print(f"{title:<18} {count:>10,} {p50:>8.1f} {p99:>8.1f} {worst:>8.1f}")
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--every", type=int, default=1, help="интервал напоминания в часах")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--import", dest="import_lines", type=int, help="измерить импорт заданного числа строк")
+    parser.add_argument("--formats", type=int, help="сравнить форматы времени на заданном числе строк")
+    parser.add_argument("--fsm", type=int, help="сравнить хранилища состояний FSM на заданном числе пользователей")
+    parser.add_argument("--writes", type=int, help="сравнить фиксацию заданного числа записей по одной и пачками")
+    parser.add_argument("--concurrency", type=int, default=200, help="одновременных обработчиков для --writes и --handlers")
+    parser.add_argument("--handlers", type=int, help="сравнить прежний и асинхронный слой базы на заданном числе апдейтов")
+    parser.add_argument("--users", type=int, default=1000, help="пользователей для --handlers")
+    parser.add_argument("--seeded", type=int, default=20, help="напоминаний у пользователя до начала --handlers")
+    parser.add_argument("--list", dest="list_size", type=int, help="измерить /list у пользователя с заданным числом напоминаний")
+    parser.add_argument("--rounds", type=int, default=10, help="повторов каждого замера --list")
+    parser.add_argument("--cleanup", type=int, help="измерить задержку обработчиков во время очистки базы с заданным числом строк")
+    parser.add_argument("--rate", type=float, default=200, help="апдейтов в секунду для --cleanup")
+    parser.add_argument("--idle", type=float, default=30, help="секунд нагрузки без очистки для --cleanup")
+    args = parser.parse_args(argv)
+
+    if args.cleanup:
+        return main_cleanup(args.cleanup, args.rate, args.users, args.idle)
+    if args.list_size:
+        return main_list(args.list_size, args.rounds)
+    if args.handlers:
+        return main_handlers(args.handlers, args.concurrency, args.users, args.seeded)
+    if args.writes:
+        return main_writes(args.writes, args.concurrency)
+
+    if args.fsm:
+        return main_fsm(args.fsm, args.repeat)
+
+    if args.import_lines:
+        return main_import(args.import_lines)
+    if args.formats:
+        return main_formats(args.formats, args.repeat)
+
+    from nlp.recurrence import Recurrence
+
+    rule = Recurrence(interval=datetime.timedelta(hours=args.every))
+    print(f"Напоминание {rule.describe()}")
+    print(f"{'горизонт':<8} {'хранение':<9} {'строк':>7} {'база, КБ':>9} {'запись, мс':>11} {'след., мкс':>10} {'/list, мкс':>10}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for title, days in HORIZONS:
+            for materialize, storage in ((False, "правило"), (True, "строки")):
+                db_name = os.path.join(directory, f"{days}_{int(materialize)}.db")
+                report = measure(db_name, rule, days, materialize, args.repeat)
+                print(
+                    f"{title:<8} {storage:<9} {report['rows']:>7,} {report['size_kb']:>9.0f} "
+                    f"{report['insert_ms']:>11.1f} {report['next_us']:>10.1f} {report['page_us']:>10.1f}"
+                )
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,217 @@
+import bisect
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Строка уведомления: (id, text, notification_time в секундах UTC, job_id, recurrence)
+Row = Tuple[int, str, int, str, Optional[str]]
+
+# Больше любого id: курсор (time, _MAX_ID) отсекает все строки со временем time
+_MAX_ID = 2 ** 63
+
+def _sort_key(row: Row) -> Tuple[int, int]:
+    return row[2], row[0]
+
+class ReminderCache:
+    """Кэш активных напоминаний пользователей в памяти процесса.
+
+    Для каждого пользователя хранится отсортированный по (notification_time, id) список строк.
+    Объём ограничен общим числом строк, при переполнении вытесняются давно не запрашиваемые
+    пользователи (LRU). Пользователи с очень большим числом напоминаний не кэшируются.
+    Согласованность с базой поддерживают функции репозитория, изменяющие данные.
+    """
+
+    def __init__(self, max_rows: int = 100000, max_rows_per_user: int = 200, max_heavy_users: int = 1024):
+        self.max_rows = max_rows
+        self.max_rows_per_user = max_rows_per_user
+        self.max_heavy_users = max_heavy_users
+
+        self._users: "OrderedDict[int, List[Row]]" = OrderedDict()
+        # Пользователи сверх лимита строк: их запросы сразу идут в базу, без повторной загрузки
+        self._heavy: "OrderedDict[int, None]" = OrderedDict()
+        self._owners: Dict[int, int] = {}
+        self._loading: Dict[int, bool] = {}
+        self._rows = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'users': len(self._users),
+            'heavy_users': len(self._heavy),
+            'rows': self._rows,
+        }
+
+    def get(self, user_id: int) -> Optional[List[Row]]:
+        rows = self._users.get(user_id)
+        if rows is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._users.move_to_end(user_id)
+        return rows
+
+    def is_heavy(self, user_id: int) -> bool:
+        return user_id in self._heavy
+
+    def begin_load(self, user_id: int):
+        """Отмечает начало загрузки из базы: изменения во время загрузки делают её результат устаревшим."""
+        self._loading[user_id] = False
+
+    def finish_load(self, user_id: int, rows: List[Row]):
+        stale = self._loading.pop(user_id, True)
+        if stale or user_id in self._users:
+            return
+
+        if len(rows) > self.max_rows_per_user:
+            self._heavy[user_id] = None
+            if len(self._heavy) > self.max_heavy_users:
+                self._heavy.popitem(last=False)
+            return
+
+        rows = sorted(rows, key=_sort_key)
+        self._users[user_id] = rows
+        for row in rows:
+            self._owners[row[0]] = user_id
+        self._rows += len(rows)
+
+        self._evict()
+
+    def add(self, user_id: int, row: Row):
+        self._touch_loading(user_id)
+
+        rows = self._users.get(user_id)
+        # Строку уже принесла загрузка из базы, завершившаяся после фиксации записи
+        if rows is None or row[0] in self._owners:
+            return
+
+        if len(rows) >= self.max_rows_per_user:
+            self.invalidate(user_id)
+            return
+
+        bisect.insort(rows, row, key=_sort_key)
+        self._owners[row[0]] = user_id
+        self._rows += 1
+
+        self._evict()
+
+    def add_many(self, user_id: int, new_rows: List[Row]):
+        self._touch_loading(user_id)
+
+        rows = self._users.get(user_id)
+        if rows is None:
+            return
+
+        new_rows = [row for row in new_rows if row[0] not in self._owners]
+        if not new_rows:
+            return
+
+        if len(rows) + len(new_rows) > self.max_rows_per_user:
+            self.invalidate(user_id)
+            return
+
+        rows.extend(new_rows)
+        rows.sort(key=_sort_key)
+        for row in new_rows:
+            self._owners[row[0]] = user_id
+        self._rows += len(new_rows)
+
+        self._evict()
+
+    def remove(self, notification_id: int) -> Optional[Row]:
+        user_id = self._owners.pop(notification_id, None)
+        if user_id is None:
+            return None
+
+        self._touch_loading(user_id)
+        rows = self._users[user_id]
+        for index, row in enumerate(rows):
+            if row[0] == notification_id:
+                del rows[index]
+                self._rows -= 1
+                return row
+        return None
+
+    def move(self, notification_id: int, notification_time: int):
+        """Переносит строку повторяющегося напоминания на время следующего срабатывания."""
+        user_id = self._owners.get(notification_id)
+        row = self.remove(notification_id)
+        if row is not None:
+            self.add(user_id, (row[0], row[1], notification_time, row[3], row[4]))
+
+    def find(self, user_id: int, notification_id: int) -> Optional[Row]:
+        if self._owners.get(notification_id) != user_id:
+            return None
+
+        for row in self._users[user_id]:
+            if row[0] == notification_id:
+                return row
+        return None
+
+    def invalidate(self, user_id: int):
+        self._touch_loading(user_id)
+        self._heavy.pop(user_id, None)
+
+        rows = self._users.pop(user_id, None)
+        if rows is None:
+            return
+
+        for row in rows:
+            self._owners.pop(row[0], None)
+        self._rows -= len(rows)
+
+    def discard_before(self, cutoff: int) -> int:
+        """Удаляет из кэша строки со временем раньше cutoff (после очистки базы)."""
+        removed = 0
+        for rows in self._users.values():
+            index = bisect.bisect_left(rows, (cutoff, 0), key=_sort_key)
+            if not index:
+                continue
+            for row in rows[:index]:
+                self._owners.pop(row[0], None)
+            del rows[:index]
+            removed += index
+
+        self._rows -= removed
+        return removed
+
+    def clear(self):
+        self._users.clear()
+        self._heavy.clear()
+        self._owners.clear()
+        self._loading.clear()
+        self._rows = 0
+
+    def _touch_loading(self, user_id: int):
+        if user_id in self._loading:
+            self._loading[user_id] = True
+
+    def _evict(self):
+        while self._rows > self.max_rows and self._users:
+            user_id, rows = self._users.popitem(last=False)
+            for row in rows:
+                self._owners.pop(row[0], None)
+            self._rows -= len(rows)
+            self.evictions += 1
+
+def upcoming(rows: List[Row], cutoff: int, start: Optional[Tuple[int, int]] = None) -> List[Row]:
+    """Строки со временем позже cutoff, начиная с курсора start = (notification_time, id) включительно."""
+    lower = (cutoff, _MAX_ID)
+    if start and start > lower:
+        lower = start
+    return rows[bisect.bisect_left(rows, lower, key=_sort_key):]
+
+def previous_start(rows: List[Row], cutoff: int, before: Tuple[int, int], limit: int) -> Optional[Tuple[int, int]]:
+    """Курсор начала страницы из limit строк позже cutoff, которая заканчивается перед before."""
+    first = bisect.bisect_left(rows, (cutoff, _MAX_ID), key=_sort_key)
+    end = bisect.bisect_left(rows, before, key=_sort_key)
+    if end <= first:
+        return None
+
+    row = rows[max(first, end - limit)]
+    return row[2], row[0]
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from database.pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+SELECT_FSM_SQL = "SELECT state, data, updated_at FROM fsm_states WHERE key = ?"
+UPSERT_FSM_SQL = (
+    "INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET state = excluded.state, data = excluded.data, updated_at = excluded.updated_at"
+)
+DELETE_FSM_SQL = "DELETE FROM fsm_states WHERE key = ?"
+DELETE_EXPIRED_FSM_SQL = (
+    "DELETE FROM fsm_states WHERE key IN (SELECT key FROM fsm_states WHERE updated_at < ? LIMIT ?)"
+)
+
+def _storage_key(key: StorageKey) -> str:
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.business_connection_id or ''}:{key.destiny}"
+
+def _load_fsm_state(conn: sqlite3.Connection, key: str) -> Optional[Tuple[Optional[str], Optional[str], int]]:
+    return conn.execute(SELECT_FSM_SQL, (key,)).fetchone()
+
+def _save_fsm_states(conn: sqlite3.Connection, upserts: List[Tuple], deletes: List[Tuple]):
+    conn.executemany(UPSERT_FSM_SQL, upserts)
+    conn.executemany(DELETE_FSM_SQL, deletes)
+    conn.commit()
+
+def _delete_expired_fsm_states(conn: sqlite3.Connection, before: int, limit: int) -> int:
+    cursor = conn.execute(DELETE_EXPIRED_FSM_SQL, (before, limit))
+    conn.commit()
+    return cursor.rowcount
+
+class _Record:
+    __slots__ = ('state', 'data', 'updated')
+
+    def __init__(self, state: Optional[str], data: Optional[Dict[str, Any]], updated: float):
+        self.state = state
+        # None - пустые данные: не создаём словарь на каждого пользователя без состояния
+        self.data = data
+        self.updated = updated
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище состояний FSM в SQLite с отложенной записью.
+
+    В памяти держится не более cache_size последних использованных ключей (LRU),
+    включая ключи без состояния: промежуточный слой FSM читает состояние на каждое
+    обновление. Изменения копятся и записываются пачкой раз в flush_interval секунд
+    или при накоплении flush_batch изменений, поэтому при аварийном завершении
+    теряются изменения не более чем за flush_interval.
+
+    Состояние, не изменявшееся дольше ttl секунд, считается сброшенным и удаляется из базы.
+    Данные должны сериализоваться в JSON.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        cache_size: int = 100000,
+        ttl: float = 86400,
+        flush_interval: float = 1.0,
+        flush_batch: int = 500,
+        sweep_interval: float = 600
+    ):
+        self.pool = pool
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.sweep_interval = sweep_interval
+
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        # Изменения, ещё не записанные в базу, и пачка, которая записывается сейчас
+        self._dirty: Dict[str, _Record] = {}
+        self._flushing: Dict[str, _Record] = {}
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._swept_at = time.time()
+
+        self.hits = 0
+        self.misses = 0
+        self.flushed = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'cached': len(self._cache),
+            'dirty': len(self._dirty),
+            'flushed': self.flushed,
+        }
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get(_storage_key(key))
+        self._write(_storage_key(key), state.state if isinstance(state, State) else state, record.data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get(_storage_key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._get(_storage_key(key))
+        self._write(_storage_key(key), record.state, data.copy() or None)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        data = (await self._get(_storage_key(key))).data
+        return data.copy() if data else {}
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Записывает накопленные изменения одной транзакцией; пустые состояния удаляются."""
+        if not self._dirty:
+            return 0
+
+        self._flushing, self._dirty = self._dirty, {}
+        upserts, deletes = [], []
+        for key, record in self._flushing.items():
+            if record.state is None and not record.data:
+                deletes.append((key,))
+            else:
+                data = json.dumps(record.data, ensure_ascii=False) if record.data else None
+                upserts.append((key, record.state, data, int(record.updated)))
+
+        try:
+            await self.pool.run(_save_fsm_states, upserts, deletes)
+        except Exception:
+            # Не потерять изменения: вернуть их в очередь, если ключи не изменились заново
+            for key, record in self._flushing.items():
+                self._dirty.setdefault(key, record)
+            raise
+        finally:
+            count = len(self._flushing)
+            self._flushing = {}
+
+        self.flushed += count
+        return count
+
+    async def _get(self, key: str) -> _Record:
+        record = self._cache.get(key)
+        now = time.time()
+
+        if record is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        else:
+            self.misses += 1
+            record = self._dirty.get(key) or self._flushing.get(key) or await self._load(key)
+            # Пока шло чтение, ключ мог быть изменён
+            record = self._cache.get(key) or record
+            self._remember(key, record)
+
+        if (record.state is not None or record.data) and now - record.updated > self.ttl:
+            self._write(key, None, None)
+            record = self._cache[key]
+
+        return record
+
+    async def _load(self, key: str) -> _Record:
+        row = await self.pool.run(_load_fsm_state, key)
+        if row is None:
+            return _Record(None, None, 0.0)
+
+        state, data, updated = row
+        return _Record(state, json.loads(data) if data else None, float(updated))
+
+    def _write(self, key: str, state: Optional[str], data: Optional[Dict[str, Any]]):
+        record = _Record(state, data, time.time())
+        self._remember(key, record)
+        self._dirty[key] = record
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if len(self._dirty) >= self.flush_batch:
+            self._flush_requested.set()
+
+    def _remember(self, key: str, record: _Record):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        # Вытесненные изменённые записи остаются в _dirty до записи в базу
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            try:
+                await self.flush()
+
+                if time.time() - self._swept_at >= self.sweep_interval:
+                    self._swept_at = time.time()
+                    await self._sweep()
+            except Exception as e:
+                logger.error(f"Ошибка записи состояний FSM: {e}")
+
+    async def _sweep(self, batch_size: int = 1000):
+        """Удаляет из базы состояния, не изменявшиеся дольше ttl, короткими пачками."""
+        before = int(time.time() - self.ttl)
+        removed = 0
+
+        while True:
+            deleted = await self.pool.run(_delete_expired_fsm_states, before, batch_size)
+            removed += deleted
+            if deleted < batch_size:
+                break
+            await asyncio.sleep(0)
+
+        if removed:
+            logger.info(f"Удалено {removed} устаревших состояний FSM")
@@ -0,0 +1,63 @@
+"""
+Обслуживание базы, которое не выполняется при запуске бота.
+
+vacuum - однократно перестраивает базу, созданную до архивации (миграция 8), с
+auto_vacuum=INCREMENTAL, чтобы очистка возвращала освободившееся место. Полный VACUUM
+переписывает весь файл и держит исключительную блокировку, поэтому бот должен быть остановлен.
+
+Запуск:
+    python -m database.maintenance vacuum
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+def vacuum(db_name: str) -> int:
+    from database.migrations import rebuild_for_incremental_vacuum
+
+    size_before = os.path.getsize(db_name)
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(db_name)
+    conn.isolation_level = None
+    try:
+        rebuilt = rebuild_for_incremental_vacuum(conn)
+    finally:
+        conn.close()
+
+    if not rebuilt:
+        print(f"{db_name}: auto_vacuum=INCREMENTAL уже включён, перестраивать нечего")
+        return 0
+
+    print(
+        f"{db_name}: перестроена за {time.perf_counter() - started:.1f} с, "
+        f"размер {size_before / 2**20:.1f} -> {os.path.getsize(db_name) / 2**20:.1f} МБ"
+    )
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("vacuum",))
+    parser.add_argument("--db", help="файл базы (по умолчанию DB_NAME из настроек)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.db:
+        db_name = args.db
+    else:
+        from config.settings import DB_NAME
+        db_name = DB_NAME
+
+    if not os.path.exists(db_name):
+        print(f"Файл базы {db_name} не найден")
+        return 1
+
+    return vacuum(db_name)
+
+if __name__ == "__main__":
+    sys.exit(main())
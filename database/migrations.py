@@ -0,0 +1,209 @@
+import sqlite3
+import logging
+from typing import Callable, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+# Миграции применяются строго по возрастанию версии и никогда не изменяются после выпуска:
+# любое изменение схемы добавляется новой записью в конец списка.
+MIGRATIONS: List[Tuple[int, str, Tuple[Step, ...]]] = [
+    (1, "Таблица notifications", (
+        '''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            notification_time TIMESTAMP NOT NULL,
+            job_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    )),
+    (2, "Индекс по пользователю и времени уведомления", (
+        "CREATE INDEX IF NOT EXISTS idx_notifications_user_time ON notifications (user_id, notification_time)",
+    )),
+    (3, "Индекс по времени уведомления", (
+        "CREATE INDEX IF NOT EXISTS idx_notifications_time ON notifications (notification_time)",
+    )),
+    (4, "Уникальный индекс по job_id", (
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_job_id ON notifications (job_id)",
+    )),
+    # До версии 5 сработавшие напоминания оставались в таблице до очистки: без отметки они были бы отправлены повторно.
+    # Время хранилось наивным в поясе сервера, в том же формате, что и datetime('now', 'localtime')
+    (5, "Отметка о доставке и индекс недоставленных уведомлений", (
+        "ALTER TABLE notifications ADD COLUMN delivered_at TIMESTAMP",
+        "UPDATE notifications SET delivered_at = notification_time WHERE notification_time <= datetime('now', 'localtime')",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_pending ON notifications (notification_time) WHERE delivered_at IS NULL",
+    )),
+    (6, "Таблица недоставленных сообщений", (
+        '''
+        CREATE TABLE IF NOT EXISTS dead_letters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            notification_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            error TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    )),
+    (7, "Шарды пользователей и владельцы шардов", (
+        "ALTER TABLE notifications ADD COLUMN shard INTEGER NOT NULL DEFAULT 0",
+        "DROP INDEX IF EXISTS idx_notifications_pending",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_pending ON notifications (shard, notification_time) WHERE delivered_at IS NULL",
+        '''
+        CREATE TABLE IF NOT EXISTS shard_owners (
+            shard INTEGER PRIMARY KEY,
+            pid INTEGER NOT NULL,
+            shard_count INTEGER NOT NULL,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            heartbeat_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        "CREATE TABLE IF NOT EXISTS shard_config (shard_count INTEGER NOT NULL)",
+        "INSERT INTO shard_config (shard_count) VALUES (1)",
+    )),
+    (8, "Архив доставленных и устаревших уведомлений", (
+        '''
+        CREATE TABLE IF NOT EXISTS notifications_history (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            notification_time TIMESTAMP NOT NULL,
+            job_id TEXT NOT NULL,
+            created_at TIMESTAMP,
+            delivered_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_notifications_history_user_time ON notifications_history (user_id, notification_time)",
+    )),
+    (9, "Время передачи уведомления в очередь доставки", (
+        "ALTER TABLE notifications ADD COLUMN dispatched_at TIMESTAMP",
+        "ALTER TABLE notifications_history ADD COLUMN dispatched_at TIMESTAMP",
+    )),
+    (10, "Правила повторяющихся напоминаний", (
+        "ALTER TABLE notifications ADD COLUMN recurrence TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_recurring ON notifications (shard, notification_time) WHERE recurrence IS NOT NULL",
+    )),
+    # Наивное время хранилось в поясе сервера: модификатор 'utc' переводит его по поясу машины, где идёт миграция
+    (11, "Время уведомлений в секундах UTC и часовые пояса пользователей", (
+        '''
+        UPDATE notifications SET
+            notification_time = CAST(strftime('%s', notification_time, 'utc') AS INTEGER),
+            dispatched_at = CAST(strftime('%s', dispatched_at, 'utc') AS INTEGER),
+            delivered_at = CAST(strftime('%s', delivered_at, 'utc') AS INTEGER)
+        WHERE typeof(notification_time) = 'text'
+        ''',
+        '''
+        UPDATE notifications_history SET
+            notification_time = CAST(strftime('%s', notification_time, 'utc') AS INTEGER),
+            dispatched_at = CAST(strftime('%s', dispatched_at, 'utc') AS INTEGER),
+            delivered_at = CAST(strftime('%s', delivered_at, 'utc') AS INTEGER)
+        WHERE typeof(notification_time) = 'text'
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_settings (
+            user_id INTEGER PRIMARY KEY,
+            timezone TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    )),
+    (12, "Состояния диалогов FSM", (
+        '''
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT,
+            updated_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states (updated_at)",
+    )),
+]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """Применяет недостающие миграции, каждую в своей транзакции. Возвращает итоговую версию схемы."""
+    conn.isolation_level = None
+    current_version = get_schema_version(conn)
+
+    for version, description, steps in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        conn.execute("BEGIN")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            logger.error(f"Ошибка при применении миграции {version}: {description}")
+            raise
+
+        current_version = version
+        logger.info(f"Применена миграция {version}: {description}")
+
+    return current_version
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """
+    Включает auto_vacuum=INCREMENTAL для новой базы. Уже созданную базу режим требует перестроить
+    полным VACUUM, который на большой базе занимает минуты, поэтому при запуске он не выполняется:
+    это отдельная команда обслуживания (python -m database.maintenance vacuum).
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+
+    if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0]:
+        logger.warning(
+            "База создана без auto_vacuum=INCREMENTAL: место после архивации не возвращается. "
+            "Остановите бота и выполните python -m database.maintenance vacuum"
+        )
+        return False
+
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    return True
+
+def rebuild_for_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """Перестраивает существующую базу полным VACUUM с auto_vacuum=INCREMENTAL; False - режим уже включён."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+def rebalance_shards(conn: sqlite3.Connection, shard_count: int) -> bool:
+    """Перераспределяет уведомления по шардам, если число шардов изменилось с прошлого запуска."""
+    current = conn.execute("SELECT shard_count FROM shard_config").fetchone()[0]
+    if current == shard_count:
+        return False
+
+    conn.execute("BEGIN")
+    conn.execute("UPDATE notifications SET shard = user_id % ?", (shard_count,))
+    conn.execute("UPDATE shard_config SET shard_count = ?", (shard_count,))
+    conn.execute("DELETE FROM shard_owners WHERE shard >= ?", (shard_count,))
+    conn.execute("COMMIT")
+
+    logger.info(f"Уведомления перераспределены с {current} на {shard_count} шардов")
+    return True
@@ -1,23 +1,17 @@
 import sqlite3
 import logging
 
+from database.migrations import apply_migrations, enable_incremental_vacuum, rebalance_shards
+
 logger = logging.getLogger(__name__)
 
-def init_db(db_name):
+def init_db(db_name, shard_count: int = 1):
     conn = sqlite3.connect(db_name)
-    cursor = conn.cursor()
+    conn.isolation_level = None
     
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS notifications (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        text TEXT NOT NULL,
-        notification_time TIMESTAMP NOT NULL,
-        job_id TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
+    enable_incremental_vacuum(conn)
+    version = apply_migrations(conn)
+    rebalance_shards(conn, shard_count)
     
-    conn.commit()
     conn.close()
-    logger.info("База данных инициализирована")
\ No newline at end of file
+    logger.info(f"База данных инициализирована (версия схемы {version})")
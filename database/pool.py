@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Tuple
+
+from utils.metrics import db_query_seconds, db_wait_seconds
+
+logger = logging.getLogger(__name__)
+
+class ConnectionPool:
+    """Пул долгоживущих соединений SQLite на выделенном исполнителе.
+
+    Каждый поток исполнителя владеет своим соединением, поэтому блокирующий
+    ввод-вывод не выполняется в цикле событий, а кэш подготовленных
+    выражений sqlite3 переиспользуется между вызовами.
+    """
+
+    def __init__(self, db_name: str, size: int = 4, statement_cache_size: int = 128):
+        self.db_name = db_name
+        self.size = size
+        self.statement_cache_size = statement_cache_size
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_name,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+
+        with self._lock:
+            self._connections.append(conn)
+
+        logger.debug(f"Открыто соединение с {self.db_name} в потоке {threading.current_thread().name}")
+        return conn
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _call(self, func: Callable[..., Any], args: tuple) -> Tuple[Any, float]:
+        conn = self._get_connection()
+        started = time.perf_counter()
+        try:
+            return func(conn, *args), time.perf_counter() - started
+        except Exception:
+            conn.rollback()
+            raise
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Выполняет func(conn, *args) в потоке пула и возвращает результат."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="db")
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        result, elapsed = await loop.run_in_executor(self._executor, self._call, func, args)
+
+        # Время запроса и ожидание потока пула: рост второго означает, что не хватает соединений
+        query = func.__name__.lstrip("_")
+        db_query_seconds.observe(query, elapsed)
+        db_wait_seconds.observe(query, time.perf_counter() - started - elapsed)
+
+        return result
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+        self._local = threading.local()
+        logger.info("Пул соединений с базой данных закрыт")
@@ -1,79 +1,426 @@
+import sys
+import asyncio
 import sqlite3
 import logging
 import datetime
-from typing import List, Tuple, Optional
+from collections import OrderedDict
+from typing import AsyncIterator, List, Tuple, Optional
 
-from config.settings import DB_NAME, OLD_NOTIFICATION_DAYS
+from config.settings import (
+    DB_NAME, DB_POOL_SIZE, OLD_NOTIFICATION_DAYS, SHARD_COUNT, CACHE_MAX_ROWS, CACHE_MAX_ROWS_PER_USER,
+    TIMEZONE_CACHE_SIZE, DB_WRITE_BATCH_WINDOW, DB_WRITE_BATCH_SIZE
+)
+from database.batcher import WriteBatcher
+from database.cache import ReminderCache, upcoming, previous_start
+from database.pool import ConnectionPool
+from utils.metrics import registry
+from utils.timezones import to_epoch, utc_now
 
 logger = logging.getLogger(__name__)
 
-def save_notification(user_id: int, text: str, notification_time: datetime.datetime, job_id: str) -> int:
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "INSERT INTO notifications (user_id, text, notification_time, job_id) VALUES (?, ?, ?, ?)",
-        (user_id, text, notification_time, job_id)
+def shard_for(user_id: int) -> int:
+    return user_id % SHARD_COUNT
+
+pool = ConnectionPool(DB_NAME, size=DB_POOL_SIZE)
+# Создание и удаление напоминаний из обработчиков фиксируются общими транзакциями
+writes = WriteBatcher(pool, window=DB_WRITE_BATCH_WINDOW, max_batch=DB_WRITE_BATCH_SIZE)
+cache = ReminderCache(CACHE_MAX_ROWS, CACHE_MAX_ROWS_PER_USER)
+# Часовые пояса пользователей (None - не задан); читаются при каждом создании напоминания и выводе списка
+_timezones: "OrderedDict[int, Optional[str]]" = OrderedDict()
+
+registry.counter(
+    "bot_reminder_cache_events_total", "Попадания, промахи и вытеснения кэша напоминаний",
+    lambda: {'hit': cache.hits, 'miss': cache.misses, 'eviction': cache.evictions}, label="event"
+)
+registry.gauge("bot_reminder_cache_rows", "Строки в кэше напоминаний", lambda: cache.get_stats()['rows'])
+registry.counter("bot_db_write_batches_total", "Транзакции групповой записи", lambda: writes.batches)
+registry.counter(
+    "bot_db_batched_writes_total", "Записи, прошедшие через групповую фиксацию",
+    lambda: {'ok': writes.writes - writes.failed, 'failed': writes.failed}, label="result"
+)
+registry.gauge("bot_db_writes_pending", "Записи, ожидающие групповой фиксации", lambda: writes.pending)
+
+# Тексты запросов неизменны, поэтому sqlite3 берёт их из кэша подготовленных выражений.
+# notification_time хранится в секундах UTC: все сравнения - целочисленные диапазоны по индексам
+INSERT_NOTIFICATION_SQL = "INSERT INTO notifications (user_id, text, notification_time, job_id, shard, recurrence) VALUES (?, ?, ?, ?, ?, ?)"
+SELECT_USER_NOTIFICATIONS_SQL = "SELECT id, text, notification_time, job_id, recurrence FROM notifications WHERE user_id = ? AND notification_time > ?"
+SELECT_USER_PAGE_SQL = (
+    "SELECT id, text, notification_time, job_id, recurrence FROM notifications "
+    "WHERE user_id = ? AND notification_time > ? AND (notification_time, id) >= (?, ?) "
+    "ORDER BY notification_time, id LIMIT ?"
+)
+SELECT_USER_PAGE_BEFORE_SQL = (
+    "SELECT id, notification_time FROM notifications "
+    "WHERE user_id = ? AND notification_time > ? AND (notification_time, id) < (?, ?) "
+    "ORDER BY notification_time DESC, id DESC LIMIT ?"
+)
+COUNT_USER_NOTIFICATIONS_SQL = "SELECT COUNT(*) FROM notifications WHERE user_id = ? AND notification_time > ?"
+SELECT_JOB_ID_SQL = "SELECT job_id FROM notifications WHERE id = ?"
+DELETE_NOTIFICATION_SQL = "DELETE FROM notifications WHERE id = ?"
+# Доставленные уведомления архивируются сразу, недоставленные - спустя OLD_NOTIFICATION_DAYS;
+# правила повторения не архивируются, пока их не удалит пользователь
+SELECT_ARCHIVE_BATCH_SQL = (
+    "SELECT id FROM notifications "
+    "WHERE notification_time < ? "
+    "AND (delivered_at IS NOT NULL OR (recurrence IS NULL AND notification_time < ?)) "
+    "ORDER BY notification_time LIMIT ?"
+)
+ARCHIVE_NOTIFICATION_SQL = (
+    "INSERT OR REPLACE INTO notifications_history (id, user_id, text, notification_time, job_id, created_at, dispatched_at, delivered_at) "
+    "SELECT id, user_id, text, notification_time, job_id, created_at, dispatched_at, delivered_at FROM notifications WHERE id = ?"
+)
+SELECT_PENDING_BATCH_SQL = (
+    "SELECT id, user_id, text, notification_time, job_id, recurrence FROM notifications "
+    "WHERE delivered_at IS NULL AND shard = ? AND (notification_time, id) > (?, ?) AND notification_time <= ? "
+    "ORDER BY notification_time, id LIMIT ?"
+)
+UPSERT_SHARD_OWNER_SQL = (
+    "INSERT INTO shard_owners (shard, pid, shard_count) VALUES (?, ?, ?) "
+    "ON CONFLICT (shard) DO UPDATE SET pid = excluded.pid, shard_count = excluded.shard_count, "
+    "started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP"
+)
+UPDATE_SHARD_HEARTBEAT_SQL = "UPDATE shard_owners SET heartbeat_at = CURRENT_TIMESTAMP WHERE shard = ? AND pid = ?"
+# Строка повторяющегося напоминания не отмечается доставленной: она уже перенесена на следующее срабатывание
+MARK_DELIVERED_SQL = (
+    "UPDATE notifications SET delivered_at = COALESCE(?, CAST(strftime('%s', 'now') AS INTEGER)), dispatched_at = ? "
+    "WHERE id = ? AND recurrence IS NULL"
+)
+RESCHEDULE_NOTIFICATION_SQL = "UPDATE notifications SET notification_time = ?, dispatched_at = ? WHERE id = ?"
+SELECT_STALE_RECURRING_SQL = (
+    "SELECT id, notification_time, recurrence FROM notifications "
+    "WHERE recurrence IS NOT NULL AND shard = ? AND notification_time <= ? "
+    "ORDER BY notification_time LIMIT ?"
+)
+INSERT_DEAD_LETTER_SQL = "INSERT INTO dead_letters (notification_id, user_id, error) VALUES (?, ?, ?)"
+SELECT_USER_TIMEZONE_SQL = "SELECT timezone FROM user_settings WHERE user_id = ?"
+UPSERT_USER_TIMEZONE_SQL = (
+    "INSERT INTO user_settings (user_id, timezone) VALUES (?, ?) "
+    "ON CONFLICT (user_id) DO UPDATE SET timezone = excluded.timezone, updated_at = CURRENT_TIMESTAMP"
+)
+
+# Запросы горячего пути с примерами параметров; tests/test_query_plans.py проверяет, что они идут по индексам
+HOT_QUERIES = [
+    (SELECT_USER_NOTIFICATIONS_SQL, (0, 0)),
+    (SELECT_USER_PAGE_SQL, (0, 0, 0, 0, 1)),
+    (SELECT_USER_PAGE_BEFORE_SQL, (0, 0, 0, 0, 1)),
+    (COUNT_USER_NOTIFICATIONS_SQL, (0, 0)),
+    (SELECT_JOB_ID_SQL, (0,)),
+    (DELETE_NOTIFICATION_SQL, (0,)),
+    (SELECT_ARCHIVE_BATCH_SQL, (0, 0, 1)),
+    (SELECT_PENDING_BATCH_SQL, (0, 0, 0, 0, 1)),
+    (MARK_DELIVERED_SQL, (None, None, 0)),
+    (RESCHEDULE_NOTIFICATION_SQL, (0, None, 0)),
+    (SELECT_STALE_RECURRING_SQL, (0, 0, 1)),
+    (SELECT_USER_TIMEZONE_SQL, (0,)),
+]
+
+def _now_epoch(**delta) -> int:
+    """Текущее время (со сдвигом delta) в секундах UTC - граница активных напоминаний в запросах и кэше."""
+    return to_epoch(utc_now() + datetime.timedelta(**delta))
+
+def _epoch_or_none(moment: Optional[datetime.datetime]) -> Optional[int]:
+    return to_epoch(moment) if moment is not None else None
+
+# Записи _insert_notification, _insert_notifications и _remove_notification выполняются через writes и не фиксируют транзакцию сами
+def _insert_notification(
+    conn: sqlite3.Connection, user_id: int, text: str, notification_time: datetime.datetime, job_id: str, recurrence: Optional[str]
+) -> int:
+    cursor = conn.execute(INSERT_NOTIFICATION_SQL, (user_id, text, to_epoch(notification_time), job_id, shard_for(user_id), recurrence))
+    return cursor.lastrowid
+
+def _insert_notifications(conn: sqlite3.Connection, user_id: int, items: List[Tuple]) -> List[int]:
+    shard = shard_for(user_id)
+    conn.executemany(
+        INSERT_NOTIFICATION_SQL,
+        ((user_id, text, to_epoch(notification_time), job_id, shard, recurrence) for text, notification_time, job_id, recurrence in items)
     )
-    
-    notification_id = cursor.lastrowid
+    # Транзакция держит блокировку записи, поэтому AUTOINCREMENT выдал пачке подряд идущие id
+    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    return list(range(last_id - len(items) + 1, last_id + 1))
+
+def _get_user_notifications(conn: sqlite3.Connection, user_id: int) -> List[Tuple]:
+    return conn.execute(SELECT_USER_NOTIFICATIONS_SQL, (user_id, _now_epoch())).fetchall()
+
+def _get_user_notifications_page(conn: sqlite3.Connection, user_id: int, start_time: int, start_id: int, limit: int) -> List[Tuple]:
+    return conn.execute(SELECT_USER_PAGE_SQL, (user_id, _now_epoch(), start_time, start_id, limit)).fetchall()
+
+def _get_previous_page_start(conn: sqlite3.Connection, user_id: int, before_time: int, before_id: int, limit: int) -> Optional[Tuple[int, int]]:
+    rows = conn.execute(SELECT_USER_PAGE_BEFORE_SQL, (user_id, _now_epoch(), before_time, before_id, limit)).fetchall()
+    if not rows:
+        return None
+    notification_id, notification_time = rows[-1]
+    return notification_time, notification_id
+
+def _count_user_notifications(conn: sqlite3.Connection, user_id: int) -> int:
+    return conn.execute(COUNT_USER_NOTIFICATIONS_SQL, (user_id, _now_epoch())).fetchone()[0]
+
+def _get_job_id(conn: sqlite3.Connection, notification_id: int) -> Optional[str]:
+    result = conn.execute(SELECT_JOB_ID_SQL, (notification_id,)).fetchone()
+    return result[0] if result else None
+
+def _remove_notification(conn: sqlite3.Connection, notification_id: int) -> bool:
+    cursor = conn.execute(DELETE_NOTIFICATION_SQL, (notification_id,))
+    return cursor.rowcount > 0
+
+def _archive_batch(conn: sqlite3.Connection, limit: int) -> int:
+    rows = conn.execute(SELECT_ARCHIVE_BATCH_SQL, (_now_epoch(), _now_epoch(days=-OLD_NOTIFICATION_DAYS), limit)).fetchall()
+    if not rows:
+        return 0
+
+    conn.executemany(ARCHIVE_NOTIFICATION_SQL, rows)
+    conn.executemany(DELETE_NOTIFICATION_SQL, rows)
     conn.commit()
-    conn.close()
-    
-    logger.debug(f"Сохранено уведомление {notification_id} для пользователя {user_id}")
-    return notification_id
+    return len(rows)
 
-def get_user_notifications(user_id: int) -> List[Tuple]:
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT id, text, notification_time, job_id FROM notifications WHERE user_id = ? AND notification_time > datetime('now')",
-        (user_id,)
-    )
-    
-    notifications = cursor.fetchall()
-    conn.close()
-    
-    return notifications
-
-def get_job_id(notification_id: int) -> Optional[str]:
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT job_id FROM notifications WHERE id = ?", (notification_id,))
-    result = cursor.fetchone()
-    
-    conn.close()
-    
+def _incremental_vacuum(conn: sqlite3.Connection, pages: int) -> int:
+    """Возвращает файлу до pages свободных страниц; результат - число оставшихся свободных страниц."""
+    # execute() делает один шаг прагмы и освобождает одну страницу; executescript() выполняет её до конца
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+def _get_pending_batch(conn: sqlite3.Connection, shard: int, after_time: int, after_id: int, until: int, limit: int) -> List[Tuple]:
+    return conn.execute(SELECT_PENDING_BATCH_SQL, (shard, after_time, after_id, until, limit)).fetchall()
+
+def _mark_delivered(conn: sqlite3.Connection, notification_id: int, dispatched_at, delivered_at) -> bool:
+    cursor = conn.execute(MARK_DELIVERED_SQL, (delivered_at, dispatched_at, notification_id))
+    conn.commit()
+    return cursor.rowcount > 0
+
+def _reschedule_notifications(conn: sqlite3.Connection, updates: List[Tuple[int, Optional[int], int]]):
+    conn.executemany(RESCHEDULE_NOTIFICATION_SQL, updates)
+    conn.commit()
+
+def _get_stale_recurring(conn: sqlite3.Connection, shard: int, before: int, limit: int) -> List[Tuple]:
+    return conn.execute(SELECT_STALE_RECURRING_SQL, (shard, before, limit)).fetchall()
+
+def _get_user_timezone(conn: sqlite3.Connection, user_id: int) -> Optional[str]:
+    result = conn.execute(SELECT_USER_TIMEZONE_SQL, (user_id,)).fetchone()
     return result[0] if result else None
 
-def delete_notification(notification_id: int) -> bool:
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute("DELETE FROM notifications WHERE id = ?", (notification_id,))
-    deleted = cursor.rowcount > 0
-    
+def _set_user_timezone(conn: sqlite3.Connection, user_id: int, timezone: str):
+    conn.execute(UPSERT_USER_TIMEZONE_SQL, (user_id, timezone))
+    conn.commit()
+
+def _claim_shard(conn: sqlite3.Connection, shard: int, pid: int, shard_count: int):
+    conn.execute(UPSERT_SHARD_OWNER_SQL, (shard, pid, shard_count))
+    conn.commit()
+
+def _touch_shard(conn: sqlite3.Connection, shard: int, pid: int) -> bool:
+    cursor = conn.execute(UPDATE_SHARD_HEARTBEAT_SQL, (shard, pid))
     conn.commit()
-    conn.close()
-    
+    return cursor.rowcount > 0
+
+def _save_dead_letter(conn: sqlite3.Connection, notification_id: int, user_id: int, error: str) -> int:
+    cursor = conn.execute(INSERT_DEAD_LETTER_SQL, (notification_id, user_id, error))
+    conn.commit()
+    return cursor.lastrowid
+
+async def save_notification(
+    user_id: int, text: str, notification_time: datetime.datetime, job_id: str, recurrence: Optional[str] = None
+) -> int:
+    """Сохраняет напоминание; для повторяющегося recurrence - закодированное правило, а время - первое срабатывание."""
+    notification_id = await writes.submit(_insert_notification, user_id, text, notification_time, job_id, recurrence)
+    cache.add(user_id, (notification_id, text, to_epoch(notification_time), job_id, recurrence))
+
+    logger.debug(f"Сохранено уведомление {notification_id} для пользователя {user_id}")
+    return notification_id
+
+async def save_notifications(user_id: int, items: List[Tuple[str, datetime.datetime, str, Optional[str]]]) -> List[int]:
+    """Сохраняет пачку напоминаний пользователя в одной транзакции; items - (text, notification_time, job_id, recurrence)."""
+    if not items:
+        return []
+
+    notification_ids = await writes.submit(_insert_notifications, user_id, items)
+    cache.add_many(user_id, [
+        (notification_id, text, to_epoch(notification_time), job_id, recurrence)
+        for notification_id, (text, notification_time, job_id, recurrence) in zip(notification_ids, items)
+    ])
+
+    logger.debug(f"Сохранено {len(items)} уведомлений для пользователя {user_id}")
+    return notification_ids
+
+async def get_user_notifications(user_id: int) -> List[Tuple]:
+    return await pool.run(_get_user_notifications, user_id)
+
+async def _cached_notifications(user_id: int) -> Optional[List[Tuple]]:
+    """Все активные уведомления пользователя из кэша (с загрузкой при промахе) или None, если их слишком много."""
+    rows = cache.get(user_id)
+    if rows is not None or cache.is_heavy(user_id):
+        return rows
+
+    cache.begin_load(user_id)
+    rows = await pool.run(_get_user_notifications_page, user_id, 0, 0, cache.max_rows_per_user + 1)
+    cache.finish_load(user_id, rows)
+
+    return cache.get(user_id)
+
+async def get_user_notifications_page(user_id: int, start: Optional[Tuple[int, int]], limit: int) -> Tuple[List[Tuple], Optional[Tuple[int, int]]]:
+    """
+    Возвращает страницу активных уведомлений, начиная с курсора start = (notification_time, id) включительно,
+    и курсор следующей страницы (None, если страница последняя).
+    """
+    cached = await _cached_notifications(user_id)
+    if cached is not None:
+        rows = upcoming(cached, _now_epoch(), start)[:limit + 1]
+    else:
+        start_time, start_id = start or (0, 0)
+        rows = await pool.run(_get_user_notifications_page, user_id, start_time, start_id, limit + 1)
+
+    if len(rows) > limit:
+        next_id, _, next_time, _, _ = rows[limit]
+        return rows[:limit], (next_time, next_id)
+
+    return rows, None
+
+async def get_previous_page_start(user_id: int, before: Tuple[int, int], limit: int) -> Optional[Tuple[int, int]]:
+    """Курсор начала страницы, которая заканчивается перед before."""
+    cached = await _cached_notifications(user_id)
+    if cached is not None:
+        return previous_start(cached, _now_epoch(), before, limit)
+
+    before_time, before_id = before
+    return await pool.run(_get_previous_page_start, user_id, before_time, before_id, limit)
+
+async def count_user_notifications(user_id: int) -> int:
+    cached = await _cached_notifications(user_id)
+    if cached is not None:
+        return len(upcoming(cached, _now_epoch()))
+
+    return await pool.run(_count_user_notifications, user_id)
+
+async def get_job_id(notification_id: int, user_id: Optional[int] = None) -> Optional[str]:
+    if user_id is not None:
+        row = cache.find(user_id, notification_id)
+        if row is not None:
+            return row[3]
+
+    return await pool.run(_get_job_id, notification_id)
+
+async def delete_notification(notification_id: int) -> bool:
+    deleted = await writes.submit(_remove_notification, notification_id)
+    cache.remove(notification_id)
+
     if deleted:
         logger.debug(f"Удалено уведомление {notification_id}")
-    
+
     return deleted
 
-def clean_old_notifications() -> int:
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute(f"DELETE FROM notifications WHERE notification_time < datetime('now', '-{OLD_NOTIFICATION_DAYS} days')")
-    deleted_count = cursor.rowcount
-    
-    conn.commit()
-    conn.close()
-    
-    if deleted_count > 0:
-        logger.info(f"Удалено {deleted_count} старых уведомлений")
-    
-    return deleted_count
\ No newline at end of file
+async def archive_notifications(batch_size: int, pause: float) -> int:
+    """
+    Переносит доставленные и устаревшие уведомления в notifications_history небольшими пачками.
+    Каждая пачка - отдельная короткая транзакция, между пачками цикл событий обслуживает обработчики.
+    """
+    archived = 0
+
+    while True:
+        moved = await pool.run(_archive_batch, batch_size)
+        archived += moved
+        if moved < batch_size:
+            break
+        await asyncio.sleep(pause)
+
+    cache.discard_before(_now_epoch(days=-OLD_NOTIFICATION_DAYS))
+
+    if archived > 0:
+        logger.info(f"В архив перенесено {archived} уведомлений")
+
+    return archived
+
+async def vacuum_free_pages(pages_per_step: int, pause: float) -> int:
+    """Постепенно освобождает страницы, оставшиеся после архивации (PRAGMA incremental_vacuum)."""
+    steps = 0
+    remaining = None
+
+    while True:
+        left = await pool.run(_incremental_vacuum, pages_per_step)
+        steps += 1
+        # Без auto_vacuum=INCREMENTAL прагма ничего не освобождает
+        if not left or left == remaining:
+            break
+        remaining = left
+        await asyncio.sleep(pause)
+
+    return steps
+
+async def iter_pending_notifications(shard: int, after: datetime.datetime, until: datetime.datetime, batch_size: int) -> AsyncIterator[List[Tuple]]:
+    """Отдаёт недоставленные уведомления шарда со временем в интервале (after, until] пачками по batch_size (keyset-пагинация)."""
+    # Максимальный id в курсоре исключает строки, время которых равно after
+    after_time, after_id = to_epoch(after), sys.maxsize
+    until = to_epoch(until)
+
+    while True:
+        batch = await pool.run(_get_pending_batch, shard, after_time, after_id, until, batch_size)
+        if not batch:
+            return
+
+        yield batch
+
+        if len(batch) < batch_size:
+            return
+
+        after_id, _, _, after_time, _, _ = batch[-1]
+
+async def mark_notification_delivered(
+    notification_id: int,
+    dispatched_at: Optional[datetime.datetime] = None,
+    delivered_at: Optional[datetime.datetime] = None
+) -> bool:
+    """Отмечает доставку; времена передачи в очередь и подтверждения Telegram сохраняются для анализа задержек."""
+    delivered = await pool.run(_mark_delivered, notification_id, _epoch_or_none(dispatched_at), _epoch_or_none(delivered_at))
+    if delivered:
+        cache.remove(notification_id)
+    return delivered
+
+async def reschedule_notifications(updates: List[Tuple[int, datetime.datetime, Optional[datetime.datetime]]]):
+    """Переносит повторяющиеся напоминания на следующее срабатывание одной транзакцией.
+
+    updates - (notification_id, новое время, момент передачи в очередь предыдущего срабатывания).
+    """
+    if not updates:
+        return
+
+    await pool.run(_reschedule_notifications, [
+        (to_epoch(notification_time), _epoch_or_none(dispatched_at), notification_id)
+        for notification_id, notification_time, dispatched_at in updates
+    ])
+    for notification_id, notification_time, _ in updates:
+        cache.move(notification_id, to_epoch(notification_time))
+
+async def get_stale_recurring(shard: int, before: datetime.datetime, limit: int) -> List[Tuple]:
+    """Повторяющиеся напоминания шарда, срок которых не позже before: (id, notification_time в секундах UTC, recurrence)."""
+    return await pool.run(_get_stale_recurring, shard, to_epoch(before), limit)
+
+async def get_user_timezone(user_id: int) -> Optional[str]:
+    """Часовой пояс пользователя (имя IANA или смещение "+HH:MM") или None, если он не задан."""
+    if user_id in _timezones:
+        _timezones.move_to_end(user_id)
+        return _timezones[user_id]
+
+    timezone = await pool.run(_get_user_timezone, user_id)
+    _timezones[user_id] = timezone
+    if len(_timezones) > TIMEZONE_CACHE_SIZE:
+        _timezones.popitem(last=False)
+    return timezone
+
+async def set_user_timezone(user_id: int, timezone: str):
+    await pool.run(_set_user_timezone, user_id, timezone)
+    _timezones[user_id] = timezone
+    logger.debug(f"Пользователь {user_id} выбрал часовой пояс {timezone}")
+
+async def save_dead_letter(notification_id: int, user_id: int, error: str) -> int:
+    return await pool.run(_save_dead_letter, notification_id, user_id, error)
+
+async def claim_shard(shard: int, pid: int):
+    await pool.run(_claim_shard, shard, pid, SHARD_COUNT)
+    logger.info(f"Процесс {pid} владеет шардом {shard} из {SHARD_COUNT}")
+
+async def touch_shard(shard: int, pid: int) -> bool:
+    """Обновляет отметку активности владельца; False, если шард перехватил другой процесс."""
+    return await pool.run(_touch_shard, shard, pid)
+
+async def flush_writes():
+    """Фиксирует записи, ожидающие групповой транзакции; вызывается при остановке перед close_pool."""
+    await writes.close()
+
+def close_pool():
+    pool.close()
@@ -0,0 +1,34 @@
+import logging
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from config.settings import ADMIN_IDS
+from services.lag import lag_tracker
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+LAG_REPORT_MINUTES = 15
+
+@router.message(Command("admin_lag"), F.from_user.id.in_(ADMIN_IDS))
+async def cmd_admin_lag(message: Message):
+    report = lag_tracker.report(LAG_REPORT_MINUTES)
+    
+    if not report:
+        await message.answer("Данных о задержке доставки пока нет.")
+        return
+    
+    lines = ["UTC     кол-во  очередь p50/p99   доставка p50/p95/p99/max, с"]
+    for minute, stages in report:
+        dispatch, ack = stages['dispatch'], stages['ack']
+        lines.append(
+            f"{minute:%H:%M}  {ack['count']:>6}  {dispatch['p50']:>5.2f}/{dispatch['p99']:<6.2f}"
+            f"  {ack['p50']:.2f}/{ack['p95']:.2f}/{ack['p99']:.2f}/{ack['max']:.2f}"
+        )
+    
+    await message.answer(
+        "⏱ <b>Задержка доставки напоминаний</b>\n<pre>" + "\n".join(lines) + "</pre>",
+        parse_mode="HTML"
+    )
+    logger.info(f"Администратор {message.from_user.id} запросил отчёт о задержке доставки")
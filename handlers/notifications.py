@@ -1,45 +1,120 @@
+import asyncio
 import datetime
+import html
+import io
 import logging
 import uuid
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
+from typing import Iterable, Optional, Tuple
 
-from database.repository import save_notification, get_user_notifications, delete_notification, get_job_id
-from services.scheduler import schedule_notification, cancel_notification
-from keyboards.inline import get_notifications_keyboard
+from config.settings import LIST_PAGE_SIZE, LIST_TEXT_LIMIT, IMPORT_MAX_FILE_SIZE, IMPORT_MAX_LINES, IMPORT_REPORT_LINES
+from database.repository import (
+    save_notification, save_notifications, delete_notification, get_job_id,
+    get_user_notifications_page, get_previous_page_start, count_user_notifications, get_user_timezone
+)
+from services.scheduler import schedule_notification, schedule_notifications, cancel_notification
+from keyboards.inline import get_notifications_keyboard, decode_cursor, Cursor
 from nlp.time_parser import TimeParser
+from nlp.recurrence import RecurrenceParser, Recurrence
+from nlp.importer import ReminderImporter, ImportResult, IMPORT_EXTENSIONS
 from nlp.intent_recognizer import IntentRecognizer
+from utils.timezones import default_zone_name, describe_zone, from_epoch, get_zone, utc_now
+from utils.metrics import registry
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 time_parser = TimeParser()
+recurrence_parser = RecurrenceParser()
+
+# Разбор длинного импорта периодически уступает цикл событий другим обработчикам
+IMPORT_YIELD_EVERY = 500
 intent_recognizer = IntentRecognizer()
 
+def _intent_cache_events():
+    stats = intent_recognizer.cache_stats()
+    return {'hit': stats['hits'], 'miss': stats['misses']}
+
+registry.counter(
+    "bot_intent_cache_events_total", "Попадания и промахи кэша распознавания намерений", _intent_cache_events, label="event"
+)
+registry.gauge("bot_intent_cache_entries", "Записи в кэше распознавания намерений", lambda: intent_recognizer.cache_stats()['size'])
+
+async def get_user_zone(user_id: int) -> Tuple[Optional[str], str]:
+    """Сохранённый пояс пользователя (None - не задан) и пояс, по которому понимается его время."""
+    zone = await get_user_timezone(user_id)
+    return zone, zone or default_zone_name()
+
 @router.message(Command("list"))
 async def cmd_list(message: Message):
     await show_notifications_list(message)
 
 @router.callback_query(F.data.startswith("delete_"))
 async def process_delete_callback(callback: CallbackQuery):
-    notification_id = int(callback.data.split("_")[1])
+    # delete_<id> или delete_<id>_<курсор текущей страницы>
+    _, notification_id, *page = callback.data.split("_", 2)
+    notification_id = int(notification_id)
+    offset, start = decode_cursor(page[0]) if page else (0, None)
     
-    job_id = get_job_id(notification_id)
+    job_id = await get_job_id(notification_id, callback.from_user.id)
     
-    if job_id and delete_notification(notification_id):
+    if job_id and await delete_notification(notification_id):
         cancel_notification(job_id)
         
         await callback.answer("Уведомление удалено!")
         logger.info(f"Пользователь {callback.from_user.id} удалил уведомление {notification_id}")
         
-        await update_notifications_list(callback)
+        await update_notifications_list(callback, start, offset)
     else:
         await callback.answer("Ошибка при удалении уведомления.")
         logger.error(f"Ошибка при удалении уведомления {notification_id}")
 
+@router.callback_query(F.data.startswith("list_"))
+async def process_list_page_callback(callback: CallbackQuery):
+    offset, start = decode_cursor(callback.data.split("_", 1)[1])
+    
+    await update_notifications_list(callback, start, offset)
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("listprev_"))
+async def process_list_previous_callback(callback: CallbackQuery):
+    offset, before = decode_cursor(callback.data.split("_", 1)[1])
+    start = await get_previous_page_start(callback.from_user.id, before, LIST_PAGE_SIZE)
+    
+    await update_notifications_list(callback, start, max(0, offset - LIST_PAGE_SIZE))
+    await callback.answer()
+
+@router.message(F.document)
+async def process_import_file(message: Message):
+    document = message.document
+    filename = document.file_name or ""
+    
+    if not filename.lower().endswith(IMPORT_EXTENSIONS):
+        await message.answer("📎 Для импорта пришлите файл .txt, .csv или .ics: по одному напоминанию на строку или событие.")
+        return
+    
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        await message.answer(f"⚠️ Файл слишком большой, максимум {IMPORT_MAX_FILE_SIZE // 1024} КБ.")
+        return
+    
+    buffer = await message.bot.download(document)
+    lines = io.TextIOWrapper(buffer, encoding="utf-8-sig", errors="replace", newline="")
+    
+    _, zone = await get_user_zone(message.from_user.id)
+    importer = ReminderImporter(time_parser, recurrence_parser, zone=zone)
+    await import_notifications(message, importer.iter_file(filename, lines))
+
 @router.message()
 async def process_natural_language(message: Message):
+    if "\n" in message.text.strip():
+        # Несколько строк - несколько напоминаний
+        _, zone = await get_user_zone(message.from_user.id)
+        importer = ReminderImporter(time_parser, recurrence_parser, zone=zone)
+        await import_notifications(message, importer.iter_lines(message.text.splitlines()))
+        return
+    
     intent = intent_recognizer.recognize_intent(message.text)
     
     if not intent:
@@ -56,18 +131,28 @@ async def process_natural_language(message: Message):
         return
     
     if intent['intent'] == 'create_reminder':
-        parsed_data = time_parser.parse_time(intent['text'])
+        # Время в сообщении понимается в поясе пользователя
+        saved_zone, zone = await get_user_zone(message.from_user.id)
+        now = datetime.datetime.now(get_zone(zone))
+        
+        recurring = recurrence_parser.parse(intent['text'], now, zone)
+        if recurring:
+            rule, notification_time, notification_text = recurring
+            await create_notification(message, notification_text, notification_time, rule, saved_zone)
+            return
+        
+        parsed_data = time_parser.parse_time(intent['text'], now)
         
         if parsed_data:
             notification_time, notification_text = parsed_data
             
-            if notification_time <= datetime.datetime.now():
+            if notification_time <= now:
                 await message.answer(
                     "⚠️ Я не могу создать напоминание на прошедшее время."
                 )
                 return
             
-            await create_notification(message, notification_text, notification_time)
+            await create_notification(message, notification_text, notification_time, zone=saved_zone)
         else:
             await message.answer(
                 "⏰ Не смог определить время. "
@@ -78,16 +163,25 @@ async def process_natural_language(message: Message):
         await show_notifications_list(message)
     
     elif intent['intent'] == 'cancel_reminder':
-        await show_notifications_list(message, "Выберите напоминание для удаления:")
+        await show_notifications_list(message, "Выберите напоминание для удаления:\n\n")
 
-async def create_notification(message: Message, notification_text: str, notification_time: datetime.datetime):
+async def create_notification(
+    message: Message,
+    notification_text: str,
+    notification_time: datetime.datetime,
+    rule: Optional[Recurrence] = None,
+    zone: Optional[str] = None
+):
+    """notification_time - время с поясом пользователя; zone - сохранённый пояс (None - подсказать /timezone)."""
     job_id = f"notification_{message.from_user.id}_{str(uuid.uuid4())[:8]}"
+    recurrence = rule.encode() if rule else None
     
-    notification_id = save_notification(
+    notification_id = await save_notification(
         message.from_user.id,
         notification_text,
         notification_time,
-        job_id
+        job_id,
+        recurrence
     )
     
     schedule_notification(
@@ -95,61 +189,149 @@ async def create_notification(message: Message, notification_text: str, notifica
         notification_text,
         notification_time,
         notification_id,
-        job_id
+        job_id,
+        recurrence
     )
     
-    time_delta = notification_time - datetime.datetime.now()
-    minutes = int(time_delta.total_seconds() / 60)
-    hours = minutes // 60
-    minutes = minutes % 60
-    
     time_str = notification_time.strftime("%d.%m.%Y %H:%M:%S")
-    
-    if hours > 0 and minutes > 0:
-        time_left = f"через {hours} ч {minutes} мин"
-    elif hours > 0:
-        time_left = f"через {hours} ч"
-    else:
-        time_left = f"через {minutes} мин"
+    time_left = format_time_left(notification_time)
+    repeat = f"\n🔁 {rule.describe()}, ближайшее" if rule else ""
+    hint = "" if zone else f"\n\n🌍 Время по поясу {describe_zone()}. Другой пояс: /timezone"
     
     await message.answer(
         f"✅ Напоминание создано!\n\n"
-        f"📝 <b>{notification_text}</b>\n"
-        f"⏰ {time_str} ({time_left})",
+        f"📝 <b>{html.escape(notification_text)}</b>{repeat}\n"
+        f"⏰ {time_str} ({time_left}){hint}",
         parse_mode="HTML"
     )
     
     logger.info(f"Пользователь {message.from_user.id} создал уведомление {notification_id} на {time_str}")
 
-async def show_notifications_list(message: Message, header_text: str = None):
-    notifications = get_user_notifications(message.from_user.id)
+async def import_notifications(message: Message, results: Iterable[ImportResult]):
+    """Создаёт напоминания из разобранных строк одной транзакцией и отвечает одной сводкой."""
+    user_id = message.from_user.id
+    reminders, failed = [], []
+    processed = 0
+    truncated = False
+    
+    for number, source, reminder in results:
+        if processed == IMPORT_MAX_LINES:
+            truncated = True
+            break
+        
+        processed += 1
+        if reminder:
+            reminders.append(reminder)
+        else:
+            failed.append((number, source))
+        
+        if processed % IMPORT_YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+    
+    if reminders:
+        items = [
+            (reminder.text, reminder.time, f"notification_{user_id}_{uuid.uuid4().hex}", reminder.rule.encode() if reminder.rule else None)
+            for reminder in reminders
+        ]
+        notification_ids = await save_notifications(user_id, items)
+        schedule_notifications(user_id, [
+            (text, notification_time, notification_id, job_id, recurrence)
+            for notification_id, (text, notification_time, job_id, recurrence) in zip(notification_ids, items)
+        ])
+    
+    await message.answer(format_import_report(reminders, failed, truncated), parse_mode="HTML")
+    
+    logger.info(f"Пользователь {user_id} импортировал {len(reminders)} уведомлений, не распознано {len(failed)} строк")
+
+def format_import_report(reminders: list, failed: list, truncated: bool) -> str:
+    if reminders:
+        text = f"✅ Создано напоминаний: {len(reminders)}\n"
+        nearest = min(reminder.time for reminder in reminders)
+        text += f"⏰ Ближайшее: {nearest.strftime('%d.%m.%Y %H:%M')} ({format_time_left(nearest)})\n"
+    else:
+        text = "⏰ Не удалось распознать ни одного напоминания.\n"
+    
+    if truncated:
+        text += f"\n⚠️ Обработаны только первые {IMPORT_MAX_LINES} строк.\n"
+    
+    if failed:
+        text += f"\n❓ Не распознано строк: {len(failed)}\n"
+        for number, source in failed[:IMPORT_REPORT_LINES]:
+            if len(source) > 100:
+                source = source[:100] + "…"
+            text += f"{number}. <i>{html.escape(source)}</i>\n"
+        if len(failed) > IMPORT_REPORT_LINES:
+            text += f"… и ещё {len(failed) - IMPORT_REPORT_LINES}\n"
+    
+    return text
+
+def format_time_left(time_obj: datetime.datetime) -> str:
+    time_delta = time_obj - utc_now()
+    minutes = int(time_delta.total_seconds() / 60)
+    hours = minutes // 60
+    minutes = minutes % 60
+    
+    if hours > 0 and minutes > 0:
+        return f"через {hours} ч {minutes} мин"
+    elif hours > 0:
+        return f"через {hours} ч"
+    else:
+        return f"через {minutes} мин"
+
+async def render_notifications_page(user_id: int, start: Optional[Cursor] = None, offset: int = 0, header_text: str = None):
+    """Возвращает текст и клавиатуру страницы списка, начинающейся с курсора start, или None, если список пуст."""
+    notifications, next_page = await get_user_notifications_page(user_id, start, LIST_PAGE_SIZE)
+    
+    if not notifications and start:
+        # Страница опустела (например, удалено последнее напоминание на ней) - показываем предыдущую
+        start = await get_previous_page_start(user_id, start, LIST_PAGE_SIZE)
+        offset = max(0, offset - LIST_PAGE_SIZE)
+        notifications, next_page = await get_user_notifications_page(user_id, start, LIST_PAGE_SIZE)
     
     if not notifications:
-        await message.answer("У вас нет активных напоминаний.")
-        logger.debug(f"Пользователь {message.from_user.id} запросил список напоминаний (пусто)")
-        return
+        return None
+    
+    total = await count_user_notifications(user_id)
+    zone = get_zone(await get_user_timezone(user_id))
     
     text = header_text or "📋 <b>Ваши активные напоминания:</b>\n\n"
     
-    for idx, (notification_id, notification_text, notification_time, _) in enumerate(notifications, start=1):
-        time_obj = datetime.datetime.fromisoformat(notification_time)
+    for idx, (notification_id, notification_text, notification_time, _, recurrence) in enumerate(notifications, start=offset + 1):
+        time_obj = from_epoch(notification_time).astimezone(zone)
         time_str = time_obj.strftime("%d.%m.%Y %H:%M")
-
-        time_delta = time_obj - datetime.datetime.now()
-        minutes = int(time_delta.total_seconds() / 60)
-        hours = minutes // 60
-        minutes = minutes % 60
         
-        if hours > 0 and minutes > 0:
-            time_left = f"через {hours} ч {minutes} мин"
-        elif hours > 0:
-            time_left = f"через {hours} ч"
-        else:
-            time_left = f"через {minutes} мин"
+        if len(notification_text) > LIST_TEXT_LIMIT:
+            notification_text = notification_text[:LIST_TEXT_LIMIT] + "…"
         
-        text += f"{idx}. <b>{notification_text}</b>\n⏰ {time_str} ({time_left})\n\n"
+        text += f"{idx}. <b>{html.escape(notification_text)}</b>\n⏰ {time_str} ({format_time_left(time_obj)})\n"
+        if recurrence:
+            text += f"🔁 {Recurrence.decode(recurrence).describe()}\n"
+        text += "\n"
     
-    keyboard = get_notifications_keyboard(notifications)
+    if total > LIST_PAGE_SIZE:
+        pages = (total + LIST_PAGE_SIZE - 1) // LIST_PAGE_SIZE
+        text += f"Страница {offset // LIST_PAGE_SIZE + 1} из {pages} (всего {total})"
+    
+    page_start = (notifications[0][2], notifications[0][0])
+    keyboard = get_notifications_keyboard(
+        notifications,
+        offset=offset,
+        page_start=page_start,
+        has_previous=offset > 0,
+        next_page=next_page
+    )
+    
+    return text, keyboard
+
+async def show_notifications_list(message: Message, header_text: str = None):
+    page = await render_notifications_page(message.from_user.id, header_text=header_text)
+    
+    if not page:
+        await message.answer("У вас нет активных напоминаний.")
+        logger.debug(f"Пользователь {message.from_user.id} запросил список напоминаний (пусто)")
+        return
+    
+    text, keyboard = page
     
     await message.answer(
         text,
@@ -157,39 +339,19 @@ async def show_notifications_list(message: Message, header_text: str = None):
         parse_mode="HTML"
     )
     
-    logger.debug(f"Пользователь {message.from_user.id} просмотрел список напоминаний ({len(notifications)} шт.)")
+    logger.debug(f"Пользователь {message.from_user.id} просмотрел список напоминаний")
 
-async def update_notifications_list(callback: CallbackQuery):
-    notifications = get_user_notifications(callback.from_user.id)
+async def update_notifications_list(callback: CallbackQuery, start: Optional[Cursor] = None, offset: int = 0):
+    page = await render_notifications_page(callback.from_user.id, start, offset)
     
-    if not notifications:
+    if not page:
         await callback.message.edit_text("У вас нет активных напоминаний.")
         return
     
-    text = "📋 <b>Ваши активные напоминания:</b>\n\n"
-    
-    for idx, (notification_id, notification_text, notification_time, _) in enumerate(notifications, start=1):
-        time_obj = datetime.datetime.fromisoformat(notification_time)
-        time_str = time_obj.strftime("%d.%m.%Y %H:%M")
-
-        time_delta = time_obj - datetime.datetime.now()
-        minutes = int(time_delta.total_seconds() / 60)
-        hours = minutes // 60
-        minutes = minutes % 60
-        
-        if hours > 0 and minutes > 0:
-            time_left = f"через {hours} ч {minutes} мин"
-        elif hours > 0:
-            time_left = f"через {hours} ч"
-        else:
-            time_left = f"через {minutes} мин"
-        
-        text += f"{idx}. <b>{notification_text}</b>\n⏰ {time_str} ({time_left})\n\n"
-    
-    keyboard = get_notifications_keyboard(notifications)
+    text, keyboard = page
     
     await callback.message.edit_text(
         text,
         reply_markup=keyboard,
         parse_mode="HTML"
-    )
\ No newline at end of file
+    )
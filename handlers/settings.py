@@ -0,0 +1,56 @@
+import logging
+import re
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from database.repository import get_user_timezone, set_user_timezone
+from utils.timezones import describe_zone, get_zone, normalize_zone, utc_now, zone_from_local_time
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+_CLOCK_RE = re.compile(r'(\d{1,2})[:.](\d{2})')
+
+@router.message(Command("timezone"))
+async def cmd_timezone(message: Message, command: CommandObject):
+    argument = (command.args or "").strip()
+
+    if not argument:
+        current = await get_user_timezone(message.from_user.id)
+        default = "" if current else " (по умолчанию)"
+
+        await message.answer(
+            f"🌍 Ваш часовой пояс: <b>{describe_zone(current)}</b>{default}\n\n"
+            f"Чтобы изменить, укажите пояс или сколько у вас сейчас времени:\n"
+            f"- <i>/timezone Europe/Moscow</i>\n"
+            f"- <i>/timezone +5</i>\n"
+            f"- <i>/timezone 14:35</i>",
+            parse_mode="HTML"
+        )
+        return
+
+    clock = _CLOCK_RE.fullmatch(argument)
+    if clock:
+        # Пояс по текущему времени пользователя: смещение от UTC с точностью до 15 минут
+        hour, minute = int(clock.group(1)), int(clock.group(2))
+        zone = zone_from_local_time(hour, minute) if hour <= 23 and minute <= 59 else None
+    else:
+        zone = normalize_zone(argument)
+
+    if zone is None:
+        await message.answer(
+            "⚠️ Не удалось распознать часовой пояс. "
+            "Укажите название (Europe/Moscow), смещение (+3) или текущее время (14:35)."
+        )
+        return
+
+    await set_user_timezone(message.from_user.id, zone)
+    local_time = utc_now().astimezone(get_zone(zone))
+
+    await message.answer(
+        f"✅ Часовой пояс: <b>{describe_zone(zone)}</b>\n"
+        f"Сейчас у вас {local_time:%H:%M}. Новые напоминания будут создаваться по этому времени.",
+        parse_mode="HTML"
+    )
+    logger.info(f"Пользователь {message.from_user.id} установил часовой пояс {zone}")
@@ -18,7 +18,8 @@ async def cmd_start(message: Message):
         f"- <i>В 18:30 встреча с другом</i>\n"
         f"- <i>Завтра в 10:00 отправить отчет</i>\n\n"
         f"Также доступна команда:\n"
-        f"<b>/list</b> - покажет активные напоминания\n",
+        f"<b>/list</b> - покажет активные напоминания\n"
+        f"<b>/timezone</b> - часовой пояс, по которому понимается время\n",
         parse_mode="HTML"
     )
     logger.info(f"Пользователь {message.from_user.id} ({user_name}) запустил бота")
\ No newline at end of file
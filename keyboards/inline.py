@@ -1,15 +1,47 @@
+import datetime
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-def get_notifications_keyboard(notifications: List[Tuple]):
+from utils.timezones import to_epoch
+
+# Курсор страницы (notification_time в секундах UTC, id) передаётся в callback_data, лимит которой - 64 байта
+Cursor = Tuple[int, int]
+
+def encode_cursor(offset: int, cursor: Cursor) -> str:
+    notification_time, notification_id = cursor
+    return f"{offset}_{notification_id}_{notification_time}"
+
+def decode_cursor(data: str) -> Tuple[int, Cursor]:
+    offset, notification_id, notification_time = data.split("_", 2)
+    if not notification_time.isdigit():
+        # Кнопки сообщений, отправленных до перехода на секунды UTC, содержат время текстом
+        return int(offset), (to_epoch(datetime.datetime.fromisoformat(notification_time)), int(notification_id))
+    return int(offset), (int(notification_time), int(notification_id))
+
+def get_notifications_keyboard(
+    notifications: List[Tuple],
+    offset: int = 0,
+    page_start: Optional[Cursor] = None,
+    has_previous: bool = False,
+    next_page: Optional[Cursor] = None
+):
     keyboard = InlineKeyboardBuilder()
+    page = f"_{encode_cursor(offset, page_start)}" if page_start else ""
     
-    for idx, (notification_id, _, _, _) in enumerate(notifications, start=1):
+    for idx, (notification_id, _, _, _, _) in enumerate(notifications, start=offset + 1):
         keyboard.button(
             text=f"❌ Удалить #{idx}", 
-            callback_data=f"delete_{notification_id}"
+            callback_data=f"delete_{notification_id}{page}"
         )
     
-    keyboard.adjust(1)
+    navigation = 0
+    if has_previous and page_start:
+        keyboard.button(text="⬅️ Назад", callback_data=f"listprev_{encode_cursor(offset, page_start)}")
+        navigation += 1
+    if next_page:
+        keyboard.button(text="Вперёд ➡️", callback_data=f"list_{encode_cursor(offset + len(notifications), next_page)}")
+        navigation += 1
+    
+    keyboard.adjust(*([1] * len(notifications)), *([navigation] if navigation else []))
     
-    return keyboard.as_markup()
\ No newline at end of file
+    return keyboard.as_markup()
@@ -0,0 +1,3 @@
+from loadtest.harness import main
+
+raise SystemExit(main())
@@ -0,0 +1,92 @@
+"""
+Бенчмарк HTTP-сессий бота против локального тестового Bot API.
+
+Сравниваются две схемы:
+  раздельные - как раньше: у polling-бота и у рассылки по своей AiohttpSession со
+               стандартными настройками, сессия рассылки при остановке не закрывается;
+  общая      - одна TelegramSession с настройками из config.settings, которую владелец
+               закрывает после остановки очереди доставки.
+
+Ответы пользователям и рассылка идут параллельно двумя волнами с паузой между ними
+(пауза длиннее стандартного keep-alive aiohttp в 15 секунд). Измеряются отправки в секунду,
+число открытых за прогон TCP-соединений и число соединений, оставшихся открытыми
+после остановки бота.
+
+Запуск:
+    python -m loadtest.benchmark
+    python -m loadtest.benchmark --messages 20000 --latency 0.05 --pause 20
+"""
+import argparse
+import asyncio
+import os
+import time
+
+async def _wave(bots, messages: int, concurrency: int) -> float:
+    """Отправляет messages сообщений поровну через bots: ответы (первый бот) и рассылка (последний)."""
+    semaphores = [asyncio.Semaphore(concurrency) for _ in bots]
+
+    async def send(index: int):
+        role = index % 2
+        async with semaphores[role]:
+            await bots[role].send_message(index + 1, f"Сообщение {index}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(index) for index in range(messages)))
+    return messages / (time.perf_counter() - started)
+
+async def run(shared: bool, port: int, messages: int, waves: int, pause: float, concurrency: int, latency: float) -> dict:
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from loadtest.fake_api import FakeBotAPI, FaultProfile
+
+    api = FakeBotAPI(FaultProfile(latency=latency))
+    url = await api.start(port=port)
+
+    if shared:
+        from utils.telegram import create_bot
+        bot = create_bot()
+        bots = [bot, bot]
+    else:
+        server = TelegramAPIServer.from_base(url)
+        bots = [Bot(token=os.environ["BOT_TOKEN"], session=AiohttpSession(api=server)) for _ in range(2)]
+
+    rates = []
+    for wave in range(waves):
+        if wave:
+            await asyncio.sleep(pause)
+        rates.append(await _wave(bots, messages, concurrency))
+
+    # Раньше закрывалась только сессия polling-бота (start_polling), сессия рассылки оставалась открытой
+    await bots[0].session.close()
+    await asyncio.sleep(0.1)
+    report = {'rates': rates, 'opened': api.connections_opened, 'open': api.connections_open}
+
+    await bots[-1].session.close()
+    await api.stop()
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10_000, help="сообщений в волне")
+    parser.add_argument("--waves", type=int, default=2)
+    parser.add_argument("--pause", type=float, default=20.0, help="пауза между волнами, с")
+    parser.add_argument("--concurrency", type=int, default=50, help="одновременных отправок ответов и рассылки")
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка ответа Bot API, с")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args(argv)
+
+    # Настройки читаются при импорте config.settings, поэтому адрес API задаётся до него
+    os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{args.port}"
+
+    print(f"{'сессии':<11} {'отправок/с по волнам':>24} {'соединений открыто':>19} {'открыто после остановки':>24}")
+    for shared, title in ((False, "раздельные"), (True, "общая")):
+        report = asyncio.run(run(shared, args.port, args.messages, args.waves, args.pause, args.concurrency, args.latency))
+        rates = " / ".join(f"{rate:,.0f}" for rate in report['rates'])
+        print(f"{title:<11} {rates:>24} {report['opened']:>19} {report['open']:>24}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,288 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import ClientError, ClientSession, web
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Reminder load test", "username": "reminder_loadtest_bot"}
+
+# Методы, на которые действуют задержка и внесённые ошибки; getUpdates отвечает без помех
+OUTGOING_METHODS = {"sendMessage", "editMessageText", "answerCallbackQuery"}
+
+@dataclass
+class ApiCall:
+    method: str
+    chat_id: Optional[int]
+    params: Dict[str, Any]
+    # time.monotonic() получения запроса и отправки ответа
+    received: float
+    answered: float = 0.0
+    # 200, 429 или код внесённой ошибки
+    status: int = 200
+    result: Any = None
+
+    @property
+    def text(self) -> str:
+        return self.params.get("text", "")
+
+@dataclass
+class FaultProfile:
+    """Задержка ответа и доля ответов 429 и 5xx для исходящих методов."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_limit: float = 0.0
+    retry_after: int = 1
+    error_rate: float = 0.0
+    # Лимит исходящих сообщений в секунду, как у Telegram (0 - без лимита): превышение - 429
+    global_rate: float = 0.0
+    seed: Optional[int] = None
+    _random: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+
+    def delay(self) -> float:
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def roll(self) -> int:
+        value = self._random.random()
+        if value < self.rate_limit:
+            return 429
+        if value < self.rate_limit + self.error_rate:
+            return 500
+        return 200
+
+class FakeBotAPI:
+    """Локальная замена Bot API на aiohttp для нагрузочных тестов.
+
+    Обслуживает getUpdates (long polling из очереди, которую наполняет push_update),
+    sendMessage, editMessageText и answerCallbackQuery, а также служебные getMe,
+    setWebhook и deleteWebhook. Каждый вызов записывается в calls и передаётся в on_call.
+    После setWebhook апдейты из очереди отправляются POST-запросами на адрес вебхука
+    (не больше max_connections одновременно, неудачные - повторно), как это делает Telegram.
+    """
+
+    def __init__(self, faults: Optional[FaultProfile] = None, on_call: Optional[Callable[[ApiCall], None]] = None):
+        self.faults = faults or FaultProfile()
+        self.on_call = on_call
+        self.calls: List[ApiCall] = []
+        self.stats: Dict[str, int] = {}
+
+        self._updates: List[Dict[str, Any]] = []
+        self._next_update_id = 1
+        self._new_updates = asyncio.Event()
+        self._polled = asyncio.Event()
+        self._message_ids: Dict[int, int] = {}
+        # Начало текущей секунды и число сообщений в ней для global_rate
+        self._window = (0, 0)
+        self._runner: Optional[web.AppRunner] = None
+        # Транспорты всех клиентских соединений: сколько открыто за всё время и сколько открыто сейчас
+        self._transports = set()
+
+        self.webhook_url: Optional[str] = None
+        self.webhook_deliveries = 0
+        self.webhook_failures = 0
+        self._webhook_secret: Optional[str] = None
+        self._webhook_connections = 40
+        self._webhook_task: Optional[asyncio.Task] = None
+
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self._handle)
+
+    @property
+    def connections_opened(self) -> int:
+        return len(self._transports)
+
+    @property
+    def connections_open(self) -> int:
+        return sum(1 for transport in self._transports if not transport.is_closing())
+
+    def push_update(self, update: Dict[str, Any]) -> int:
+        update_id = self._next_update_id
+        self._next_update_id += 1
+        self._updates.append({"update_id": update_id, **update})
+        self._new_updates.set()
+        return update_id
+
+    async def wait_polling(self, timeout: float):
+        """Ждёт первого getUpdates или setWebhook: бот запущен и принимает апдейты."""
+        await asyncio.wait_for(self._polled.wait(), timeout)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"Тестовый Bot API слушает {host}:{port}")
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        self._stop_webhook()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.transport is not None:
+            self._transports.add(request.transport)
+        params = dict(await request.post())
+        for key in ("reply_markup", "allowed_updates"):
+            if key in params:
+                params[key] = json.loads(params[key])
+
+        chat_id = params.get("chat_id")
+        call = ApiCall(method, int(chat_id) if chat_id else None, params, time.monotonic())
+        self.stats[method] = self.stats.get(method, 0) + 1
+
+        if method == "getUpdates":
+            body = await self._get_updates(params)
+        elif method in OUTGOING_METHODS:
+            delay = self.faults.delay()
+            if delay:
+                await asyncio.sleep(delay)
+            call.status = self._rate_limited() or self.faults.roll()
+            body = self._error(call.status) if call.status != 200 else self._reply(call)
+        elif method == "getMe":
+            body = {"ok": True, "result": BOT_USER}
+        elif method == "setWebhook":
+            self._set_webhook(params)
+            body = {"ok": True, "result": True}
+        elif method in ("deleteWebhook", "setMyCommands", "close"):
+            if method == "deleteWebhook":
+                self._stop_webhook()
+            body = {"ok": True, "result": True}
+        else:
+            call.status = 404
+            body = {"ok": False, "error_code": 404, "description": "Not Found: method not found"}
+
+        call.answered = time.monotonic()
+        call.result = body.get("result")
+        if method != "getUpdates":
+            self.calls.append(call)
+            if self.on_call:
+                self.on_call(call)
+
+        return web.json_response(body, status=call.status)
+
+    async def _get_updates(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        self._polled.set()
+
+        offset = int(params.get("offset", 0))
+        if offset:
+            # Апдейты до offset подтверждены ботом
+            self._updates = [update for update in self._updates if update["update_id"] >= offset]
+
+        if not self._updates:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), float(params.get("timeout", 0)))
+            except asyncio.TimeoutError:
+                pass
+
+        limit = int(params.get("limit", 100))
+        return {"ok": True, "result": self._updates[:limit]}
+
+    def _set_webhook(self, params: Dict[str, Any]):
+        self._stop_webhook()
+        self.webhook_url = params["url"]
+        self._webhook_secret = params.get("secret_token")
+        self._webhook_connections = int(params.get("max_connections", 40))
+        self._webhook_task = asyncio.create_task(self._deliver_webhook())
+        self._polled.set()
+
+    def _stop_webhook(self):
+        self.webhook_url = None
+        if self._webhook_task:
+            self._webhook_task.cancel()
+            self._webhook_task = None
+
+    async def _deliver_webhook(self):
+        connections = asyncio.Semaphore(self._webhook_connections)
+        headers = {"X-Telegram-Bot-Api-Secret-Token": self._webhook_secret} if self._webhook_secret else {}
+        posts = set()
+
+        async def post(session: ClientSession, update: Dict[str, Any]):
+            try:
+                async with session.post(self.webhook_url, json=update, headers=headers) as response:
+                    await response.read()
+                    delivered = response.status == 200
+            except ClientError:
+                delivered = False
+            finally:
+                connections.release()
+
+            if delivered:
+                self.webhook_deliveries += 1
+                return
+            # Telegram повторяет недоставленный апдейт позже
+            self.webhook_failures += 1
+            await asyncio.sleep(0.5)
+            self._updates.append(update)
+            self._new_updates.set()
+
+        async with ClientSession() as session:
+            try:
+                while True:
+                    if not self._updates:
+                        self._new_updates.clear()
+                        await self._new_updates.wait()
+                        continue
+
+                    await connections.acquire()
+                    task = asyncio.create_task(post(session, self._updates.pop(0)))
+                    posts.add(task)
+                    task.add_done_callback(posts.discard)
+            finally:
+                for task in posts:
+                    task.cancel()
+
+    def _rate_limited(self) -> int:
+        if not self.faults.global_rate:
+            return 0
+
+        second = int(time.monotonic())
+        start, count = self._window
+        count = count + 1 if start == second else 1
+        self._window = (second, count)
+        return 429 if count > self.faults.global_rate else 0
+
+    def _error(self, status: int) -> Dict[str, Any]:
+        if status == 429:
+            retry_after = self.faults.retry_after
+            return {
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            }
+        return {"ok": False, "error_code": status, "description": "Internal Server Error"}
+
+    def _reply(self, call: ApiCall) -> Dict[str, Any]:
+        if call.method == "answerCallbackQuery":
+            return {"ok": True, "result": True}
+
+        if call.method == "editMessageText":
+            message_id = int(call.params["message_id"])
+        else:
+            message_id = self._message_ids.get(call.chat_id, 0) + 1
+            self._message_ids[call.chat_id] = message_id
+
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": call.chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": call.text,
+        }
+        if "reply_markup" in call.params:
+            message["reply_markup"] = call.params["reply_markup"]
+        return {"ok": True, "result": message}
@@ -0,0 +1,411 @@
+"""
+Сквозной нагрузочный тест: бот запускается отдельным процессом (python bot.py)
+против локального тестового Bot API (loadtest.fake_api), синтетические пользователи
+(loadtest.population) создают, просматривают и удаляют напоминания.
+
+Запросы поступают с заданной средней частотой (пуассоновский поток), запросы одного
+пользователя - по очереди, следующий не раньше чем через think секунд после ответа
+на предыдущий: иначе самые активные пользователи упираются в ограничение частоты
+(middlewares.throttling), и бот молча отбрасывает их сообщения. Напоминания создаются
+на ближайшие минуты и срабатывают во время теста; после окончания потока запросов
+тест ждёт последних срабатываний.
+
+Отчёт: пропускная способность, перцентили задержки ответа по видам запросов,
+потерянные ответы, задержка срабатываний и потерянные напоминания, а также число
+запросов к базе на апдейт (по метрикам бота, вместе с фоновыми запросами рассылки).
+--compare повторяет прогон на свежей базе с другими переменными окружения бота и
+выводит сводку по всем прогонам.
+
+Запуск:
+    python -m loadtest
+    python -m loadtest --users 5000 --rate 200 --duration 60
+    python -m loadtest --latency 0.05 --jitter 0.02 --rate-limit 0.01 --errors 0.01
+    python -m loadtest --global-rate 30 --env DELIVERY_GLOBAL_RATE=30 - рассылка у потолка API: без 429 и потерь
+    python -m loadtest --build ../reminder_bot_old   - другая сборка бота
+    python -m loadtest --compare CACHE_MAX_ROWS=0    - с кэшем напоминаний и без него
+    python -m loadtest --compare BOT_MODE=webhook    - polling против вебхука
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import secrets
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import ClientSession
+
+from loadtest.fake_api import ApiCall, FakeBotAPI, FaultProfile
+from loadtest.population import TAG_RE, Action, Population, SyntheticUser
+
+logger = logging.getLogger(__name__)
+
+BOT_TOKEN = "123456:loadtest"
+
+DB_QUERIES_RE = re.compile(r'^bot_db_query_seconds_count\{query="([^"]*)"\} (\d+)$', re.MULTILINE)
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class LoadTest:
+    def __init__(
+        self,
+        api: FakeBotAPI,
+        population: Population,
+        rate: float,
+        duration: float,
+        reply_timeout: float = 5.0,
+        think: float = 1.0,
+        max_backlog: int = 2
+    ):
+        self.api = api
+        self.population = population
+        self.rate = rate
+        self.duration = duration
+        self.reply_timeout = reply_timeout
+        self.think = think
+        self.max_backlog = max_backlog
+
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.sent: Dict[str, int] = defaultdict(int)
+        self.timeouts: Dict[str, int] = defaultdict(int)
+        self.fire_lags: List[float] = []
+        # Метка -> ожидаемое время срабатывания для подтверждённых и не удалённых напоминаний
+        self.expected: Dict[str, float] = {}
+        self.unexpected_firings = 0
+        self.failed_firings = 0
+        self.traffic_seconds = 0.0
+        # Запросы к базе по функциям репозитория за весь прогон; None - метрики не собраны
+        self.db_queries: Optional[Dict[str, int]] = None
+
+        self._waiting: Dict[int, Tuple[Action, float, asyncio.Future]] = {}
+        self._pending: Dict[int, int] = defaultdict(int)
+        # Не раньше какого времени пользователь пришлёт следующий запрос
+        self._ready: Dict[int, float] = {}
+        self._users: Dict[int, SyntheticUser] = {user.user_id: user for user in population.users}
+        self._tasks = set()
+
+        api.on_call = self._on_call
+
+    def _on_call(self, call: ApiCall):
+        if call.method == "sendMessage" and call.text.startswith("🔔"):
+            self._on_firing(call)
+            return
+
+        waiting = self._waiting.get(call.chat_id)
+        if call.status != 200 or waiting is None:
+            return
+
+        action, sent_at, future = waiting
+        if action.kind == "delete":
+            replied = call.method == "editMessageText" or (
+                call.method == "answerCallbackQuery" and call.text.startswith("Ошибка")
+            )
+        else:
+            replied = call.method == "sendMessage"
+        if not replied or future.done():
+            return
+
+        user = self._users[call.chat_id]
+        if action.kind == "create" and "создано" in call.text:
+            self.expected[action.tag] = sent_at + action.fire_in
+        if call.method == "editMessageText" or action.kind == "list":
+            message_id = int(call.params["message_id"]) if call.method == "editMessageText" else call.result["message_id"]
+            self.population.remember_list(user, message_id, call.text, call.params.get("reply_markup"))
+
+        future.set_result(call.answered)
+
+    def _on_firing(self, call: ApiCall):
+        if call.status != 200:
+            # Очередь доставки повторит отправку
+            self.failed_firings += 1
+            return
+
+        for user_id, number in TAG_RE.findall(call.text):
+            due = self.expected.pop(f"lt{user_id}x{number}", None)
+            if due is None:
+                # Удалённое, повторное или созданное без подтверждения напоминание
+                self.unexpected_firings += 1
+            else:
+                self.fire_lags.append(call.answered - due)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        while loop.time() - started < self.duration:
+            await asyncio.sleep(self.population.random.expovariate(self.rate))
+            user = self.population.pick_user()
+            # Человек не присылает запросы быстрее, чем получает ответы: запрос достаётся другому
+            while self._pending[user.user_id] >= self.max_backlog:
+                user = self.population.pick_user()
+            self._pending[user.user_id] += 1
+            if self._pending[user.user_id] == 1:
+                task = asyncio.create_task(self._run_user(user))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+        self.traffic_seconds = loop.time() - started
+
+    async def wait_firings(self, grace: float):
+        """Ждёт оставшихся срабатываний, но не дольше grace секунд после самого позднего срока."""
+        while self.expected:
+            deadline = max(self.expected.values()) + grace
+            if time.monotonic() > deadline:
+                break
+            await asyncio.sleep(0.5)
+
+    async def _run_user(self, user: SyntheticUser):
+        while self._pending[user.user_id]:
+            pause = self._ready.get(user.user_id, 0) - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+            action = self.population.next_action(user)
+            await self._perform(action)
+            self._pending[user.user_id] -= 1
+            self._ready[user.user_id] = time.monotonic() + self.think
+
+    async def _perform(self, action: Action):
+        future = asyncio.get_running_loop().create_future()
+        sent_at = time.monotonic()
+        self._waiting[action.user_id] = (action, sent_at, future)
+        self.sent[action.kind] += 1
+
+        if action.deleted_tag:
+            # Сработавшее после удаления напоминание будет учтено как лишнее
+            self.expected.pop(action.deleted_tag, None)
+
+        self.api.push_update(action.update)
+        try:
+            answered = await asyncio.wait_for(future, self.reply_timeout)
+            self.latencies[action.kind].append(answered - sent_at)
+        except asyncio.TimeoutError:
+            self.timeouts[action.kind] += 1
+            logger.debug(f"Нет ответа за {self.reply_timeout} с: {action.kind} пользователя {action.user_id}, {action.update}")
+        finally:
+            del self._waiting[action.user_id]
+
+    def summary(self) -> Dict[str, float]:
+        everything = [value for values in self.latencies.values() for value in values]
+        sent = sum(self.sent.values())
+        summary = {
+            'replies_per_second': len(everything) / max(self.traffic_seconds, 1e-9),
+            'p50': percentile(everything, 0.5),
+            'p99': percentile(everything, 0.99),
+            'timeouts': sum(self.timeouts.values()),
+            'lost_firings': len(self.expected),
+        }
+        if self.db_queries is not None:
+            summary['db_queries_per_update'] = sum(self.db_queries.values()) / max(sent, 1)
+        return summary
+
+    def report(self) -> List[str]:
+        replies = sum(len(values) for values in self.latencies.values())
+        lines = [
+            f"Запросов: {sum(self.sent.values()):,} за {self.traffic_seconds:.1f} с, "
+            f"ответов: {replies:,} ({replies / max(self.traffic_seconds, 1e-9):.1f}/с), "
+            f"без ответа: {sum(self.timeouts.values()):,}",
+            f"{'запрос':<8} {'отправлено':>10} {'p50, мс':>9} {'p90, мс':>9} {'p99, мс':>9} {'max, мс':>9} {'без ответа':>11}",
+        ]
+        everything = [value for values in self.latencies.values() for value in values]
+        for kind in sorted(self.sent) + ["все"]:
+            values = everything if kind == "все" else self.latencies[kind]
+            sent = sum(self.sent.values()) if kind == "все" else self.sent[kind]
+            timeouts = sum(self.timeouts.values()) if kind == "все" else self.timeouts[kind]
+            lines.append(
+                f"{kind:<8} {sent:>10,} " + " ".join(
+                    f"{percentile(values, q) * 1000:>9.1f}" for q in (0.5, 0.9, 0.99)
+                ) + f" {max(values, default=0) * 1000:>9.1f} {timeouts:>11,}"
+            )
+
+        lines.append(
+            f"Срабатываний: {len(self.fire_lags):,}, потеряно: {len(self.expected):,}, "
+            f"лишних: {self.unexpected_firings:,}, неудачных отправок: {self.failed_firings:,}"
+        )
+        if self.fire_lags:
+            lines.append(
+                "Задержка срабатывания: " + ", ".join(
+                    f"p{int(q * 100)} {percentile(self.fire_lags, q):.2f} с" for q in (0.5, 0.9, 0.99)
+                ) + f", max {max(self.fire_lags):.2f} с"
+            )
+
+        calls = ", ".join(f"{method} {count:,}" for method, count in sorted(self.api.stats.items()))
+        statuses = defaultdict(int)
+        for call in self.api.calls:
+            statuses[call.status] += 1
+        lines.append(f"Вызовы API: {calls}")
+        if self.api.webhook_deliveries or self.api.webhook_failures:
+            lines.append(f"Доставлено на вебхук: {self.api.webhook_deliveries:,}, неудачных попыток: {self.api.webhook_failures:,}")
+        lines.append("Ответы API: " + ", ".join(f"{status} - {count:,}" for status, count in sorted(statuses.items())))
+
+        if self.db_queries is not None:
+            total = sum(self.db_queries.values())
+            busiest = sorted(self.db_queries.items(), key=lambda item: -item[1])[:5]
+            lines.append(
+                f"Запросов к базе: {total:,} ({total / max(sum(self.sent.values()), 1):.2f} на апдейт), чаще всего: "
+                + ", ".join(f"{query} {count:,}" for query, count in busiest)
+            )
+        return lines
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def parse_env(value: str) -> Dict[str, str]:
+    """KEY=VALUE[,KEY=VALUE...] -> словарь переменных окружения."""
+    env = {}
+    for item in value.split(","):
+        key, separator, setting = item.partition("=")
+        if not separator or not key:
+            raise argparse.ArgumentTypeError(f"ожидается KEY=VALUE: {item!r}")
+        env[key] = setting
+    return env
+
+def describe_env(env: Dict[str, str]) -> str:
+    return ",".join(f"{key}={value}" for key, value in env.items()) or "как есть"
+
+async def scrape_db_queries(ports: List[int]) -> Optional[Dict[str, int]]:
+    """Суммирует счётчики запросов к базе с эндпоинтов /metrics процессов бота."""
+    queries: Dict[str, int] = defaultdict(int)
+    try:
+        async with ClientSession() as session:
+            for port in ports:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    for query, count in DB_QUERIES_RE.findall(await response.text()):
+                        queries[query] += int(count)
+    except OSError as e:
+        logger.warning(f"Не удалось собрать метрики бота: {e}")
+        return None
+    return dict(queries)
+
+def start_bot(
+    build: str, api_url: str, directory: str, log_path: str, metrics_port: int = 0, extra_env: Optional[Dict[str, str]] = None
+) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "BOT_TOKEN": BOT_TOKEN,
+        "TELEGRAM_API_URL": api_url,
+        "BOT_MODE": "polling",
+        "DB_NAME": os.path.join(directory, "loadtest.db"),
+        "DEFAULT_TIMEZONE": "UTC",
+        "METRICS_HOST": "127.0.0.1",
+        "METRICS_PORT": str(metrics_port),
+        **(extra_env or {}),
+    }
+    with open(log_path, "w") as log:
+        return subprocess.Popen([sys.executable, "bot.py"], cwd=build, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+def stop_bot(process: subprocess.Popen, timeout: float = 30):
+    # SIGINT - штатная остановка: бот дожидается очереди доставки и записывает состояние
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+async def run(args: argparse.Namespace, directory: str, extra_env: Dict[str, str]) -> Optional[LoadTest]:
+    faults = FaultProfile(
+        latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+        retry_after=args.retry_after, error_rate=args.errors, global_rate=args.global_rate, seed=args.seed
+    )
+    api = FakeBotAPI(faults)
+    url = await api.start(port=args.port)
+
+    log_path = args.log or os.path.join(directory, "bot.log")
+    # Воркер шарда N отдаёт метрики на порту METRICS_PORT + N
+    metrics_port = free_port()
+    shards = int(extra_env.get("SHARD_COUNT", 1)) if extra_env.get("BOT_MODE") == "sharded" else 1
+    if extra_env.get("BOT_MODE") in ("webhook", "sharded"):
+        # Тестовый API доставляет апдейты на вебхук бота, как Telegram
+        webhook_port = free_port()
+        extra_env = {
+            "WEBHOOK_BASE_URL": f"http://127.0.0.1:{webhook_port}", "WEBHOOK_HOST": "127.0.0.1",
+            "WEBHOOK_PORT": str(webhook_port), "WEBHOOK_SECRET": secrets.token_urlsafe(16), **extra_env,
+        }
+    process = start_bot(args.build, url, directory, log_path, metrics_port, extra_env)
+    try:
+        await api.wait_polling(args.startup_timeout)
+    except asyncio.TimeoutError:
+        stop_bot(process)
+        await api.stop()
+        print(f"Бот не начал опрос за {args.startup_timeout} с, журнал: {log_path}")
+        return None
+
+    population = Population(args.users, fire_minutes=(args.fire_min, args.fire_max), skew=args.skew, seed=args.seed)
+    test = LoadTest(api, population, args.rate, args.duration, args.reply_timeout, args.think)
+    try:
+        await test.run()
+        await test.wait_firings(args.grace)
+        test.db_queries = await scrape_db_queries([metrics_port + shard for shard in range(shards)])
+    finally:
+        await asyncio.get_running_loop().run_in_executor(None, stop_bot, process)
+        await api.stop()
+
+    return test
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--build", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), help="каталог сборки бота с bot.py")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=50, help="запросов в секунду от всех пользователей")
+    parser.add_argument("--duration", type=float, default=60, help="длительность потока запросов, с")
+    parser.add_argument("--skew", type=float, default=1.1, help="показатель распределения Ципфа активности пользователей")
+    parser.add_argument("--fire-min", type=int, default=1, help="напоминания создаются через fire-min..fire-max минут")
+    parser.add_argument("--fire-max", type=int, default=2)
+    parser.add_argument("--grace", type=float, default=30, help="сколько ждать срабатывания после срока, с")
+    parser.add_argument("--reply-timeout", type=float, default=5)
+    parser.add_argument("--think", type=float, default=1.0, help="пауза пользователя между ответом и следующим запросом, с")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа API, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="разброс задержки, с")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--errors", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--global-rate", type=float, default=0.0, help="лимит сообщений в секунду (0 - без лимита)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=0, help="порт тестового API (0 - свободный)")
+    parser.add_argument("--startup-timeout", type=float, default=30)
+    parser.add_argument("--log", help="файл журнала бота")
+    parser.add_argument("--env", type=parse_env, action="append", default=[], help="KEY=VALUE[,...] - окружение бота во всех прогонах")
+    parser.add_argument("--compare", type=parse_env, action="append", default=[], help="KEY=VALUE[,...] - ещё один прогон с этим окружением")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    base_env = {key: value for env in args.env for key, value in env.items()}
+    runs = [(describe_env(base_env), base_env)] + [(describe_env(env), {**base_env, **env}) for env in args.compare]
+
+    summaries = []
+    for title, env in runs:
+        with tempfile.TemporaryDirectory() as directory:
+            test = asyncio.run(run(args, directory, env))
+        if test is None:
+            return 1
+
+        if len(runs) > 1:
+            print(f"\n== {title} ==")
+        print("\n".join(test.report()))
+        summaries.append((title, test.summary()))
+
+    if len(runs) > 1:
+        print(f"\n{'прогон':<32} {'ответов/с':>10} {'p50, мс':>9} {'p99, мс':>9} {'без ответа':>11} {'запросов к базе на апдейт':>26}")
+        for title, summary in summaries:
+            queries = summary.get('db_queries_per_update')
+            print(
+                f"{title:<32} {summary['replies_per_second']:>10.1f} {summary['p50'] * 1000:>9.1f} {summary['p99'] * 1000:>9.1f} "
+                f"{summary['timeouts']:>11,} {'-' if queries is None else f'{queries:.2f}':>26}"
+            )
+    return 0
@@ -0,0 +1,133 @@
+import itertools
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Доли действий в потоке запросов: в основном создание и просмотр списка
+DEFAULT_MIX = {"create": 0.55, "list": 0.3, "delete": 0.15}
+
+PHRASES = (
+    "позвонить маме", "купить хлеб", "отправить отчёт", "встреча с командой",
+    "забрать посылку", "оплатить интернет", "выпить таблетку", "полить цветы",
+)
+LIST_COMMANDS = ("/list", "покажи мои напоминания", "мои напоминания")
+
+# Метка в тексте напоминания: по ней сообщение о срабатывании сопоставляется с созданным напоминанием
+TAG_RE = re.compile(r'lt(\d+)x(\d+)')
+
+@dataclass
+class Action:
+    kind: str
+    user_id: int
+    update: Dict[str, Any]
+    # Для create: метка и через сколько секунд напоминание должно сработать
+    tag: Optional[str] = None
+    fire_in: float = 0.0
+    # Для delete: метка удаляемого напоминания
+    deleted_tag: Optional[str] = None
+
+@dataclass
+class SyntheticUser:
+    user_id: int
+    weight: float
+    # Метка -> ожидаемое время срабатывания (time.monotonic())
+    reminders: Dict[str, float] = field(default_factory=dict)
+    # Последний показанный список: id сообщения и пары (метка, callback_data) кнопок удаления
+    last_list: Optional[Tuple[int, List[Tuple[str, str]]]] = None
+    created: int = 0
+
+class Population:
+    """Генератор синтетических пользователей и их запросов к боту.
+
+    Активность пользователей распределена по закону Ципфа с показателем skew:
+    немногие активные пользователи дают большую часть запросов. Напоминания
+    создаются на ближайшие fire_minutes минут, чтобы срабатывать во время теста.
+    """
+
+    def __init__(
+        self,
+        users: int,
+        mix: Optional[Dict[str, float]] = None,
+        fire_minutes: Tuple[int, int] = (1, 2),
+        skew: float = 1.1,
+        seed: Optional[int] = None,
+        first_user_id: int = 1000000
+    ):
+        self.random = random.Random(seed)
+        self.mix = mix or DEFAULT_MIX
+        self.fire_minutes = fire_minutes
+        self.users = [
+            SyntheticUser(first_user_id + rank, 1 / (rank + 1) ** skew) for rank in range(users)
+        ]
+        self._cumulative = list(itertools.accumulate(user.weight for user in self.users))
+        self._update_ids = itertools.count(1)
+
+    def pick_user(self) -> SyntheticUser:
+        return self.random.choices(self.users, cum_weights=self._cumulative)[0]
+
+    def next_action(self, user: SyntheticUser) -> Action:
+        kinds, weights = zip(*self.mix.items())
+        kind = self.random.choices(kinds, weights)[0]
+
+        if kind == "delete" and user.last_list and user.last_list[1]:
+            return self._delete(user)
+        if kind == "list" or kind == "delete":
+            return Action("list", user.user_id, self._message(user.user_id, self.random.choice(LIST_COMMANDS)))
+        return self._create(user)
+
+    def remember_list(self, user: SyntheticUser, message_id: int, text: str, reply_markup: Optional[Dict[str, Any]]):
+        """Запоминает показанный список: кнопки удаления идут в порядке строк с метками."""
+        tags = [f"lt{user_id}x{number}" for user_id, number in TAG_RE.findall(text)]
+        buttons = [
+            button["callback_data"]
+            for row in (reply_markup or {}).get("inline_keyboard", [])
+            for button in row
+            if button.get("callback_data", "").startswith("delete_")
+        ]
+        user.last_list = (message_id, list(zip(tags, buttons)))
+
+    def _create(self, user: SyntheticUser) -> Action:
+        user.created += 1
+        tag = f"lt{user.user_id}x{user.created}"
+        minutes = self.random.randint(*self.fire_minutes)
+        unit = "минуту" if minutes == 1 else "минуты" if minutes < 5 else "минут"
+        text = f"через {minutes} {unit} {self.random.choice(PHRASES)} {tag}"
+
+        return Action("create", user.user_id, self._message(user.user_id, text), tag=tag, fire_in=minutes * 60)
+
+    def _delete(self, user: SyntheticUser) -> Action:
+        message_id, buttons = user.last_list
+        tag, callback_data = buttons.pop(self.random.randrange(len(buttons)))
+        update = {
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(user.user_id),
+                "chat_instance": str(user.user_id),
+                "data": callback_data,
+                "message": {
+                    "message_id": message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": user.user_id, "type": "private"},
+                    "text": "📋 Ваши активные напоминания:",
+                },
+            }
+        }
+        return Action("delete", user.user_id, update, deleted_tag=tag)
+
+    def _message(self, user_id: int, text: str) -> Dict[str, Any]:
+        message = {
+            "message_id": next(self._update_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"message": message}
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "language_code": "ru"}
@@ -0,0 +1,280 @@
+"""
+Бенчмарк ограничителя частоты запросов: накладные расходы на событие и память состояния.
+
+С --lanes - очереди пользователей (UserLanesMiddleware) против обработки каждого апдейта
+отдельной задачей: пропускная способность при росте числа пользователей, нарушения порядка
+апдейтов одного пользователя и задержка обычных пользователей, пока один шлёт поток апдейтов.
+Обработчик имитирует ожидание базы и Bot API (--handler-ms со случайным разбросом).
+
+С --webhook - то же через обработчик вебхука (services.webhook.BoundedRequestHandler) по HTTP:
+несколько пользователей присылают по пачке апдейтов, следом обычные пользователи по одному.
+Сравнивается удержание места в лимите вебхука до конца обработки (как раньше) и его
+освобождение, когда апдейт встаёт в очередь пользователя.
+
+Запуск:
+    python -m middlewares.benchmark                 - 1 000 000 пользователей
+    python -m middlewares.benchmark --users 100000
+    python -m middlewares.benchmark --lanes
+    python -m middlewares.benchmark --webhook
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Dict
+
+from middlewares.lanes import UserLanesMiddleware
+from middlewares.throttling import ThrottlingMiddleware, TokenBucketLimiter
+
+def _per_event_ns(limiter: TokenBucketLimiter, user_ids, now: float) -> float:
+    allow = limiter.allow
+    clock = time.perf_counter_ns
+
+    started = clock()
+    for user_id in user_ids:
+        allow(user_id, now)
+    return (clock() - started) / len(user_ids)
+
+def measure_limiter(users: int) -> Dict[str, float]:
+    user_ids = list(range(1, users + 1))
+
+    # Память - отдельным проходом: трассировка выделений искажает время
+    tracemalloc.start()
+    limiter = TokenBucketLimiter(rate=1.5, burst=3)
+    _per_event_ns(limiter, user_ids, 0.0)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del limiter
+
+    limiter = TokenBucketLimiter(rate=1.5, burst=3)
+    fill_ns = _per_event_ns(limiter, user_ids, 0.0)
+
+    random.shuffle(user_ids)
+    hit_ns = _per_event_ns(limiter, user_ids, 0.5)
+
+    return {
+        "users": users,
+        "tracked": len(limiter),
+        "new_user_ns": fill_ns,
+        "known_user_ns": hit_ns,
+        "memory_mb": memory / 2 ** 20,
+        "bytes_per_user": memory / users,
+    }
+
+async def _middleware_ns(events: int) -> float:
+    middleware = ThrottlingMiddleware(rate=1.5, burst=3)
+    event = SimpleNamespace(from_user=SimpleNamespace(id=0))
+    data = {}
+
+    async def handler(event, data):
+        return None
+
+    clock = time.perf_counter_ns
+    started = clock()
+    for user_id in range(events):
+        event.from_user.id = user_id
+        await middleware(handler, event, data)
+    return (clock() - started) / events
+
+async def _feed(mode: str, updates, concurrency: int, handler_ms: float, max_queue: int = 0) -> Dict[str, float]:
+    """Отдаёт апдейты (user_id, номер) задачами в порядке поступления, как polling.
+
+    mode: tasks - задача на апдейт без ограничений, bounded - общий семафор на concurrency
+    (как у вебхука), lanes - UserLanesMiddleware.
+    """
+    rng = random.Random(1)
+    middleware = UserLanesMiddleware(concurrency, max_queue=max_queue or len(updates))
+    semaphore = asyncio.Semaphore(concurrency)
+    received = asyncio.get_running_loop().time()
+    started_last: Dict[int, int] = {}
+    in_flight: Dict[int, int] = {}
+    latencies: Dict[int, list] = {}
+    reordered = 0
+
+    async def handler(event, data):
+        nonlocal reordered
+        user_id, number = event
+        # Гонка: апдейт пользователя начат, пока выполняется предыдущий, или раньше предыдущего
+        if in_flight.get(user_id) or started_last.get(user_id, -1) > number:
+            reordered += 1
+        started_last[user_id] = max(started_last.get(user_id, -1), number)
+        in_flight[user_id] = in_flight.get(user_id, 0) + 1
+        await asyncio.sleep(handler_ms / 1000 * rng.uniform(0.5, 1.5))
+        in_flight[user_id] -= 1
+        latencies.setdefault(user_id, []).append(asyncio.get_running_loop().time() - received)
+
+    async def process(event):
+        data = {'event_from_user': SimpleNamespace(id=event[0])}
+        if mode == "lanes":
+            await middleware(handler, event, data)
+        elif mode == "bounded":
+            async with semaphore:
+                await handler(event, data)
+        else:
+            await handler(event, data)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(asyncio.create_task(process(event)) for event in updates))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "rate": len(updates) / elapsed, "reordered": reordered, "latencies": latencies,
+        "lanes_left": middleware.lanes, "dropped": middleware.dropped,
+    }
+
+def _percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main_lanes(updates: int, concurrency: int, handler_ms: float, max_queue: int) -> int:
+    modes = (("tasks", "задача на апдейт"), ("bounded", "общий семафор"), ("lanes", "очереди"))
+
+    print(f"Апдейтов: {updates:,}, одновременно не больше {concurrency}, обработчик ~{handler_ms:g} мс")
+    print(f"{'пользователей':>13} " + " ".join(f"{title + ', апд/с':>24} {'гонок':>7}" for _, title in modes))
+    for users in (10, 100, 1000, 10000):
+        # Каждый пользователь шлёт свои апдейты подряд, пользователи перемешаны
+        senders = [index % users for index in range(updates)]
+        random.Random(users).shuffle(senders)
+        sent: Dict[int, int] = {}
+        events = []
+        for user_id in senders:
+            events.append((user_id, sent.get(user_id, 0)))
+            sent[user_id] = sent.get(user_id, 0) + 1
+
+        cells = []
+        for mode, _ in modes:
+            report = asyncio.run(_feed(mode, events, concurrency, handler_ms))
+            cells.append(f"{report['rate']:>24,.0f} {report['reordered']:>7,}")
+        print(f"{users:>13,} " + " ".join(cells))
+
+    # Один пользователь прислал пачку апдейтов, сразу за ней - по апдейту от обычных пользователей
+    normal = 1000
+    events = [(0, number) for number in range(updates)] + [(user_id, 0) for user_id in range(1, normal + 1)]
+    print(f"\nОдин пользователь прислал {updates:,} апдейтов, следом {normal:,} пользователей - по одному (очередь {max_queue})")
+    print(f"{'обработка':<18} {'p50 обычных, мс':>16} {'p99 обычных, мс':>16} {'у нарушителя обработано':>24} {'последний, мс':>14}")
+    for mode, title in modes:
+        report = asyncio.run(_feed(mode, events, concurrency, handler_ms, max_queue))
+        normal_latencies = [value for user_id, values in report['latencies'].items() if user_id for value in values]
+        print(
+            f"{title:<18} {_percentile(normal_latencies, 0.5) * 1000:>16.0f} {_percentile(normal_latencies, 0.99) * 1000:>16.0f} "
+            f"{len(report['latencies'][0]):>24,} {max(report['latencies'][0]) * 1000:>14.0f}"
+        )
+    print(f"Очередей пользователей после обработки: {report['lanes_left']}")
+    return 0
+
+def _message_update(update_id: int, user_id: int) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "date": 0, "chat": {"id": user_id, "type": "private"}, "from": user, "text": "тест"},
+    }
+
+async def _webhook_feed(release: bool, events, concurrency: int, handler_ms: float, max_queue: int) -> Dict[str, object]:
+    """Отправляет апдейты (update_id, user_id) на вебхук, не больше concurrency запросов одновременно, как Telegram."""
+    from aiogram import Bot, Dispatcher
+    from aiohttp import web
+    from aiohttp.test_utils import TestClient, TestServer
+
+    from services.webhook import BoundedRequestHandler
+
+    class HeldSlotRequestHandler(BoundedRequestHandler):
+        # Как до исправления: место в лимите вебхука удерживается, пока апдейт ждёт очереди пользователя
+        async def _feed_update(self, bot, update, slot):
+            await self.dispatcher.feed_raw_update(bot=bot, update=update, **self.data)
+
+    rng = random.Random(1)
+    loop = asyncio.get_running_loop()
+    handled: Dict[int, float] = {}
+    accepted = []
+
+    dp = Dispatcher()
+    dp.update.outer_middleware(UserLanesMiddleware(concurrency, max_queue))
+
+    @dp.message()
+    async def handler(message):
+        await asyncio.sleep(handler_ms / 1000 * rng.uniform(0.5, 1.5))
+        handled[message.message_id] = loop.time()
+
+    bot = Bot(os.environ["BOT_TOKEN"])
+    app = web.Application()
+    request_handler = (BoundedRequestHandler if release else HeldSlotRequestHandler)(dp, bot, max_concurrency=concurrency)
+    request_handler.register(app, path="/webhook")
+    client = TestClient(TestServer(app))
+    await client.start_server()
+
+    connections = asyncio.Semaphore(concurrency)
+    received = loop.time()
+
+    async def send(update_id: int, user_id: int):
+        async with connections:
+            started = loop.time()
+            async with client.post("/webhook", json=_message_update(update_id, user_id)) as response:
+                await response.read()
+            accepted.append(loop.time() - started)
+
+    await asyncio.gather(*(send(update_id, user_id) for update_id, user_id in events))
+    await request_handler.close()
+    await client.close()
+    await bot.session.close()
+
+    return {"handled": {update_id: moment - received for update_id, moment in handled.items()}, "accepted": accepted}
+
+def main_webhook(spammers: int, burst: int, concurrency: int, handler_ms: float, max_queue: int) -> int:
+    os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+    normal = 1000
+
+    # Апдейты нарушителей чередуются, за ними - по апдейту от обычных пользователей
+    events = []
+    for number in range(burst):
+        for spammer in range(spammers):
+            events.append((len(events) + 1, spammer + 1))
+    spam = len(events)
+    events += [(spam + index + 1, 1_000_000 + index) for index in range(normal)]
+
+    print(
+        f"Вебхук, лимит {concurrency}: {spammers} пользователей по {burst:,} апдейтов, следом {normal:,} по одному; "
+        f"очередь пользователя {max_queue}, обработчик ~{handler_ms:g} мс"
+    )
+    print(f"{'место в лимите':<28} {'p50 обычных, мс':>16} {'p99 обычных, мс':>16} {'все обычные, мс':>16} {'p99 ответа вебхука, мс':>23}")
+    for release, title in ((False, "до конца обработки"), (True, "до очереди пользователя")):
+        report = asyncio.run(_webhook_feed(release, events, concurrency, handler_ms, max_queue))
+        normal_latencies = [moment for update_id, moment in report['handled'].items() if update_id > spam]
+        print(
+            f"{title:<28} {_percentile(normal_latencies, 0.5) * 1000:>16.0f} {_percentile(normal_latencies, 0.99) * 1000:>16.0f} "
+            f"{max(normal_latencies) * 1000:>16.0f} {_percentile(report['accepted'], 0.99) * 1000:>23.1f}"
+        )
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lanes", action="store_true", help="сравнить обработку апдейтов с очередями пользователей и без")
+    parser.add_argument("--updates", type=int, default=5_000, help="апдейтов для --lanes")
+    parser.add_argument("--concurrency", type=int, default=100, help="одновременно обрабатываемых апдейтов для --lanes")
+    parser.add_argument("--handler-ms", type=float, default=20.0, help="среднее время обработчика для --lanes, мс")
+    parser.add_argument("--max-queue", type=int, default=50, help="очередь пользователя в сценарии с нарушителем")
+    parser.add_argument("--webhook", action="store_true", help="пачки апдейтов нескольких пользователей через обработчик вебхука")
+    parser.add_argument("--spammers", type=int, default=3, help="пользователей с пачками апдейтов для --webhook")
+    parser.add_argument("--burst", type=int, default=50, help="апдейтов в пачке пользователя для --webhook")
+    args = parser.parse_args(argv)
+
+    if args.webhook:
+        return main_webhook(args.spammers, args.burst, args.concurrency, args.handler_ms, args.max_queue)
+    if args.lanes:
+        return main_lanes(args.updates, args.concurrency, args.handler_ms, args.max_queue)
+
+    report = measure_limiter(args.users)
+    print(f"Пользователей: {report['users']:,} (отслеживается {report['tracked']:,})")
+    print(f"  новый пользователь:     {report['new_user_ns']:.0f} нс/событие")
+    print(f"  известный пользователь: {report['known_user_ns']:.0f} нс/событие")
+    print(f"  память: {report['memory_mb']:.1f} МБ ({report['bytes_per_user']:.0f} байт на пользователя)")
+
+    middleware_ns = asyncio.run(_middleware_ns(min(args.users, 100_000)))
+    print(f"Middleware целиком: {middleware_ns:.0f} нс/событие")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+class AdmissionSlot:
+    """Место апдейта в лимите приёма (вебхук, воркер шарда); освобождается не больше одного раза.
+
+    Передаётся в данные апдейта ключом admission_slot: UserLanesMiddleware освобождает его,
+    когда апдейт встаёт в очередь пользователя, иначе ожидающие апдейты одного пользователя
+    заняли бы весь лимит приёма.
+    """
+
+    __slots__ = ('_semaphore',)
+
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self._semaphore: Optional[asyncio.Semaphore] = semaphore
+
+    def release(self):
+        if self._semaphore is not None:
+            self._semaphore.release()
+            self._semaphore = None
+
+class UserLanesMiddleware(BaseMiddleware):
+    """Очереди обработки апдейтов по пользователям.
+
+    Апдейты одного пользователя обрабатываются строго по одному в порядке
+    поступления, разные пользователи - параллельно, но одновременно выполняется
+    не больше concurrency апдейтов. Пользователь занимает не больше одного места,
+    поэтому поток запросов от одного пользователя не задерживает остальных.
+    Очередь удаляется, как только пустеет; апдейты сверх max_queue в очереди
+    пользователя отбрасываются.
+
+    Подключается внешним middleware к dp.update до FSMContextMiddleware: состояние
+    FSM читается уже после того, как предыдущий апдейт пользователя обработан.
+    Порядок сохраняется, пока задачи апдейтов создаются в порядке их поступления
+    (polling, вебхук и воркеры шардов так и делают).
+
+    Апдейт, вставший в очередь или отброшенный, освобождает своё место в лимите приёма
+    (AdmissionSlot): лимит удерживают только апдейты, которые выполняются или ждут общего
+    семафора, а ожидающие в очередях ограничены max_queue на пользователя.
+    """
+
+    def __init__(self, concurrency: int = 100, max_queue: int = 50):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Ожидающие своей очереди апдейты пользователя; ключ есть, пока у пользователя что-то выполняется
+        self._lanes: Dict[int, Deque[asyncio.Future]] = {}
+        self.queued = 0
+        self.running = 0
+        self.dropped = 0
+
+    @property
+    def lanes(self) -> int:
+        return len(self._lanes)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'lanes': len(self._lanes),
+            'queued': self.queued,
+            'running': self.running,
+            'dropped': self.dropped,
+        }
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get('event_from_user')
+        if user is None:
+            return await self._run(handler, event, data)
+
+        # Место в очереди занимается до первого await: порядок задач сохраняется
+        lane = self._lanes.get(user.id)
+        if lane is None:
+            self._lanes[user.id] = deque()
+        elif len(lane) >= self.max_queue:
+            self._release_admission(data)
+            self.dropped += 1
+            logger.debug(f"Очередь апдейтов пользователя {user.id} переполнена, апдейт отброшен")
+            return None
+        else:
+            self._release_admission(data)
+            await self._wait_turn(user.id, lane)
+
+        try:
+            return await self._run(handler, event, data)
+        finally:
+            self._release(user.id)
+
+    @staticmethod
+    def _release_admission(data: Dict[str, Any]):
+        slot = data.get('admission_slot')
+        if slot is not None:
+            slot.release()
+
+    async def _run(self, handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        async with self._semaphore:
+            self.running += 1
+            try:
+                return await handler(event, data)
+            finally:
+                self.running -= 1
+
+    async def _wait_turn(self, user_id: int, lane: Deque[asyncio.Future]):
+        turn = asyncio.get_running_loop().create_future()
+        lane.append(turn)
+        self.queued += 1
+        try:
+            await turn
+        except asyncio.CancelledError:
+            if turn.cancelled():
+                # _release мог успеть снять отменённую очередь с учётом queued до этого except
+                if turn in lane:
+                    lane.remove(turn)
+                    self.queued -= 1
+            else:
+                # Очередь уже перешла к этому апдейту: передаём её следующему
+                self._release(user_id)
+            raise
+
+    def _release(self, user_id: int):
+        """Передаёт очередь пользователя следующему апдейту или удаляет её, если ожидающих нет."""
+        lane = self._lanes[user_id]
+        while lane:
+            turn = lane.popleft()
+            self.queued -= 1
+            if not turn.done():
+                turn.set_result(None)
+                return
+        del self._lanes[user_id]
@@ -0,0 +1,24 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+import time
+
+from utils.metrics import handler_seconds
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """Замеряет время выполнения обработчиков; метка - имя функции-обработчика."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get('handler')
+        name = handler_object.callback.__name__ if handler_object else 'unknown'
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            handler_seconds.observe(name, time.perf_counter() - started)
@@ -1,39 +1,137 @@
-from typing import Callable, Dict, Any, Awaitable
+from array import array
+from typing import Callable, Dict, Any, Awaitable, Optional
 from aiogram import BaseMiddleware
-from aiogram.types import Message, TelegramObject
-from cachetools import TTLCache
+from aiogram.types import CallbackQuery, Message, TelegramObject
 import time
 
+class TokenBucketLimiter:
+    """Токен-бакеты пользователей в плотных массивах.
+
+    Состояние пользователя - номер слота в массивах токенов и отметок времени.
+    Бакет, который успел наполниться до burst, ничем не отличается от нового,
+    поэтому такие слоты освобождаются лениво: каждый новый пользователь
+    проверяет по кругу несколько слотов, и число занятых слотов не растёт
+    быстрее, чем истекают старые.
+    """
+
+    __slots__ = ('rate', 'burst', 'sweep_step', '_slots', '_owners', '_tokens', '_stamps', '_warned', '_free', '_cursor')
+
+    def __init__(self, rate: float, burst: float, sweep_step: int = 2):
+        self.rate = rate
+        self.burst = burst
+        self.sweep_step = sweep_step
+
+        self._slots: Dict[int, int] = {}
+        self._owners = array('q')
+        self._tokens = array('d')
+        self._stamps = array('d')
+        self._warned = bytearray()
+        self._free = array('q')
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def allow(self, user_id: int, now: float) -> bool:
+        """Списывает токен; False, если бакет пользователя пуст."""
+        slot = self._slots.get(user_id)
+        if slot is None:
+            self._sweep(now)
+            slot = self._allocate(user_id)
+            self._tokens[slot] = self.burst - 1
+            self._stamps[slot] = now
+            return True
+
+        tokens = self._tokens[slot] + (now - self._stamps[slot]) * self.rate
+        if tokens > self.burst:
+            tokens = self.burst
+        self._stamps[slot] = now
+
+        if tokens < 1:
+            self._tokens[slot] = tokens
+            return False
+
+        self._tokens[slot] = tokens - 1
+        self._warned[slot] = 0
+        return True
+
+    def warn_once(self, user_id: int) -> bool:
+        """True при первом отказе подряд - чтобы предупредить пользователя только один раз."""
+        slot = self._slots.get(user_id)
+        if slot is None or self._warned[slot]:
+            return False
+
+        self._warned[slot] = 1
+        return True
+
+    def memory_usage(self) -> int:
+        """Приблизительный объём состояния в байтах (массивы и словарь слотов, без самих ключей)."""
+        arrays = (self._owners, self._tokens, self._stamps, self._free)
+        return sum(a.buffer_info()[1] * a.itemsize for a in arrays) + len(self._warned) + self._slots.__sizeof__()
+
+    def _allocate(self, user_id: int) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._owners[slot] = user_id
+            self._warned[slot] = 0
+        else:
+            slot = len(self._owners)
+            self._owners.append(user_id)
+            self._tokens.append(0.0)
+            self._stamps.append(0.0)
+            self._warned.append(0)
+
+        self._slots[user_id] = slot
+        return slot
+
+    def _sweep(self, now: float):
+        size = len(self._owners)
+        if not size:
+            return
+
+        # Время, за которое пустой бакет наполняется полностью
+        idle = self.burst / self.rate
+        cursor = self._cursor
+
+        for _ in range(min(self.sweep_step, size)):
+            cursor = cursor + 1 if cursor + 1 < size else 0
+            user_id = self._owners[cursor]
+            if user_id >= 0 and now - self._stamps[cursor] >= idle:
+                del self._slots[user_id]
+                self._owners[cursor] = -1
+                self._free.append(cursor)
+
+        self._cursor = cursor
+
 class ThrottlingMiddleware(BaseMiddleware):
-    """Ограничения частоты запросов от пользователей."""
+    """Ограничения частоты запросов от пользователей.
+
+    Подключается отдельно к каждому типу событий (message, callback_query) со своими
+    лимитами: rate - токенов в секунду, burst - допустимая пачка запросов подряд.
+    """
 
-    def __init__(self, rate_limit: float = 0.7):
-        self.rate_limit = rate_limit
-        self.cache = TTLCache(maxsize=10000, ttl=60)
+    def __init__(self, rate: float = 1.5, burst: float = 3, warning: Optional[str] = None):
+        self.limiter = TokenBucketLimiter(rate, burst)
+        self.warning = warning
         super().__init__()
-    
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
+        user = getattr(event, 'from_user', None)
+        if user is None:
+            return await handler(event, data)
 
-        if not isinstance(event, Message):
+        if self.limiter.allow(user.id, time.monotonic()):
             return await handler(event, data)
-        
-        user_id = event.from_user.id
-        
-        current_time = time.time()
-        
-        if user_id in self.cache:
-            last_request_time = self.cache[user_id]
-            time_passed = current_time - last_request_time
-            
-            if time_passed < self.rate_limit:
-                return None
-        
-        self.cache[user_id] = current_time
-        
-
-        return await handler(event, data)
\ No newline at end of file
+
+        if self.warning and isinstance(event, (Message, CallbackQuery)) and self.limiter.warn_once(user.id):
+            await event.answer(self.warning)
+        elif isinstance(event, CallbackQuery):
+            # Без ответа кнопка показывает загрузку, пока Telegram не сбросит её по таймауту
+            await event.answer()
+
+        return None
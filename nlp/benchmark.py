@@ -0,0 +1,249 @@
+"""
+Бенчмарк и проверка точности NLP-модулей на размеченном корпусе nlp/corpus.tsv.
+
+Запуск:
+    python -m nlp.benchmark                    - отчёт по точности, задержкам и пропускной способности
+    python -m nlp.benchmark --check            - ненулевой код выхода при регрессии относительно базовой линии
+    python -m nlp.benchmark --update-baseline  - сохранить текущие показатели как базовую линию
+    python -m nlp.benchmark --parse-rate       - разборов времени в секунду: прежний разбор против текущего
+    python -m nlp.benchmark --intent-cache     - распознавание намерений с кэшем и без на потоке сообщений
+    python -m pytest tests/test_nlp_accuracy.py - точность в тестах (скорость - с NLP_CHECK_THROUGHPUT=1)
+"""
+import argparse
+import csv
+import json
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from nlp.intent_recognizer import IntentRecognizer
+from nlp.time_parser import TimeParser
+
+CORPUS_PATH = Path(__file__).with_name("corpus.tsv")
+BASELINE_PATH = Path(__file__).with_name("benchmark_baseline.json")
+
+# Корпус размечен относительно этого момента (среда)
+FROZEN_NOW = datetime(2026, 10, 14, 12, 0)
+
+# Допустимая регрессия относительно базовой линии
+MAX_ACCURACY_DROP = 0.005
+MAX_THROUGHPUT_DROP = 0.3
+
+def load_corpus(path: Path = CORPUS_PATH) -> List[Dict[str, str]]:
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f, delimiter="\t"))
+
+def _percentile(sorted_values: List[int], q: float) -> float:
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index] / 1000
+
+def _measure(func: Callable[[str], object], texts: List[str]) -> Dict[str, float]:
+    latencies = []
+    clock = time.perf_counter_ns
+
+    started = clock()
+    for text in texts:
+        call_started = clock()
+        func(text)
+        latencies.append(clock() - call_started)
+    elapsed = (clock() - started) / 1e9
+
+    latencies.sort()
+    return {
+        "p50_us": _percentile(latencies, 0.5),
+        "p99_us": _percentile(latencies, 0.99),
+        "messages_per_sec": len(texts) / elapsed if elapsed else 0.0,
+    }
+
+def evaluate_intents(corpus: List[Dict[str, str]]) -> Dict[str, float]:
+    # Кэш отключён, чтобы измерять классификацию, а не попадания в кэш
+    recognizer = IntentRecognizer(cache_size=0)
+
+    correct = 0
+    for row in corpus:
+        result = recognizer.recognize_intent(row["text"])
+        predicted = result["intent"] if result else "none"
+        correct += predicted == row["intent"]
+
+    report = {"accuracy": correct / len(corpus)}
+    report.update(_measure(recognizer.recognize_intent, [row["text"] for row in corpus]))
+    return report
+
+def evaluate_time_parser(corpus: List[Dict[str, str]]) -> Dict[str, float]:
+    parser = TimeParser(now=lambda: FROZEN_NOW)
+    rows = [row for row in corpus if row["expected_time"]]
+
+    time_correct = text_correct = 0
+    for row in rows:
+        parsed = parser.parse_time(row["text"])
+        if not parsed:
+            continue
+        notification_time, clean_text = parsed
+        time_correct += notification_time == datetime.fromisoformat(row["expected_time"])
+        text_correct += clean_text == row["clean_text"]
+
+    report = {
+        "accuracy": time_correct / len(rows),
+        "clean_text_accuracy": text_correct / len(rows),
+    }
+    report.update(_measure(parser.parse_time, [row["text"] for row in rows]))
+    return report
+
+def run() -> Dict[str, Dict[str, float]]:
+    corpus = load_corpus()
+    return {
+        "intent_recognizer": evaluate_intents(corpus),
+        "time_parser": evaluate_time_parser(corpus),
+    }
+
+def find_regressions(report: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> List[str]:
+    regressions = []
+
+    for component, metrics in baseline.items():
+        current = report[component]
+        for metric, expected in metrics.items():
+            if "accuracy" in metric and current[metric] < expected - MAX_ACCURACY_DROP:
+                regressions.append(f"{component}.{metric}: {current[metric]:.4f} < {expected:.4f}")
+            elif metric == "messages_per_sec" and current[metric] < expected * (1 - MAX_THROUGHPUT_DROP):
+                regressions.append(f"{component}.{metric}: {current[metric]:.0f} < {expected:.0f}")
+
+    return regressions
+
+# Прежний TimeParser: семь шаблонов по очереди через re.search, после попадания - два re.sub
+_LEGACY_PATTERNS = (
+    r'через (\d+) (минут[уы]?|час[ао]в?|дн[еяй])',
+    r'в (\d{1,2}[:.]\d{2})',
+    r'в (\d{1,2}) час[ао]?в?( (\d{1,2}) минут)?',
+    r'завтра в (\d{1,2}[:.]\d{2})',
+    r'завтра в (\d{1,2}) час[ао]?в?',
+    r'сегодня в (\d{1,2}[:.]\d{2})',
+    r'через (час|минуту|день)',
+)
+
+def _legacy_time(index: int, match: re.Match, now: datetime) -> Optional[datetime]:
+    if index == 0:
+        unit = {'м': timedelta(minutes=1), 'ч': timedelta(hours=1), 'д': timedelta(days=1)}[match.group(2)[0]]
+        return now + unit * int(match.group(1))
+    if index == 6:
+        return now + {'час': timedelta(hours=1), 'минуту': timedelta(minutes=1), 'день': timedelta(days=1)}[match.group(1)]
+
+    if index in (1, 3, 5):
+        hours, minutes = map(int, match.group(1).replace('.', ':').split(':'))
+    else:
+        hours, minutes = int(match.group(1)), int(match.group(3) or 0) if index == 2 else 0
+    if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+        return None
+
+    result = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+    if index in (3, 4):
+        return result + timedelta(days=1)
+    return result if result >= now else result + timedelta(days=1)
+
+def legacy_parse_time(text: str, now: datetime = FROZEN_NOW) -> Optional[Tuple[datetime, str]]:
+    text_lower = text.lower()
+    for index, pattern in enumerate(_LEGACY_PATTERNS):
+        match = re.search(pattern, text_lower)
+        if match:
+            time_obj = _legacy_time(index, match, now)
+            if time_obj:
+                clean_text = re.sub(pattern, '', text_lower, count=1).strip()
+                clean_text = re.sub(r'^(напомни|напомнить)\s+', '', clean_text).strip()
+                return time_obj, clean_text or "Напоминание"
+    return None
+
+def main_parse_rate(corpus: List[Dict[str, str]], rounds: int) -> int:
+    parser = TimeParser(now=lambda: FROZEN_NOW)
+    with_time = [row["text"] for row in corpus if row["expected_time"]]
+    without_time = [row["text"] for row in corpus if not row["expected_time"]]
+    # Длинное сообщение: время в конце после абзаца текста
+    filler = "нужно не забыть купить продукты, забрать посылку и ответить на письма коллег " * 4
+    long_texts = [filler + text for text in with_time[:500]]
+
+    print(f"{'сообщения':<26} {'прежний, разборов/с':>20} {'текущий, разборов/с':>20} {'ускорение':>10}")
+    for title, texts in (("со временем", with_time), ("без времени", without_time), ("длинные, время в конце", long_texts)):
+        legacy = max(_measure(legacy_parse_time, texts)["messages_per_sec"] for _ in range(rounds))
+        current = max(_measure(parser.parse_time, texts)["messages_per_sec"] for _ in range(rounds))
+        print(f"{title:<26} {legacy:>20,.0f} {current:>20,.0f} {current / legacy:>9.1f}x")
+
+    legacy_correct = sum(
+        (parsed := legacy_parse_time(row["text"])) is not None and parsed[0] == datetime.fromisoformat(row["expected_time"])
+        for row in corpus if row["expected_time"]
+    )
+    print(f"Точность времени прежнего разбора на корпусе: {legacy_correct / len(with_time):.4f}")
+    return 0
+
+def main_intent_cache(corpus: List[Dict[str, str]], messages: int, rounds: int) -> int:
+    # Поток сообщений из корпуса с произвольными цифрами: пользователи пишут разное время и сроки
+    rng = random.Random(1)
+    texts = [
+        re.sub(r'\d', lambda _: str(rng.randrange(10)), rng.choice(corpus)["text"])
+        for _ in range(messages)
+    ]
+    # Эталон - классификация исходного текста, без нормализации цифр и без кэша
+    expected = [IntentRecognizer._classify_normalized(text.lower().strip()) for text in texts]
+
+    print(f"Сообщений: {messages:,}, повторов: {rounds} (берётся лучший)")
+    print(f"{'кэш':<12} {'сообщений/с':>12} {'p50, мкс':>9} {'p99, мкс':>9} {'попаданий':>10} {'расхождений':>12}")
+    for cache_size in (0, 256, 4096):
+        best = None
+        for _ in range(rounds):
+            recognizer = IntentRecognizer(cache_size=cache_size)
+            report = _measure(recognizer.recognize_intent, texts)
+            if best is None or report["messages_per_sec"] > best[0]["messages_per_sec"]:
+                best = report, recognizer.cache_stats()
+
+        report, stats = best
+        # Нормализованный ключ кэша обязан сохранять всё, что различают шаблоны: ответ не должен меняться
+        recognizer = IntentRecognizer(cache_size=cache_size)
+        mismatches = sum(
+            (recognizer.recognize_intent(text) or {}).get('intent') != (result[0] if result else None)
+            for text, result in zip(texts, expected)
+        )
+        title = "без кэша" if cache_size == 0 else f"{cache_size:,}"
+        print(
+            f"{title:<12} {report['messages_per_sec']:>12,.0f} {report['p50_us']:>9.1f} {report['p99_us']:>9.1f} "
+            f"{stats['hit_rate']:>10.1%} {mismatches:>12,}"
+        )
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="сравнить с базовой линией и завершиться с ошибкой при регрессии")
+    parser.add_argument("--update-baseline", action="store_true", help="записать текущие показатели как базовую линию")
+    parser.add_argument("--parse-rate", action="store_true", help="сравнить скорость разбора времени с прежней реализацией")
+    parser.add_argument("--intent-cache", action="store_true", help="сравнить распознавание намерений с кэшем и без")
+    parser.add_argument("--messages", type=int, default=100000, help="сообщений в потоке для --intent-cache")
+    parser.add_argument("--rounds", type=int, default=3, help="повторов замера для --parse-rate и --intent-cache (берётся лучший)")
+    args = parser.parse_args(argv)
+
+    if args.intent_cache:
+        return main_intent_cache(load_corpus(), args.messages, args.rounds)
+
+    if args.parse_rate:
+        return main_parse_rate(load_corpus(), args.rounds)
+
+    report = run()
+
+    for component, metrics in report.items():
+        print(component)
+        for metric, value in metrics.items():
+            print(f"  {metric:<20} {value:.4f}" if "accuracy" in metric else f"  {metric:<20} {value:.1f}")
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Базовая линия сохранена в {BASELINE_PATH}")
+
+    if args.check:
+        regressions = find_regressions(report, json.loads(BASELINE_PATH.read_text(encoding="utf-8")))
+        for regression in regressions:
+            print(f"РЕГРЕССИЯ {regression}")
+        return 1 if regressions else 0
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
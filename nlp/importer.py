@@ -0,0 +1,206 @@
+import csv
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from nlp.recurrence import Recurrence, RecurrenceParser, ALL_DAYS, MIN_INTERVAL
+from nlp.time_parser import TimeParser, DEFAULT_HOUR
+from utils.timezones import UTC, get_zone
+
+IMPORT_EXTENSIONS = ('.txt', '.csv', '.ics')
+
+_ICS_DAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+_ICS_INTERVALS = {'MINUTELY': timedelta(minutes=1), 'HOURLY': timedelta(hours=1)}
+_ICS_ESCAPES = re.compile(r'\\([\\;,nN])')
+
+class ImportedReminder(NamedTuple):
+    text: str
+    time: datetime
+    rule: Optional[Recurrence] = None
+
+# (номер строки или события, исходный текст, напоминание или None, если не распознано)
+ImportResult = Tuple[int, str, Optional[ImportedReminder]]
+
+class ReminderImporter:
+    """Разбор многострочных сообщений и файлов .txt/.csv/.ics в напоминания.
+
+    Строки обрабатываются по одной по мере чтения, поэтому файл не нужно
+    держать в памяти целиком в виде списка строк.
+
+    С zone время без пояса считается временем пользователя в этом поясе, а результаты
+    содержат пояс; без zone все времена наивные локальные.
+    """
+
+    def __init__(
+        self,
+        time_parser: Optional[TimeParser] = None,
+        recurrence_parser: Optional[RecurrenceParser] = None,
+        now: Optional[Callable[[], datetime]] = None,
+        zone: Optional[str] = None
+    ):
+        self.zone = zone
+        self.tz = get_zone(zone) if zone else None
+        self.now = now or (lambda: datetime.now(self.tz))
+        self.time_parser = time_parser or TimeParser(self.now)
+        self.recurrence_parser = recurrence_parser or RecurrenceParser(self.now)
+
+    def parse_text(self, text: str) -> Optional[ImportedReminder]:
+        now = self.now()
+        recurring = self.recurrence_parser.parse(text, now, self.zone)
+        if recurring:
+            rule, notification_time, clean_text = recurring
+            return ImportedReminder(clean_text, notification_time, rule)
+
+        parsed = self.time_parser.parse_time(text, now)
+        if not parsed or parsed[0] <= now:
+            return None
+        return ImportedReminder(parsed[1], parsed[0])
+
+    def iter_lines(self, lines: Iterable[str]) -> Iterator[ImportResult]:
+        """Одно напоминание на строку; пустые строки пропускаются."""
+        for number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if line:
+                yield number, line, self.parse_text(line)
+
+    def iter_csv(self, lines: Iterable[str]) -> Iterator[ImportResult]:
+        """Строка CSV: время в формате ISO в первой колонке и текст в остальных либо текст с временем словами."""
+        for number, row in enumerate(csv.reader(lines), start=1):
+            cells = [cell.strip() for cell in row if cell.strip()]
+            if not cells:
+                continue
+
+            source = ", ".join(cells)
+            notification_time = self._localize(self._iso_time(cells[0]))
+            if notification_time is None:
+                yield number, source, self.parse_text(" ".join(cells))
+            elif notification_time > self.now() and len(cells) > 1:
+                yield number, source, ImportedReminder(" ".join(cells[1:]), notification_time)
+            else:
+                yield number, source, None
+
+    def iter_ics(self, lines: Iterable[str]) -> Iterator[ImportResult]:
+        """События VEVENT: SUMMARY, DTSTART и RRULE с частотой MINUTELY/HOURLY/DAILY/WEEKLY."""
+        event: Optional[Dict[str, Tuple[str, str]]] = None
+        number = 0
+
+        for name, params, value in _unfold_ics(lines):
+            if name == 'BEGIN' and value == 'VEVENT':
+                event = {}
+            elif name == 'END' and value == 'VEVENT' and event is not None:
+                number += 1
+                summary = _ICS_ESCAPES.sub(lambda m: ' ' if m.group(1) in 'nN' else m.group(1), event.get('SUMMARY', ('', ''))[1])
+                yield number, summary or f"событие {number}", self._ics_event(event, summary.strip())
+                event = None
+            elif event is not None:
+                event[name] = (params, value)
+
+    def iter_file(self, filename: str, lines: Iterable[str]) -> Iterator[ImportResult]:
+        extension = filename.lower().rsplit('.', 1)[-1]
+        if extension == 'csv':
+            return self.iter_csv(lines)
+        if extension == 'ics':
+            return self.iter_ics(lines)
+        return self.iter_lines(lines)
+
+    def _ics_event(self, event: Dict[str, Tuple[str, str]], summary: str) -> Optional[ImportedReminder]:
+        if not summary or 'DTSTART' not in event:
+            return None
+
+        start = self._localize(_ics_time(event['DTSTART'][1]))
+        if start is None:
+            return None
+
+        now = self.now()
+        if 'RRULE' not in event:
+            return ImportedReminder(summary, start) if start > now else None
+
+        rule = _ics_rule(event['RRULE'][1], start, self.zone)
+        if rule is None:
+            return None
+
+        first = start if start > now else rule.next_after(start, now)
+        return ImportedReminder(summary, first, rule)
+
+    def _localize(self, moment: Optional[datetime]) -> Optional[datetime]:
+        """Приводит время из файла к поясу импорта: наивное - время пользователя."""
+        if moment is None:
+            return None
+        if self.tz is not None:
+            return moment.astimezone(self.tz) if moment.tzinfo else moment.replace(tzinfo=self.tz)
+        return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+    @staticmethod
+    def _iso_time(value: str) -> Optional[datetime]:
+        if not value[:1].isdigit() or '-' not in value:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+
+def _unfold_ics(lines: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """Склеивает перенесённые строки iCalendar и разбивает их на (имя, параметры, значение)."""
+    current = None
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield _split_ics(current)
+        current = line
+
+    if current:
+        yield _split_ics(current)
+
+def _split_ics(line: str) -> Tuple[str, str, str]:
+    head, _, value = line.partition(':')
+    name, _, params = head.partition(';')
+    return name.upper(), params.upper(), value.strip()
+
+def _ics_time(value: str) -> Optional[datetime]:
+    """Время с суффиксом Z - в UTC, без него (в том числе с TZID) - наивное, в поясе пользователя."""
+    try:
+        # VALUE=DATE: событие на весь день, напоминаем в DEFAULT_HOUR
+        if len(value) == 8:
+            return datetime.strptime(value[:8], "%Y%m%d").replace(hour=DEFAULT_HOUR)
+
+        result = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    except ValueError:
+        return None
+
+    if value.endswith('Z'):
+        result = result.replace(tzinfo=UTC)
+    return result
+
+def _ics_rule(value: str, start: datetime, zone: Optional[str]) -> Optional[Recurrence]:
+    parts = dict(part.partition('=')[::2] for part in value.upper().split(';') if part)
+    frequency = parts.get('FREQ')
+    try:
+        interval = int(parts.get('INTERVAL', 1))
+    except ValueError:
+        return None
+    # INTERVAL=0 делит на ноль в next_after, отрицательный - срабатывает на каждом тике планировщика
+    if interval < 1:
+        return None
+
+    if frequency in _ICS_INTERVALS or (frequency in ('DAILY', 'WEEKLY') and interval > 1 and 'BYDAY' not in parts):
+        step = _ICS_INTERVALS.get(frequency) or timedelta(days=1 if frequency == 'DAILY' else 7)
+        if step * interval < MIN_INTERVAL:
+            return None
+        return Recurrence(interval=step * interval)
+
+    if frequency == 'DAILY':
+        weekdays = ALL_DAYS
+    elif frequency == 'WEEKLY':
+        # BYDAY=MO,WE,FR; префиксы вида 1MO бывают только у ежемесячных правил
+        days = parts.get('BYDAY')
+        weekdays = tuple(sorted({_ICS_DAYS[day[-2:]] for day in days.split(',') if day[-2:] in _ICS_DAYS})) if days else (start.weekday(),)
+        if not weekdays or interval > 1:
+            return None
+    else:
+        return None
+
+    return Recurrence(weekdays, start.hour, start.minute, zone=zone)
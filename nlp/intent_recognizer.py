@@ -1,66 +1,94 @@
 import re
 import logging
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
+
+from nlp.time_parser import MONTHS
+from nlp.recurrence import PLURAL_WEEKDAYS
 
 logger = logging.getLogger(__name__)
 
+# Все шаблоны собраны в одно регулярное выражение; группа совпадения определяет намерение
+_INTENT_RE = re.compile(
+    r'(?P<create>^напомни(?:ть)?(?:\s+мне)?'
+    r'|^создай(?:\s+мне)?(?:\s+напоминание)?'
+    r'|^установи(?:\s+мне)?(?:\s+напоминание)?)'
+    r'|(?P<cancel>^отмени(?:ть)?(?:\s+напоминание)?'
+    r'|^удали(?:ть)?(?:\s+напоминание)?)'
+    r'|(?P<list>^(?:покажи|посмотреть|выведи|список)(?:\s+мои|\s+все)?(?:\s+напоминания)?'
+    r'|^какие(?:\s+у\s+меня)?(?:\s+есть)?(?:\s+напоминания)?)'
+    r'|(?P<remember>не\s+забыть(?:\s+бы)?'
+    r'|(?:нужно|надо)(?:\s+будет)?(?:\s+не)?(?:\s+забыть)?)'
+    r'|(?P<time>через|во? |завтра|сегодня|час|минут|утром|вечером|днем|ночью|(?:[01]\d|2[0-3]):'
+    r'|\d (?:' + '|'.join(MONTHS) + r')'
+    r'|кажд|ежедневно|по (?:будням|выходным|рабочим|' + '|'.join(PLURAL_WEEKDAYS) + r'))'
+)
+
+# Группа совпадения -> (намерение, уверенность); порядок задаёт приоритет
+_GROUPS = {
+    'create': ('create_reminder', 0.95),
+    'remember': ('create_reminder', 0.8),
+    'cancel': ('cancel_reminder', 0.9),
+    'list': ('list_reminders', 0.9),
+    'time': ('create_reminder', 0.5),
+}
+_PRIORITY = {group: rank for rank, group in enumerate(_GROUPS)}
+
+# Цифры сводятся к классам, которые шаблоны не различают, чтобы "через 5 минут" и "через 7 минут"
+# делили одну запись кэша: 0 и 1, 2, 3, от 4 до 9. Границы классов - проверка часа (?:[01]\d|2[0-3]):
+# "23:00" и "24:00" не должны попадать в одну запись.
+_DIGITS = str.maketrans('0123456789', '0023444444')
+
 class IntentRecognizer:
     """Класс распознавания намерений"""
-    
-    def __init__(self):
-        self.reminder_patterns = [
-            r'^напомни(ть)?(\s+мне)?',
-            r'^создай(\s+мне)?(\s+напоминание)?',
-            r'^установи(\s+мне)?(\s+напоминание)?',
-            r'не\s+забыть(\s+бы)?',
-            r'нужно(\s+будет)?(\s+не)?(\s+забыть)?',
-            r'надо(\s+будет)?(\s+не)?(\s+забыть)?',
-        ]
-        
-        self.cancel_patterns = [
-            r'^отмени(ть)?(\s+напоминание)?',
-            r'^удали(ть)?(\s+напоминание)?',
-        ]
-        
-        self.list_patterns = [
-            r'^(покажи|посмотреть|выведи|список)(\s+мои|\s+все)?(\s+напоминания)?',
-            r'^какие(\s+у\s+меня)?(\s+есть)?(\s+напоминания)?',
-        ]
-    
+
+    def __init__(self, cache_size: int = 4096):
+        self._classify = lru_cache(maxsize=cache_size)(self._classify_normalized)
+
     def recognize_intent(self, text: str) -> Optional[Dict[str, Any]]:
-        text_lower = text.lower().strip()
-        
-        for pattern in self.reminder_patterns:
-            if re.search(pattern, text_lower):
-                return {
-                    'intent': 'create_reminder',
-                    'text': text
-                }
-        
-        for pattern in self.cancel_patterns:
-            if re.search(pattern, text_lower):
-                return {
-                    'intent': 'cancel_reminder',
-                    'text': text
-                }
-        
-        for pattern in self.list_patterns:
-            if re.search(pattern, text_lower):
-                return {
-                    'intent': 'list_reminders'
-                }
-        
-        time_indicators = [
-            'через', 'в ', ' в ', 'завтра', 'сегодня', 'час', 'минут', 'утром', 'вечером',
-            'днем', 'ночью', '00:', '01:', '02:', '03:', '04:', '05:', '06:', '07:', '08:', '09:',
-            '10:', '11:', '12:', '13:', '14:', '15:', '16:', '17:', '18:', '19:', '20:', '21:', '22:', '23:'
-        ]
-        
-        for indicator in time_indicators:
-            if indicator in text_lower:
-                return {
-                    'intent': 'create_reminder',
-                    'text': text
-                }
-        
-        return None
\ No newline at end of file
+        stripped = text.lower().strip()
+        result = self._classify(stripped.translate(_DIGITS))
+
+        if result is None:
+            return None
+
+        intent, confidence, (start, end) = result
+        # Позиции в нормализованной строке сдвигаются на отброшенные ведущие пробелы
+        offset = len(text) - len(text.lstrip())
+
+        return {
+            'intent': intent,
+            'text': text,
+            'confidence': confidence,
+            'span': (start + offset, end + offset),
+        }
+
+    def cache_stats(self) -> Dict[str, Any]:
+        info = self._classify.cache_info()
+        total = info.hits + info.misses
+
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'maxsize': info.maxsize,
+            'hit_rate': info.hits / total if total else 0.0,
+        }
+
+    @staticmethod
+    def _classify_normalized(text: str) -> Optional[Tuple[str, float, Tuple[int, int]]]:
+        best = None
+        best_rank = len(_PRIORITY)
+
+        for match in _INTENT_RE.finditer(text):
+            rank = _PRIORITY[match.lastgroup]
+            if rank < best_rank:
+                best, best_rank = match, rank
+                if rank == 0:
+                    break
+
+        if best is None:
+            return None
+
+        intent, confidence = _GROUPS[best.lastgroup]
+        return intent, confidence, best.span()
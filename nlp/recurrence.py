@@ -0,0 +1,197 @@
+import re
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from nlp.time_parser import DEFAULT_HOUR, WEEKDAYS
+from utils.timezones import get_zone
+
+
+# Минимальный шаг интервального правила: чаще напоминать не имеет смысла
+MIN_INTERVAL = timedelta(minutes=1)
+
+ALL_DAYS = (0, 1, 2, 3, 4, 5, 6)
+WORKDAYS = (0, 1, 2, 3, 4)
+WEEKEND = (5, 6)
+
+# "по понедельникам", "по средам"
+PLURAL_WEEKDAYS = {
+    'понедельникам': 0, 'вторникам': 1, 'средам': 2, 'четвергам': 3,
+    'пятницам': 4, 'субботам': 5, 'воскресеньям': 6,
+}
+
+_INTERVAL_UNITS = {
+    'ми': timedelta(minutes=1), 'ча': timedelta(hours=1), 'де': timedelta(days=1),
+    'дн': timedelta(days=1), 'не': timedelta(weeks=1),
+}
+
+_WEEKDAY_NAMES = ('пн', 'вт', 'ср', 'чт', 'пт', 'сб', 'вс')
+
+# (минут в единице, одна единица, сокращение для нескольких)
+_INTERVAL_NAMES = (
+    (7 * 24 * 60, 'каждую неделю', 'нед.'),
+    (24 * 60, 'каждый день', 'дн.'),
+    (60, 'каждый час', 'ч'),
+    (1, 'каждую минуту', 'мин'),
+)
+
+_RULE_RE = re.compile(
+    r'(?<!\w)(?:'
+    r'(?P<daily>каждый\s+день|ежедневно)'
+    r'|(?P<workdays>по\s+будням|по\s+рабочим\s+дням)'
+    r'|(?P<weekend>по\s+выходным)'
+    r'|(?P<weekday>кажд(?:ый|ую|ое)\s+(?P<wd>' + '|'.join(WEEKDAYS) + r'))'
+    r'|(?P<plural>по\s+(?P<pwd>' + '|'.join(PLURAL_WEEKDAYS) + r'))'
+    r'|(?P<every>кажд(?:ый|ую|ое|ые)\s+(?:(?P<n>\d+)\s+)?'
+    r'(?P<unit>минут[уы]?|час(?:а|ов)?|день|дн(?:я|ей)|недел[юиь]))'
+    r')(?!\w)'
+)
+
+_CLOCK_RE = re.compile(
+    r'(?<!\w)(?:в\s+)?(?:(?P<hh>\d{1,2})[:.](?P<mm>\d{2})|в\s+(?P<h>\d{1,2})(?:\s+час(?:а|ов)?)?)(?!\w)'
+)
+
+_PREFIX_RE = re.compile(r'^(?:напомни(?:ть)?|не\s+забыть)(?:\s+мне)?[\s,:-]*', re.IGNORECASE)
+_SPACES_RE = re.compile(r'\s{2,}')
+
+class Recurrence(NamedTuple):
+    """Правило повторения: по дням недели в заданное время или через фиксированный интервал.
+
+    Время дня правила по дням недели отсчитывается в поясе zone (None - пояс по умолчанию).
+    """
+    weekdays: Tuple[int, ...] = ()
+    hour: int = DEFAULT_HOUR
+    minute: int = 0
+    interval: Optional[timedelta] = None
+    zone: Optional[str] = None
+
+    def encode(self) -> str:
+        """Компактная запись для колонки recurrence: "W:01234:09:00:Europe/Moscow" или "I:7200"."""
+        if self.interval is not None:
+            return f"I:{int(self.interval.total_seconds())}"
+        rule = f"W:{''.join(map(str, self.weekdays))}:{self.hour:02d}:{self.minute:02d}"
+        return f"{rule}:{self.zone}" if self.zone else rule
+
+    @classmethod
+    def decode(cls, value: str) -> "Recurrence":
+        kind, _, rest = value.partition(":")
+        if kind == "I":
+            return cls(interval=timedelta(seconds=int(rest)))
+
+        # Смещение вида "+05:30" само содержит двоеточие
+        days, hour, minute, *zone = rest.split(":", 3)
+        return cls(tuple(int(day) for day in days), int(hour), int(minute), zone=zone[0] if zone else None)
+
+    def next_after(self, previous: datetime, now: datetime) -> datetime:
+        """Ближайшее срабатывание позже previous и now; пропущенные срабатывания не накапливаются.
+
+        Для времени с поясом результат - в поясе правила, для наивного - тоже наивный.
+        """
+        if self.interval is not None:
+            result = previous + self.interval
+            if result <= now:
+                # Сразу перескакиваем через все пропущенные интервалы, без перебора
+                result += self.interval * ((now - result) // self.interval + 1)
+            return result
+
+        base = max(previous, now)
+        if base.tzinfo is not None:
+            base = base.astimezone(get_zone(self.zone))
+        result = base.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if result <= base:
+            result += timedelta(days=1)
+        while result.weekday() not in self.weekdays:
+            result += timedelta(days=1)
+        return result
+
+    def first_after(self, now: datetime) -> datetime:
+        if self.interval is not None:
+            return now + self.interval
+        return self.next_after(now, now)
+
+    def describe(self) -> str:
+        if self.interval is not None:
+            minutes = int(self.interval.total_seconds() // 60)
+            for size, single, plural in _INTERVAL_NAMES:
+                if minutes % size == 0:
+                    count = minutes // size
+                    return single if count == 1 else f"каждые {count} {plural}"
+
+        if self.weekdays == ALL_DAYS:
+            days = "каждый день"
+        elif self.weekdays == WORKDAYS:
+            days = "по будням"
+        elif self.weekdays == WEEKEND:
+            days = "по выходным"
+        else:
+            days = "по " + ", ".join(_WEEKDAY_NAMES[day] for day in self.weekdays)
+        return f"{days} в {self.hour:02d}:{self.minute:02d}"
+
+class RecurrenceParser:
+    """Распознаёт повторяющиеся напоминания: "каждый день в 9:00", "по будням", "каждые 2 часа"."""
+
+    def __init__(self, now: Callable[[], datetime] = datetime.now):
+        self.now = now
+
+    def parse(
+        self, text: str, now: Optional[datetime] = None, zone: Optional[str] = None
+    ) -> Optional[Tuple[Recurrence, datetime, str]]:
+        """Возвращает правило, первое срабатывание и очищенный текст или None, если повторения нет.
+
+        now и zone - текущее время и пояс пользователя, в котором задано время дня правила.
+        """
+        text_lower = text.lower()
+        match = _RULE_RE.search(text_lower)
+        if not match:
+            return None
+
+        spans = [match.span()]
+        kind = match.lastgroup
+
+        if kind == 'every':
+            unit = _INTERVAL_UNITS[match.group('unit')[:2]]
+            try:
+                interval = unit * int(match.group('n') or 1)
+            except OverflowError:
+                return None
+            if interval < MIN_INTERVAL:
+                return None
+            rule = Recurrence(interval=interval)
+        else:
+            if kind == 'daily':
+                weekdays = ALL_DAYS
+            elif kind == 'workdays':
+                weekdays = WORKDAYS
+            elif kind == 'weekend':
+                weekdays = WEEKEND
+            elif kind == 'weekday':
+                weekdays = (WEEKDAYS[match.group('wd')],)
+            else:
+                weekdays = (PLURAL_WEEKDAYS[match.group('pwd')],)
+
+            hour, minute = DEFAULT_HOUR, 0
+            clock = _CLOCK_RE.search(text_lower)
+            if clock:
+                hour = int(clock.group('hh') or clock.group('h'))
+                minute = int(clock.group('mm') or 0)
+                if not (0 <= hour <= 23 and 0 <= minute <= 59):
+                    return None
+                spans.append(clock.span())
+
+            rule = Recurrence(weekdays, hour, minute, zone=zone)
+
+        try:
+            first = rule.first_after(now or self.now())
+        except (ValueError, OverflowError):
+            # Первое срабатывание за пределами datetime: "каждые 9999999 недель"
+            return None
+        return rule, first, self._clean(text, text_lower, spans)
+
+    @staticmethod
+    def _clean(text: str, text_lower: str, spans) -> str:
+        source = text if len(text) == len(text_lower) else text_lower
+        for start, end in sorted(spans, reverse=True):
+            source = f"{source[:start]} {source[end:]}"
+
+        clean_text = _SPACES_RE.sub(' ', source).strip(' ,.:;-')
+        clean_text = _PREFIX_RE.sub('', clean_text, count=1).strip()
+        return clean_text or "Напоминание"
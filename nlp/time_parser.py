@@ -1,134 +1,234 @@
 import re
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import Callable, List, NamedTuple, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Час по умолчанию для выражений без времени: "завтра", "в пятницу", "25 декабря"
+DEFAULT_HOUR = 9
+
+WEEKDAYS = {
+    'понедельник': 0, 'вторник': 1, 'среду': 2, 'четверг': 3,
+    'пятницу': 4, 'субботу': 5, 'воскресенье': 6,
+}
+
+MONTHS = {
+    'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4, 'мая': 5, 'июня': 6,
+    'июля': 7, 'августа': 8, 'сентября': 9, 'октября': 10, 'ноября': 11, 'декабря': 12,
+}
+
+DAY_OFFSETS = {'сегодня': 0, 'завтра': 1, 'послезавтра': 2}
+
+# Единица относительного времени по первым двум буквам: "минут", "часа", "недели", "день", "дней"
+UNIT_DELTAS = {
+    'ми': timedelta(minutes=1), 'ча': timedelta(hours=1), 'не': timedelta(weeks=1),
+    'де': timedelta(days=1), 'дн': timedelta(days=1),
+}
+
+_RELATIVE_UNIT = r'(?:минут[уы]?|мин|час(?:а|ов)?|день|дн(?:я|ей)|недел[юиь]|нед)'
+
+# Дробное количество: "через 1.5 часа", "через 2,5 дня"
+_AMOUNT = r'\d+(?:[.,]\d+)?'
+
+# Одна альтернация с именованными группами: текст просматривается за один проход.
+# Опережающая проверка первого символа отсекает большинство позиций до перебора альтернатив;
+# начало слова проверяется уже после неё ретроспективной проверкой - она дешевле, чем \b.
+_TOKEN_RE = re.compile(
+    r'(?=[чспзвд\d])(?<!\w)(?:'
+    r'(?P<rel>через\s+(?:полчаса|(?:(?P<rel_n>' + _AMOUNT + r')\s+)?(?P<rel_unit>' + _RELATIVE_UNIT + r'))'
+    r'(?:\s+(?:и\s+)?(?P<rel_n2>\d+)\s+(?P<rel_unit2>минут[уы]?|мин))?)'
+    r'|(?P<day>послезавтра|завтра|сегодня)'
+    r'|(?P<weekday>(?:во?\s+)?(?P<wd>' + '|'.join(WEEKDAYS) + r'))'
+    r'|(?P<clock>в\s+(?P<hh>\d{1,2})[:.](?P<mm>\d{2})|(?P<hh2>\d{1,2}):(?P<mm2>\d{2}))'
+    r'|(?P<hours>в\s+(?P<h>\d{1,2})\s+час(?:а|ов)?(?:\s+(?P<m>\d{1,2})\s+минут[уы]?)?)'
+    # Число с единицей после него - количество, а не дата: "1.5 часа"
+    r'|(?P<date>(?P<d>\d{1,2})[./](?P<mo>\d{1,2})(?:[./](?P<y>\d{4}|\d{2}))?(?!\s*' + _RELATIVE_UNIT + r'(?!\w))'
+    r'|(?P<d2>\d{1,2})\s+(?P<mon>' + '|'.join(MONTHS) + r'))'
+    r')(?!\w)'
+)
+
+_PREFIX_RE = re.compile(r'^(?:напомни(?:ть)?|не\s+забыть)(?:\s+мне)?[\s,:-]*', re.IGNORECASE)
+_SPACES_RE = re.compile(r'\s{2,}')
+
+_DAY_KINDS = ('day', 'weekday', 'date')
+_TIME_KINDS = ('clock', 'hours')
+
+def _candidate_key(candidate) -> Tuple[int, int, int]:
+    score, start, end = candidate[:3]
+    return score, end - start, -start
+
+class ParsedTime(NamedTuple):
+    time: datetime
+    start: int
+    end: int
+
+class _Token(NamedTuple):
+    kind: str
+    start: int
+    end: int
+    value: object
+
 class TimeParser:
     """Класс для парсинга временных выражений из текста"""
 
-    def __init__(self):
-        self.time_patterns = [
-            # через X минут/часов/дней
-            (r'через (\d+) (минут[уы]?|час[ао]в?|дн[еяй])', self._parse_relative_time),
-            (r'в (\d{1,2}[:.]\d{2})', self._parse_absolute_time),
-            (r'в (\d{1,2}) час[ао]?в?( (\d{1,2}) минут)?', self._parse_hours_minutes),
-            (r'завтра в (\d{1,2}[:.]\d{2})', self._parse_tomorrow_time),
-            (r'завтра в (\d{1,2}) час[ао]?в?', self._parse_tomorrow_hour),
-            (r'сегодня в (\d{1,2}[:.]\d{2})', self._parse_absolute_time),
-            (r'через (час|минуту|день)', self._parse_single_unit),
-        ]
-        
-    def parse_time(self, text: str) -> Optional[Tuple[datetime, str]]:
-        """Извлекает время из текста и возвращает его вместе с очищенным текстом."""
+    def __init__(self, now: Callable[[], datetime] = datetime.now):
+        self.now = now
+
+    def parse_time(self, text: str, now: Optional[datetime] = None) -> Optional[Tuple[datetime, str]]:
+        """Извлекает время из текста и возвращает его вместе с очищенным текстом.
+
+        now - текущее время в поясе пользователя (по умолчанию self.now()); результат в том же поясе.
+        """
         text_lower = text.lower()
-        
-        for pattern, parser in self.time_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                try:
-                    time_obj = parser(match)
-                    if time_obj:
-                        # Удаляем найденное временное выражение из текста
-                        clean_text = re.sub(pattern, '', text_lower, count=1).strip() 
-                        clean_text = re.sub(r'^(напомни|напомнить)\s+', '', clean_text).strip()
-    
-                        if not clean_text:
-                            clean_text = "Напоминание"
-                        return time_obj, clean_text
-                except Exception as e:
-                    logger.error(f"Ошибка при парсинге времени: {e}")
-        
-        return None
-    
-    def _parse_relative_time(self, match) -> Optional[datetime]:
-        """Парсинг относительного времени."""
-        amount = int(match.group(1))
-        unit = match.group(2)
-        
-        now = datetime.now()
-        
-        if unit.startswith('минут'):
-            return now + timedelta(minutes=amount)
-        elif unit.startswith('час'):
-            return now + timedelta(hours=amount)
-        elif unit.startswith('дн'):
-            return now + timedelta(days=amount)
-        
-        return None
-    
-    def _parse_absolute_time(self, match) -> Optional[datetime]:
-        """Парсинг абсолютного времени (в ЧЧ:ММ)"""
-        time_str = match.group(1).replace('.', ':')
-        
-        try:
-            hours, minutes = map(int, time_str.split(':'))
-            if not (0 <= hours <= 23 and 0 <= minutes <= 59):
-                return None
-                
-            now = datetime.now()
-            time_today = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
-            
-            if time_today < now:
-                time_today += timedelta(days=1)
-                
-            return time_today
-        except ValueError:
+        parsed = self._find(text_lower, now)
+        if not parsed:
+            return None
+
+        # Вырезаем по позициям в исходном тексте, если регистр не меняет длину строки
+        source = text if len(text) == len(text_lower) else text_lower
+        clean_text = f"{source[:parsed.start]} {source[parsed.end:]}"
+        clean_text = _SPACES_RE.sub(' ', clean_text).strip(' ,.:;-')
+        clean_text = _PREFIX_RE.sub('', clean_text, count=1).strip()
+
+        if not clean_text:
+            clean_text = "Напоминание"
+        return parsed.time, clean_text
+
+    def find_time(self, text: str, now: Optional[datetime] = None) -> Optional[ParsedTime]:
+        """Находит самое точное временное выражение в тексте за один проход."""
+        return self._find(text.lower(), now)
+
+    def _find(self, text_lower: str, now: Optional[datetime] = None) -> Optional[ParsedTime]:
+        tokens = []
+        for match in _TOKEN_RE.finditer(text_lower):
+            try:
+                token = self._make_token(match)
+            except (ValueError, OverflowError) as e:
+                logger.debug(f"Пропущено некорректное временное выражение '{match.group()}': {e}")
+                continue
+            if token:
+                tokens.append(token)
+
+        if not tokens:
             return None
-    
-    def _parse_hours_minutes(self, match) -> Optional[datetime]:
-        """Парсинг времени вида 'в ЧЧ часов ММ минут'"""
-        hours = int(match.group(1))
-        minutes = int(match.group(3)) if match.group(3) else 0
-        
+
+        # Момент вычисляется только для лучших кандидатов: обычно для первого же
+        now = now or self.now()
+        candidates = sorted(self._combine(tokens, text_lower), key=_candidate_key, reverse=True)
+        for score, start, end, day, clock, delta in candidates:
+            try:
+                time_obj = self._resolve(now, day, clock, delta)
+            except (ValueError, OverflowError):
+                # Момент за пределами datetime: "через 99999999 недель"
+                continue
+            if time_obj is not None:
+                return ParsedTime(time_obj, start, end)
+        return None
+
+    def _make_token(self, match: re.Match) -> Optional[_Token]:
+        kind = match.lastgroup
+        start, end = match.span()
+        group = match.group
+
+        if kind == 'rel':
+            if group('rel_unit') is None:
+                delta = timedelta(minutes=30)
+            else:
+                delta = self._unit_delta(float(group('rel_n').replace(',', '.')) if group('rel_n') else 1, group('rel_unit'))
+            if group('rel_unit2'):
+                delta += self._unit_delta(int(group('rel_n2')), group('rel_unit2'))
+            return _Token(kind, start, end, delta)
+
+        if kind == 'day':
+            return _Token(kind, start, end, ('offset', DAY_OFFSETS[group('day')]))
+
+        if kind == 'weekday':
+            return _Token(kind, start, end, ('weekday', WEEKDAYS[group('wd')]))
+
+        if kind == 'date':
+            if group('mon'):
+                day, month, year = int(group('d2')), MONTHS[group('mon')], None
+            else:
+                day, month = int(group('d')), int(group('mo'))
+                year = int(group('y')) if group('y') else None
+                if year is not None and year < 100:
+                    year += 2000
+            # Проверяем существование даты (високосный год для 29.02 допускается)
+            datetime(year or 2000, month, day)
+            return _Token(kind, start, end, ('date', (year, month, day)))
+
+        if kind == 'clock':
+            hours = int(group('hh') or group('hh2'))
+            minutes = int(group('mm') or group('mm2'))
+        else:
+            hours = int(group('h'))
+            minutes = int(group('m') or 0)
+
         if not (0 <= hours <= 23 and 0 <= minutes <= 59):
             return None
-            
-        now = datetime.now()
-        time_today = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
-        
-        if time_today < now:
-            time_today += timedelta(days=1)
-            
-        return time_today
-    
-    def _parse_tomorrow_time(self, match) -> Optional[datetime]:
-        """Парсинг времени (завтра в ЧЧ:ММ)"""
-        time_str = match.group(1).replace('.', ':')
-        
+        return _Token(kind, start, end, (hours, minutes))
+
+    @staticmethod
+    def _unit_delta(amount: float, unit: str) -> timedelta:
+        return UNIT_DELTAS[unit[:2]] * amount
+
+    @staticmethod
+    def _combine(tokens: List[_Token], text: str):
+        """Объединяет соседние день и время в одно выражение и оценивает точность каждого кандидата."""
+        for i, token in enumerate(tokens):
+            if token.kind == 'rel':
+                yield 2, token.start, token.end, None, None, token.value
+                continue
+
+            if token.kind in _TIME_KINDS:
+                yield 2, token.start, token.end, None, token.value, None
+            elif token.value[0] != 'offset' or token.value[1] != 0:
+                # "сегодня" без времени не задаёт момент напоминания
+                yield 1, token.start, token.end, token.value, None, None
+
+            if i + 1 < len(tokens):
+                following = tokens[i + 1]
+                adjacent = not text[token.end:following.start].strip()
+                if adjacent and token.kind in _DAY_KINDS and following.kind in _TIME_KINDS:
+                    yield 3, token.start, following.end, token.value, following.value, None
+                elif adjacent and token.kind in _TIME_KINDS and following.kind in _DAY_KINDS:
+                    yield 3, token.start, following.end, following.value, token.value, None
+
+    @staticmethod
+    def _resolve(now: datetime, day, clock, delta) -> Optional[datetime]:
+        if delta is not None:
+            return now + delta
+
+        hours, minutes = clock if clock else (DEFAULT_HOUR, 0)
+        kind, value = day if day else ('offset', None)
+
+        if kind == 'offset':
+            if value is None:
+                # Только время: сегодня, а если оно уже прошло - завтра
+                result = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+                if result < now:
+                    result += timedelta(days=1)
+                return result
+            return (now + timedelta(days=value)).replace(hour=hours, minute=minutes, second=0, microsecond=0)
+
+        if kind == 'weekday':
+            result = (now + timedelta(days=(value - now.weekday()) % 7)).replace(
+                hour=hours, minute=minutes, second=0, microsecond=0
+            )
+            if result <= now:
+                result += timedelta(days=7)
+            return result
+
+        year, month, day_of_month = value
         try:
-            hours, minutes = map(int, time_str.split(':'))
-            if not (0 <= hours <= 23 and 0 <= minutes <= 59):
-                return None
-                
-            now = datetime.now()
-            tomorrow = now + timedelta(days=1)
-            return tomorrow.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+            result = now.replace(
+                year=year or now.year, month=month, day=day_of_month,
+                hour=hours, minute=minutes, second=0, microsecond=0
+            )
+            if year is None and result < now:
+                result = result.replace(year=now.year + 1)
         except ValueError:
+            # 29 февраля в невисокосном году
             return None
-    
-    def _parse_tomorrow_hour(self, match) -> Optional[datetime]:
-        """Парсинг времени (завтра в ЧЧ часов)"""
-        hours = int(match.group(1))
-        
-        if not (0 <= hours <= 23):
-            return None
-            
-        now = datetime.now()
-        tomorrow = now + timedelta(days=1)
-        return tomorrow.replace(hour=hours, minute=0, second=0, microsecond=0)
-    
-    def _parse_single_unit(self, match) -> Optional[datetime]:
-        """Парсинг единичных временных выражений"""
-        unit = match.group(1)
-        now = datetime.now()
-        
-        if unit == 'час':
-            return now + timedelta(hours=1)
-        elif unit == 'минуту':
-            return now + timedelta(minutes=1)
-        elif unit == 'день':
-            return now + timedelta(days=1)
-        
-        return None
\ No newline at end of file
+        return result
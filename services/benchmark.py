@@ -0,0 +1,235 @@
+"""
+Синтетический бенчмарк пиковой минуты: N напоминаний с одним и тем же сроком.
+
+Напоминания записываются во временную базу, затем проходят реальный путь
+диспетчер -> очередь доставки -> отметка о доставке; отправка в Telegram
+заменена заглушкой с заданной задержкой и лимитом частоты.
+
+С --users напоминания распределяются между пользователями по степенному закону, как у
+реальной аудитории (у немногих - десятки напоминаний на одну минуту), и сравнивается
+отправка по одному сообщению на напоминание и объединение напоминаний одного чата:
+число вызовов API на доставленное напоминание и время доставки всей минуты.
+
+С --stored - окно диспетчера над базой из N напоминаний, равномерно распределённых на
+--days дней: время загрузки окна, число напоминаний и память в окне, стоимость тика;
+для сравнения - то же со всеми напоминаниями в памяти (окно на весь горизонт), как было
+у планировщика с заданием на каждое напоминание.
+
+Запуск:
+    python -m services.benchmark                              - 100 000 напоминаний
+    python -m services.benchmark --reminders 10000 --rate 30  - с лимитом Telegram по умолчанию
+    python -m services.benchmark --prestage 0                 - без предварительной подготовки
+    python -m services.benchmark --reminders 20000 --users 5000 --rate 30
+    python -m services.benchmark --stored 1000000 --days 30
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+def _owners(count: int, users: int, exponent: float = 2.0, most: int = 100):
+    """Владельцы напоминаний: по одному на пользователя или по степенному закону P(k) ~ k^-exponent
+    числа напоминаний на пользователя (большинство - одно-два, немногие - десятки) среди users пользователей."""
+    if not users:
+        return range(1, count + 1)
+
+    rng = random.Random(1)
+    sizes = range(1, most + 1)
+    weights = [size ** -exponent for size in sizes]
+    owners = []
+
+    for user_id in itertools.cycle(range(1, users + 1)):
+        owners.extend([user_id] * rng.choices(sizes, weights)[0])
+        if len(owners) >= count:
+            return owners[:count]
+
+def _populate(db_name: str, count: int, due: datetime.datetime, users: int = 0):
+    conn = sqlite3.connect(db_name)
+    conn.executemany(
+        "INSERT INTO notifications (user_id, text, notification_time, job_id) VALUES (?, ?, ?, ?)",
+        ((user_id, f"Напоминание {index}", int(due.timestamp()), str(uuid.uuid4()))
+         for index, user_id in enumerate(_owners(count, users), start=1))
+    )
+    conn.commit()
+    conn.close()
+
+async def run(count: int, rate: float, send_latency: float, prestage: float, lead: float, users: int = 0, window: float = 0.0) -> dict:
+    # Модули с пулом соединений импортируются после подмены DB_NAME
+    from database.models import init_db
+    from database.repository import close_pool, mark_notification_delivered
+    from services.delivery import DeliveryQueue, DeliveryItem
+    from services.dispatcher import ReminderDispatcher
+    from services.lag import LagTracker
+    from config.settings import DB_NAME, DELIVERY_WORKERS, DELIVERY_PER_CHAT_INTERVAL
+    from services.notifier import format_notification, merge_notifications
+    from utils.timezones import utc_now
+
+    init_db(DB_NAME)
+    due = (utc_now() + datetime.timedelta(seconds=lead)).replace(microsecond=0)
+    _populate(DB_NAME, count, due, users)
+
+    tracker = LagTracker()
+    done = asyncio.Event()
+    delivered = 0
+    calls = 0
+
+    async def send(user_id: int, text: str):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(send_latency)
+
+    async def on_delivered(item: DeliveryItem):
+        nonlocal delivered
+        tracker.record(item.scheduled_at, item.dispatched_at, item.acked_at)
+        await mark_notification_delivered(item.notification_id, item.dispatched_at, item.acked_at)
+        delivered += 1
+        if delivered == count:
+            done.set()
+
+    # У каждого пользователя одно напоминание - ограничение на чат не действует
+    queue = DeliveryQueue(
+        send, on_delivered=on_delivered, workers=DELIVERY_WORKERS,
+        maxsize=count, global_rate=rate, per_chat_interval=DELIVERY_PER_CHAT_INTERVAL if users else 0,
+        merge=merge_notifications if window else None, coalesce_window=window
+    )
+
+    async def deliver(reminders):
+        for user_id, text, notification_id, notification_time, _ in reminders:
+            await queue.put(user_id, text, notification_id, notification_time)
+
+    prepare = format_notification if users else lambda text: f"🔔 {text}"
+    dispatcher = ReminderDispatcher(deliver, prestage=prestage, prepare=prepare)
+
+    started = time.perf_counter()
+    queue.start()
+    await dispatcher.start(utc_now())
+    await done.wait()
+    elapsed = time.perf_counter() - started
+
+    await dispatcher.stop()
+    await queue.stop()
+    close_pool()
+
+    stages = tracker.report()[-1][1]
+    return {'reminders': count, 'calls': calls, 'elapsed': elapsed, **stages}
+
+def _populate_spread(db_name: str, count: int, start: datetime.datetime, days: float):
+    conn = sqlite3.connect(db_name)
+    rng = random.Random(1)
+    first, span = int(start.timestamp()), int(days * 86400)
+    conn.executemany(
+        "INSERT INTO notifications (user_id, text, notification_time, job_id) VALUES (?, ?, ?, ?)",
+        ((index % 100000, f"Напоминание {index}", first + rng.randrange(span), str(uuid.uuid4())) for index in range(count))
+    )
+    conn.commit()
+    conn.close()
+
+async def run_window(lookahead: float, ticks: int) -> dict:
+    from database.repository import close_pool
+    from services.dispatcher import ReminderDispatcher
+    from utils.timezones import utc_now
+
+    async def deliver(reminders):
+        pass
+
+    dispatcher = ReminderDispatcher(deliver, lookahead=lookahead, batch_size=10000)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    await dispatcher.start(utc_now())
+    load = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    await dispatcher.stop()
+
+    # Тик без наступивших напоминаний: извлечение, подготовка и расчёт времени сна
+    now = utc_now()
+    started = time.perf_counter()
+    for _ in range(ticks):
+        dispatcher._pop_due(now)
+        dispatcher._stage(now + dispatcher.prestage)
+        dispatcher._sleep_time(now)
+    tick = (time.perf_counter() - started) / ticks
+
+    close_pool()
+    return {'load': load, 'pending': dispatcher.pending, 'memory': memory, 'tick': tick}
+
+def main_stored(args: argparse.Namespace) -> int:
+    # Модули с пулом соединений и настройками импортируются после подмены DB_NAME
+    from config.settings import DB_NAME, DISPATCH_LOOKAHEAD_SECONDS
+    from database.models import init_db
+    from utils.timezones import utc_now
+
+    init_db(DB_NAME)
+    _populate_spread(DB_NAME, args.stored, utc_now() + datetime.timedelta(minutes=1), args.days)
+
+    print(f"Напоминаний в базе: {args.stored:,} на {args.days:g} дней")
+    print(f"{'окно':<22} {'загрузка, мс':>13} {'в памяти':>10} {'память, МБ':>11} {'тик, мкс':>9}")
+    for lookahead, title in (
+        (DISPATCH_LOOKAHEAD_SECONDS, f"{DISPATCH_LOOKAHEAD_SECONDS:g} с"),
+        (args.days * 86400 + 3600, "весь горизонт"),
+    ):
+        report = asyncio.run(run_window(lookahead, args.ticks))
+        print(
+            f"{title:<22} {report['load'] * 1000:>13.1f} {report['pending']:>10,} "
+            f"{report['memory'] / 2 ** 20:>11.1f} {report['tick'] * 1e6:>9.1f}"
+        )
+    return 0
+
+def main_coalesce(args: argparse.Namespace) -> int:
+    owners = list(_owners(args.reminders, args.users))
+    counts = sorted((owners.count(user_id) for user_id in set(owners)), reverse=True) if args.reminders <= 100_000 else []
+    print(f"Напоминаний: {args.reminders:,} у {len(set(owners)):,} пользователей" + (
+        f", у самого активного - {counts[0]}, с одним напоминанием - {counts.count(1):,}" if counts else ""
+    ))
+    print(f"{'отправка':<12} {'вызовов API':>12} {'на напоминание':>15} {'вся минута, с':>14} {'p99 подтверждения, с':>21}")
+
+    for window, title in ((0.0, "по одному"), (args.window, f"окно {args.window:g} с")):
+        report = asyncio.run(run(args.reminders, args.rate, args.send_latency, args.prestage, args.lead, args.users, window))
+        print(
+            f"{title:<12} {report['calls']:>12,} {report['calls'] / report['reminders']:>15.3f} "
+            f"{report['elapsed']:>14.1f} {report['ack']['p99']:>21.1f}"
+        )
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, default=100_000)
+    parser.add_argument("--rate", type=float, default=1_000_000, help="лимит отправок в секунду")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="задержка ответа Telegram, с")
+    parser.add_argument("--prestage", type=float, default=5.0, help="упреждение подготовки, с")
+    parser.add_argument("--lead", type=float, default=10.0, help="через сколько секунд наступает пиковая минута")
+    parser.add_argument("--users", type=int, default=0, help="распределить напоминания между пользователями по степенному закону")
+    parser.add_argument("--window", type=float, default=1.0, help="окно объединения напоминаний одного чата, с")
+    parser.add_argument("--stored", type=int, help="измерить окно диспетчера над заданным числом напоминаний в базе")
+    parser.add_argument("--days", type=float, default=30.0, help="горизонт напоминаний для --stored, дней")
+    parser.add_argument("--ticks", type=int, default=10000, help="тиков для замера в --stored")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DB_NAME"] = os.path.join(directory, "benchmark.db")
+        os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+        if args.stored:
+            return main_stored(args)
+        if args.users:
+            return main_coalesce(args)
+        report = asyncio.run(run(args.reminders, args.rate, args.send_latency, args.prestage, args.lead))
+
+    print(f"Напоминаний: {report['reminders']:,}, все доставлены за {report['elapsed']:.1f} с")
+    for stage, title in (('dispatch', 'передача в очередь'), ('ack', 'подтверждение отправки')):
+        stats = report[stage]
+        print(
+            f"  {title}: p50 {stats['p50']:.2f} с, p95 {stats['p95']:.2f} с, "
+            f"p99 {stats['p99']:.2f} с, max {stats['max']:.2f} с"
+        )
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
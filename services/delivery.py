@@ -0,0 +1,301 @@
+import asyncio
+import datetime
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from utils.timezones import utc_now
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DeliveryItem:
+    user_id: int
+    text: str
+    notification_id: int
+    attempts: int = 0
+    # Срок напоминания, передача в очередь и подтверждение отправки от Telegram
+    scheduled_at: Optional[datetime.datetime] = None
+    dispatched_at: Optional[datetime.datetime] = None
+    acked_at: Optional[datetime.datetime] = None
+    # Напоминания того же чата, присоединённые к этому сообщению, и сколько из всех уже отправлено
+    merged: List["DeliveryItem"] = field(default_factory=list)
+    sent_parts: int = 0
+
+    @property
+    def parts(self) -> List["DeliveryItem"]:
+        return [self, *self.merged][self.sent_parts:]
+
+class TokenBucket:
+    """Ведро токенов: не более rate операций в секунду с запасом capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def reset(self, rate: float, capacity: float):
+        """Задаёт новый лимит и заполняет ведро до новой ёмкости."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений с ограничением частоты и повторными попытками.
+
+    Ограниченная очередь разбирается несколькими воркерами. Отправка проходит через
+    общее ведро токенов и ограничение частоты для каждого чата; ответы 429 приостанавливают
+    все отправки на retry_after, временные ошибки повторяются с экспоненциальной задержкой,
+    а постоянные (пользователь заблокировал бота и т.п.) попадают в dead letter.
+
+    С merge напоминание, поставленное в очередь не позже coalesce_window секунд после
+    ещё не отправленного сообщения того же чата, присоединяется к нему. merge получает
+    тексты напоминаний и возвращает сообщения с числом напоминаний, которые каждое
+    завершает; on_delivered и dead letter вызываются для каждого напоминания отдельно.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[int, str], Awaitable[None]],
+        on_delivered: Optional[Callable[[DeliveryItem], Awaitable[object]]] = None,
+        on_dead_letter: Optional[Callable[[int, int, str], Awaitable[object]]] = None,
+        workers: int = 8,
+        maxsize: int = 10000,
+        global_rate: float = 30,
+        per_chat_interval: float = 1.0,
+        max_attempts: int = 5,
+        backoff_base: float = 1.0,
+        merge: Optional[Callable[[List[str]], List[Tuple[str, int]]]] = None,
+        coalesce_window: float = 0.0
+    ):
+        self.send = send
+        self.on_delivered = on_delivered
+        self.on_dead_letter = on_dead_letter
+        self.workers = workers
+        self.per_chat_interval = per_chat_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.merge = merge
+        self.coalesce_window = coalesce_window if merge else 0.0
+
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # Запас в один токен: с запасом в global_rate токенов всплеск после простоя добавлял к ним
+        # ещё global_rate отправок за ту же секунду, и Telegram отвечал 429
+        self.bucket = TokenBucket(global_rate, 1)
+
+        self._chat_next_send: Dict[int, float] = {}
+        self._paused_until = 0.0
+        self._tasks: List[asyncio.Task] = []
+        self._retries = set()
+        # Чат -> сообщение в очереди, к которому ещё можно присоединить напоминание, и срок присоединения
+        self._open: Dict[int, Tuple[DeliveryItem, float]] = {}
+
+        self.stats = {
+            'queued': 0,
+            'coalesced': 0,
+            'sent': 0,
+            'retried': 0,
+            'rate_limited': 0,
+            'dead_lettered': 0,
+        }
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            **self.stats,
+            'queue_depth': self.queue.qsize(),
+            'pending_retries': len(self._retries),
+        }
+
+    def start(self):
+        if self._tasks:
+            return
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Очередь доставки запущена ({self.workers} воркеров)")
+
+    async def stop(self, timeout: float = 10):
+        """Дожидается отправки уже принятых сообщений (не дольше timeout) и останавливает воркеров."""
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Очередь доставки не опустела за {timeout} с, осталось {self.queue.qsize()} сообщений")
+
+        for task in self._tasks + list(self._retries):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+
+        logger.info(f"Очередь доставки остановлена: {self.get_stats()}")
+
+    async def _drain(self):
+        while True:
+            await self.queue.join()
+            if not self._retries:
+                return
+            await asyncio.gather(*self._retries, return_exceptions=True)
+
+    async def put(self, user_id: int, text: str, notification_id: int, scheduled_at: Optional[datetime.datetime] = None):
+        item = DeliveryItem(user_id, text, notification_id, scheduled_at=scheduled_at, dispatched_at=utc_now())
+        self.stats['queued'] += 1
+        if self._coalesce(item):
+            return
+
+        await self.queue.put(item)
+        if self.coalesce_window:
+            self._open[user_id] = (item, time.monotonic() + self.coalesce_window)
+
+    def _coalesce(self, item: DeliveryItem) -> bool:
+        opened = self._open.get(item.user_id)
+        if opened is None:
+            return False
+
+        head, deadline = opened
+        if time.monotonic() > deadline:
+            del self._open[item.user_id]
+            return False
+
+        head.merged.append(item)
+        self.stats['coalesced'] += 1
+        return True
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            try:
+                await self._deliver(item)
+            except Exception as e:
+                logger.error(f"Ошибка в воркере доставки для уведомления {item.notification_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _wait_chat_slot(self, chat_id: int):
+        now = time.monotonic()
+        next_send = self._chat_next_send.get(chat_id, now)
+        self._chat_next_send[chat_id] = max(now, next_send) + self.per_chat_interval
+
+        if next_send > now:
+            await asyncio.sleep(next_send - now)
+
+        if len(self._chat_next_send) > self.queue.maxsize:
+            self._prune_chat_slots()
+
+    def _prune_chat_slots(self):
+        now = time.monotonic()
+        self._chat_next_send = {
+            chat_id: next_send for chat_id, next_send in self._chat_next_send.items() if next_send > now
+        }
+
+    async def _deliver(self, item: DeliveryItem):
+        await self._wait_send_slot(item.user_id)
+
+        # С этого момента к сообщению ничего не присоединяется
+        if self._open.get(item.user_id, (None,))[0] is item:
+            del self._open[item.user_id]
+        item.attempts += 1
+
+        try:
+            await self._send(item)
+        except TelegramRetryAfter as e:
+            self.stats['rate_limited'] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            logger.warning(f"Telegram ограничил частоту отправки, пауза {e.retry_after} с")
+            self._retry(item, e.retry_after, count_attempt=False)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            parts = item.parts
+            if isinstance(e, TelegramBadRequest) and len(parts) > 1:
+                # Ошибка может быть в одном из текстов: остальные не должны пропасть вместе с ним
+                item.merged, item.sent_parts = [], 0
+                for part in parts:
+                    part.attempts = item.attempts
+                    self._retry(part, 0)
+                return
+            for part in parts:
+                await self._dead_letter(part, str(e))
+        except (TelegramNetworkError, TelegramServerError) as e:
+            if item.attempts >= self.max_attempts:
+                for part in item.parts:
+                    await self._dead_letter(part, str(e))
+            else:
+                delay = self.backoff_base * 2 ** (item.attempts - 1)
+                logger.warning(f"Временная ошибка при отправке уведомления {item.notification_id}, повтор через {delay} с: {e}")
+                self._retry(item, delay)
+        except Exception as e:
+            # TelegramNotFound, TelegramUnauthorizedError, TelegramMigrateToChat и прочее: повтор не поможет,
+            # но напоминания сообщения не должны пропасть без записи в dead letter
+            for part in item.parts:
+                await self._dead_letter(part, str(e))
+
+    async def _wait_send_slot(self, chat_id: int):
+        await self._wait_chat_slot(chat_id)
+
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+        await self.bucket.acquire()
+
+    async def _send(self, item: DeliveryItem):
+        """Отправляет неотправленные напоминания сообщения; каждое отмечается, как только отправлено его последнее сообщение."""
+        parts = item.parts
+        messages = self.merge([part.text for part in parts]) if self.merge else [(item.text, 1)]
+
+        for index, (text, count) in enumerate(messages):
+            if index:
+                await self._wait_send_slot(item.user_id)
+            await self.send(item.user_id, text)
+            self.stats['sent'] += 1
+
+            delivered, parts = parts[:count], parts[count:]
+            item.sent_parts += count
+            acked_at = utc_now()
+
+            for part in delivered:
+                part.acked_at = acked_at
+                logger.info(f"Уведомление {part.notification_id} отправлено пользователю {part.user_id}")
+                if self.on_delivered:
+                    await self.on_delivered(part)
+
+    def _retry(self, item: DeliveryItem, delay: float, count_attempt: bool = True):
+        if not count_attempt:
+            item.attempts -= 1
+        self.stats['retried'] += 1
+
+        task = asyncio.create_task(self._requeue_later(item, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _requeue_later(self, item: DeliveryItem, delay: float):
+        await asyncio.sleep(delay)
+        await self.queue.put(item)
+
+    async def _dead_letter(self, item: DeliveryItem, error: str):
+        self.stats['dead_lettered'] += 1
+        logger.error(f"Уведомление {item.notification_id} не доставлено пользователю {item.user_id}: {error}")
+
+        if self.on_dead_letter:
+            await self.on_dead_letter(item.notification_id, item.user_id, error)
@@ -0,0 +1,207 @@
+import asyncio
+import datetime
+import heapq
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from database.repository import iter_pending_notifications
+from nlp.recurrence import Recurrence
+from utils.timezones import from_epoch, to_epoch, utc_now
+
+logger = logging.getLogger(__name__)
+
+# (user_id, text, notification_id, notification_time, следующее срабатывание повторяющегося напоминания или None)
+Reminder = Tuple[int, str, int, datetime.datetime, Optional[datetime.datetime]]
+
+class ReminderDispatcher:
+    """Диспетчер напоминаний с окном упреждения.
+
+    В памяти хранится только куча напоминаний, срок которых наступает в пределах
+    lookahead; более дальние остаются в базе и подгружаются по мере сдвига окна.
+
+    За prestage секунд до срока напоминания заранее извлекаются из кучи и готовятся
+    к отправке (prepare форматирует текст), а цикл просыпается точно к сроку ближайшего
+    из них, а не по сетке тиков. Все наступившие напоминания передаются одной пачкой.
+
+    Повторяющееся напоминание после срабатывания сразу возвращается в окно со сроком
+    следующего срабатывания; сохранить новый срок в базе должен deliver.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[List[Reminder]], Awaitable[None]],
+        lookahead: float = 600,
+        tick: float = 1.0,
+        batch_size: int = 1000,
+        shard: int = 0,
+        prestage: float = 5.0,
+        prepare: Optional[Callable[[str], str]] = None
+    ):
+        self.deliver = deliver
+        self.shard = shard
+        self.lookahead = datetime.timedelta(seconds=lookahead)
+        self.tick = tick
+        self.batch_size = batch_size
+        self.prestage = datetime.timedelta(seconds=prestage)
+        self.prepare = prepare
+
+        self._heap: List[Tuple[datetime.datetime, int, str]] = []
+        # Подготовленные к отправке: (notification_time, notification_id, job_id, user_id, текст)
+        self._staged: List[Tuple[datetime.datetime, int, str, int, str]] = []
+        self._entries: Dict[str, Tuple[datetime.datetime, int, int, str, Optional[str]]] = {}
+        # Граница загруженного окна - целая секунда: время в базе хранится в целых секундах UTC
+        self._loaded_until: Optional[datetime.datetime] = None
+        self._refill_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._entries)
+
+    async def start(self, catch_up_since: datetime.datetime):
+        """Загружает начальное окно и запускает цикл тиков.
+
+        Недоставленные напоминания позже catch_up_since, но уже наступившие,
+        будут отправлены на первом тике.
+        """
+        self._loaded_until = from_epoch(to_epoch(catch_up_since))
+        await self._refill(utc_now())
+
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Диспетчер напоминаний запущен, в окне {self.pending} напоминаний")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(
+        self, user_id: int, text: str, notification_time: datetime.datetime, notification_id: int, job_id: str,
+        recurrence: Optional[str] = None
+    ):
+        # Напоминания за пределами загруженного окна подхватит очередная подгрузка из базы
+        if not self._in_window(notification_time):
+            return
+
+        self._push(notification_time, notification_id, user_id, text, job_id, recurrence)
+
+    def schedule_many(self, user_id: int, reminders: List[Tuple[str, datetime.datetime, int, str, Optional[str]]]):
+        """Пачка напоминаний одного пользователя: (text, notification_time, notification_id, job_id, recurrence)."""
+        if self._loaded_until is None:
+            return
+
+        for text, notification_time, notification_id, job_id, recurrence in reminders:
+            if self._in_window(notification_time):
+                self._push(notification_time, notification_id, user_id, text, job_id, recurrence)
+
+    def _in_window(self, notification_time: datetime.datetime) -> bool:
+        """Попадает ли срок в загруженное окно; сравнение в целых секундах, как в запросе подгрузки."""
+        return self._loaded_until is not None and to_epoch(notification_time) <= to_epoch(self._loaded_until)
+
+    def cancel(self, job_id: str) -> bool:
+        # Запись в куче удаляется лениво, при извлечении
+        return self._entries.pop(job_id, None) is not None
+
+    def _push(
+        self, run_date: datetime.datetime, notification_id: int, user_id: int, text: str, job_id: str,
+        recurrence: Optional[str] = None
+    ):
+        if job_id in self._entries:
+            return
+
+        self._entries[job_id] = (run_date, notification_id, user_id, text, recurrence)
+        heapq.heappush(self._heap, (run_date, notification_id, job_id))
+
+    async def _refill(self, now: datetime.datetime):
+        async with self._refill_lock:
+            until = from_epoch(to_epoch(now + self.lookahead))
+            loaded = 0
+
+            # Граница сдвигается до запроса: напоминание, сохранённое после снимка запроса, примет schedule(),
+            # а попавшее и туда, и в выборку, _push не добавит дважды
+            previous, self._loaded_until = self._loaded_until, until
+            try:
+                async for batch in iter_pending_notifications(self.shard, previous, until, self.batch_size):
+                    for notification_id, user_id, text, notification_time, job_id, recurrence in batch:
+                        self._push(from_epoch(notification_time), notification_id, user_id, text, job_id, recurrence)
+                    loaded += len(batch)
+            except Exception:
+                # Окно не загружено: следующая подгрузка повторит его с прежней границы
+                self._loaded_until = previous
+                raise
+
+            if loaded:
+                logger.debug(f"В окно диспетчера загружено {loaded} напоминаний до {until}")
+
+    def _stage(self, until: datetime.datetime):
+        """Переносит напоминания со сроком до until из кучи окна в очередь подготовленных."""
+        prepare = self.prepare
+
+        while self._heap and self._heap[0][0] <= until:
+            run_date, notification_id, job_id = heapq.heappop(self._heap)
+            entry = self._entries.get(job_id)
+
+            if entry is None or entry[0] != run_date:
+                continue
+
+            text = prepare(entry[3]) if prepare else entry[3]
+            heapq.heappush(self._staged, (run_date, notification_id, job_id, entry[2], text))
+
+    def _pop_due(self, now: datetime.datetime) -> List[Reminder]:
+        self._stage(now)
+        due = []
+
+        while self._staged and self._staged[0][0] <= now:
+            run_date, notification_id, job_id, user_id, text = heapq.heappop(self._staged)
+            entry = self._entries.get(job_id)
+
+            # Отменено или перенесено после подготовки
+            if entry is None or entry[0] != run_date:
+                continue
+
+            del self._entries[job_id]
+            next_time = None
+
+            recurrence = entry[4]
+            if recurrence is not None:
+                next_time = Recurrence.decode(recurrence).next_after(run_date, now)
+                if self._in_window(next_time):
+                    self._push(next_time, notification_id, user_id, entry[3], job_id, recurrence)
+
+            due.append((user_id, text, notification_id, run_date, next_time))
+
+        return due
+
+    def _sleep_time(self, now: datetime.datetime) -> float:
+        """Время до следующего пробуждения: к сроку ближайшего напоминания, но не позже чем через tick."""
+        wake = now + datetime.timedelta(seconds=self.tick)
+
+        if self._staged and self._staged[0][0] < wake:
+            wake = self._staged[0][0]
+        if self._heap and self._heap[0][0] - self.prestage < wake:
+            wake = self._heap[0][0] - self.prestage
+
+        return max(0.0, (wake - now).total_seconds())
+
+    async def _run(self):
+        refill_step = self.lookahead / 2
+
+        while True:
+            await asyncio.sleep(self._sleep_time(utc_now()))
+            now = utc_now()
+
+            try:
+                if now + refill_step >= self._loaded_until:
+                    await self._refill(now)
+
+                due = self._pop_due(now)
+                if due:
+                    await self.deliver(due)
+
+                self._stage(utc_now() + self.prestage)
+            except Exception as e:
+                logger.error(f"Ошибка в цикле диспетчера напоминаний: {e}")
@@ -0,0 +1,95 @@
+import bisect
+import datetime
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from utils.metrics import registry
+from utils.timezones import UTC
+
+# Границы корзин задержки доставки (секунды)
+LAG_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+# dispatch - от срока напоминания до передачи в очередь доставки, ack - до подтверждения Telegram
+STAGES = ('dispatch', 'ack')
+
+lag_seconds = registry.histogram(
+    "bot_delivery_lag_seconds", "Задержка доставки напоминаний относительно их срока", "stage", LAG_BUCKETS
+)
+
+class _MinuteStats:
+    __slots__ = ('counts', 'maximum', 'total')
+
+    def __init__(self):
+        self.counts = [0] * (len(LAG_BUCKETS) + 1)
+        self.maximum = 0.0
+        self.total = 0
+
+    def add(self, lag: float):
+        self.counts[bisect.bisect_left(LAG_BUCKETS, lag)] += 1
+        self.total += 1
+        if lag > self.maximum:
+            self.maximum = lag
+
+    def quantile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает квантиль q (не больше максимума)."""
+        rank = q * self.total
+        seen = 0
+        for bound, count in zip(LAG_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+class LagTracker:
+    """Гистограммы задержки доставки по минутам (UTC) срока напоминания за последние minutes минут."""
+
+    def __init__(self, minutes: int = 60):
+        self.minutes = minutes
+        self._minutes: "OrderedDict[datetime.datetime, Dict[str, _MinuteStats]]" = OrderedDict()
+
+    def record(self, scheduled_at: datetime.datetime, dispatched_at: datetime.datetime, acked_at: datetime.datetime):
+        minute = scheduled_at.astimezone(UTC).replace(second=0, microsecond=0)
+        stats = self._minutes.get(minute)
+        if stats is None:
+            stats = self._add_minute(minute)
+
+        for stage, moment in zip(STAGES, (dispatched_at, acked_at)):
+            lag = max(0.0, (moment - scheduled_at).total_seconds())
+            stats[stage].add(lag)
+            lag_seconds.observe(stage, lag)
+
+    def _add_minute(self, minute: datetime.datetime) -> Dict[str, _MinuteStats]:
+        stats = {stage: _MinuteStats() for stage in STAGES}
+        out_of_order = bool(self._minutes) and minute < next(reversed(self._minutes))
+
+        self._minutes[minute] = stats
+        if out_of_order:
+            # Просроченные напоминания (догонка после простоя) добавляют минуту не по порядку
+            self._minutes = OrderedDict(sorted(self._minutes.items()))
+
+        while len(self._minutes) > self.minutes:
+            self._minutes.popitem(last=False)
+
+        return stats
+
+    def report(self, last: Optional[int] = None) -> List[Tuple[datetime.datetime, Dict[str, Dict[str, float]]]]:
+        """Для каждой минуты: число доставок и p50/p95/p99/max задержки по этапам."""
+        minutes = list(self._minutes.items())
+        if last is not None:
+            minutes = minutes[-last:]
+
+        return [
+            (minute, {
+                stage: {
+                    'count': stats.total,
+                    'p50': stats.quantile(0.5),
+                    'p95': stats.quantile(0.95),
+                    'p99': stats.quantile(0.99),
+                    'max': stats.maximum,
+                }
+                for stage, stats in by_stage.items()
+            })
+            for minute, by_stage in minutes
+        ]
+
+lag_tracker = LagTracker()
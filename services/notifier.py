@@ -1,17 +1,133 @@
+import html
 import logging
+from typing import List, Optional, Tuple
+
 from aiogram import Bot
-from config.settings import BOT_TOKEN
+
+from config.settings import (
+    DELIVERY_WORKERS, DELIVERY_QUEUE_SIZE, DELIVERY_GLOBAL_RATE,
+    DELIVERY_PER_CHAT_INTERVAL, DELIVERY_MAX_ATTEMPTS, DELIVERY_COALESCE_WINDOW, MESSAGE_MAX_LENGTH
+)
+from database.repository import mark_notification_delivered, save_dead_letter
+from services.delivery import DeliveryQueue, DeliveryItem
+from services.lag import lag_tracker
+from utils.metrics import registry
 
 logger = logging.getLogger(__name__)
-bot = Bot(token=BOT_TOKEN)
-
-async def send_notification(user_id: int, text: str, notification_id: int):
-    try:
-        await bot.send_message(
-            user_id,
-            f"🔔 <b>Напоминание!</b>\n\n{text}",
-            parse_mode="HTML"
-        )
-        logger.info(f"Уведомление {notification_id} отправлено пользователю {user_id}")
-    except Exception as e:
-        logger.error(f"Ошибка при отправке уведомления {notification_id}: {e}")
\ No newline at end of file
+# Бот процесса (utils.telegram.create_bot): задаётся при запуске планировщика, сессией владеет вызывающий
+bot: Optional[Bot] = None
+
+NOTIFICATION_HEADER = "🔔 <b>Напоминание!</b>\n\n"
+
+def format_notification(text: str) -> str:
+    return f"{NOTIFICATION_HEADER}{html.escape(text)}"
+
+def _length(text: str) -> int:
+    # Telegram считает длину в кодовых единицах UTF-16; разметка засчитывается с запасом
+    return len(text.encode("utf-16-le")) // 2
+
+def _fit(text: str, limit: int) -> int:
+    """Число символов самого длинного начала text не длиннее limit (но не меньше одного символа)."""
+    low, high = 1, min(len(text), limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _length(text[:middle]) <= limit:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def split_message(text: str, limit: int = MESSAGE_MAX_LENGTH) -> List[str]:
+    """Режет текст на сообщения не длиннее limit: по переводу строки, пробелу или, в крайнем случае, где придётся."""
+    pieces = []
+
+    while _length(text) > limit:
+        # Каждый кусок содержит хотя бы один символ, иначе текст из эмодзи (два UTF-16 на символ) не сокращался бы
+        cut = _fit(text, limit)
+
+        boundary = max(text.rfind("\n", 0, cut), text.rfind(" ", 0, cut))
+        if boundary > cut // 2:
+            cut = boundary
+        else:
+            # Не разрезать HTML-сущность вроде &amp;
+            entity = text.rfind("&", max(0, cut - 8), cut)
+            if entity > 0 and ";" not in text[entity:cut]:
+                cut = entity
+
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip("\n ")
+
+    pieces.append(text)
+    return pieces
+
+def merge_notifications(texts: List[str], limit: int = MESSAGE_MAX_LENGTH) -> List[Tuple[str, int]]:
+    """Склеивает подготовленные (format_notification) напоминания одного чата в сообщения не длиннее limit.
+
+    Возвращает (текст, сколько напоминаний завершает сообщение) в порядке отправки.
+    """
+    if len(texts) == 1:
+        pieces = split_message(texts[0], limit)
+        return [(piece, 0) for piece in pieces[:-1]] + [(pieces[-1], 1)]
+
+    header = f"🔔 <b>Напоминания ({len(texts)}):</b>\n\n"
+    messages = []
+    current, length, count = header, _length(header), 0
+
+    for number, text in enumerate(texts, start=1):
+        entry = f"{number}. {text.removeprefix(NOTIFICATION_HEADER)}"
+        entry_length = _length(entry) + (2 if count else 0)
+
+        if count and length + entry_length > limit:
+            messages.append((current, count))
+            current, length, count = header, _length(header), 0
+            entry_length -= 2
+
+        if length + entry_length > limit:
+            # Слишком длинное напоминание - отдельными сообщениями
+            pieces = split_message(header + entry, limit)
+            messages.extend([(piece, 0) for piece in pieces[:-1]] + [(pieces[-1], 1)])
+            continue
+
+        current += f"\n\n{entry}" if count else entry
+        length += entry_length
+        count += 1
+
+    if count:
+        messages.append((current, count))
+    return messages
+
+def set_bot(instance: Bot):
+    global bot
+    bot = instance
+
+async def _send(user_id: int, text: str):
+    await bot.send_message(user_id, text, parse_mode="HTML")
+
+async def _on_delivered(item: DeliveryItem):
+    if item.scheduled_at:
+        lag_tracker.record(item.scheduled_at, item.dispatched_at, item.acked_at)
+    await mark_notification_delivered(item.notification_id, item.dispatched_at, item.acked_at)
+
+delivery = DeliveryQueue(
+    _send,
+    on_delivered=_on_delivered,
+    on_dead_letter=save_dead_letter,
+    workers=DELIVERY_WORKERS,
+    maxsize=DELIVERY_QUEUE_SIZE,
+    global_rate=DELIVERY_GLOBAL_RATE,
+    per_chat_interval=DELIVERY_PER_CHAT_INTERVAL,
+    max_attempts=DELIVERY_MAX_ATTEMPTS,
+    merge=merge_notifications,
+    coalesce_window=DELIVERY_COALESCE_WINDOW
+)
+
+registry.gauge("bot_delivery_queue_depth", "Сообщения в очереди доставки", lambda: delivery.queue.qsize())
+registry.gauge("bot_delivery_pending_retries", "Сообщения, ожидающие повторной отправки", lambda: delivery.get_stats()["pending_retries"])
+registry.counter("bot_delivery_events_total", "События очереди доставки", lambda: delivery.stats, label="event")
+
+async def send_notification(user_id: int, text: str, notification_id: int, scheduled_at=None):
+    """
+    Ставит уже отформатированное (format_notification) уведомление в очередь доставки;
+    при заполненной очереди ждёт свободного места.
+    """
+    await delivery.put(user_id, text, notification_id, scheduled_at)
@@ -1,38 +1,104 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.jobstores.base import JobLookupError
+import datetime
 import logging
+from typing import List, Optional
 
-from services.notifier import send_notification
-from database.repository import clean_old_notifications
-from config.settings import CLEANUP_INTERVAL_DAYS
+from aiogram import Bot
+
+from database.repository import reschedule_notifications, get_stale_recurring
+from nlp.recurrence import Recurrence
+from services.notifier import send_notification, format_notification, delivery, set_bot
+from services.dispatcher import ReminderDispatcher, Reminder
+from utils.metrics import registry
+from utils.timezones import from_epoch, utc_now
+from config.settings import (
+    RESTORE_BATCH_SIZE, MISFIRE_POLICY, MISFIRE_GRACE_SECONDS,
+    DISPATCH_LOOKAHEAD_SECONDS, DISPATCH_TICK_SECONDS, DISPATCH_PRESTAGE_SECONDS, DELIVERY_DRAIN_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
-scheduler = AsyncIOScheduler()
+async def deliver_batch(reminders: List[Reminder]):
+    rescheduled = []
+
+    for user_id, text, notification_id, notification_time, next_time in reminders:
+        await send_notification(user_id, text, notification_id, notification_time)
+        if next_time is not None:
+            rescheduled.append((notification_id, next_time, utc_now()))
+
+    # Повторяющиеся напоминания переносятся на следующее срабатывание одной транзакцией
+    await reschedule_notifications(rescheduled)
+
+async def advance_stale_recurring(shard: int, before: datetime.datetime, now: datetime.datetime) -> int:
+    """Переносит повторяющиеся напоминания, пропущенные за время простоя, на ближайшее срабатывание после now."""
+    advanced = 0
+
+    while True:
+        rows = await get_stale_recurring(shard, before, RESTORE_BATCH_SIZE)
+        if not rows:
+            break
+
+        await reschedule_notifications([
+            (notification_id, Recurrence.decode(rule).next_after(from_epoch(notification_time), now), None)
+            for notification_id, notification_time, rule in rows
+        ])
+        advanced += len(rows)
+
+    if advanced:
+        logger.info(f"Пропущенные срабатывания {advanced} повторяющихся напоминаний перенесены")
+
+    return advanced
+
+dispatcher = ReminderDispatcher(
+    deliver_batch,
+    lookahead=DISPATCH_LOOKAHEAD_SECONDS,
+    tick=DISPATCH_TICK_SECONDS,
+    batch_size=RESTORE_BATCH_SIZE,
+    prestage=DISPATCH_PRESTAGE_SECONDS,
+    prepare=format_notification
+)
 
-def setup_scheduler():
-    scheduler.start()
+registry.gauge("bot_reminders_pending", "Напоминания в окне диспетчера, ожидающие отправки", lambda: dispatcher.pending)
+
+async def setup_scheduler(bot: Bot, shard: int = 0):
+    set_bot(bot)
+    delivery.start()
+    
+    dispatcher.shard = shard
     
-    scheduler.add_job(clean_old_notifications, 'interval', days=CLEANUP_INTERVAL_DAYS)
+    # Напоминания, наступившие за время простоя, отправляются согласно MISFIRE_POLICY
+    now = utc_now()
+    if MISFIRE_POLICY == "deliver":
+        catch_up_since = now - datetime.timedelta(seconds=MISFIRE_GRACE_SECONDS)
+    else:
+        catch_up_since = now
+        logger.info(f"MISFIRE_POLICY={MISFIRE_POLICY}: напоминания шарда {shard}, наступившие до {now}, не отправляются")
     
-    logger.info("Планировщик задач запущен")
-
-def schedule_notification(user_id: int, text: str, notification_time, notification_id: int, job_id: str):
-    scheduler.add_job(
-        send_notification,
-        'date',
-        run_date=notification_time,
-        args=[user_id, text, notification_id],
-        id=job_id
-    )
+    await advance_stale_recurring(shard, catch_up_since, now)
+    await dispatcher.start(catch_up_since)
+    
+    logger.info(f"Планировщик задач запущен (шард {shard})")
+
+async def shutdown_scheduler():
+    """Останавливает диспетчер и дожидается отправки принятых сообщений; сессию бота после этого закрывает владелец."""
+    await dispatcher.stop()
+    await delivery.stop(DELIVERY_DRAIN_SECONDS)
+
+def schedule_notification(user_id: int, text: str, notification_time, notification_id: int, job_id: str, recurrence: Optional[str] = None):
+    dispatcher.schedule(user_id, text, notification_time, notification_id, job_id, recurrence)
     
     logger.info(f"Запланировано уведомление {notification_id} для пользователя {user_id} на {notification_time}")
 
+def schedule_notifications(user_id: int, reminders: List[tuple]):
+    """Регистрирует пачку напоминаний пользователя: (text, notification_time, notification_id, job_id, recurrence)."""
+    dispatcher.schedule_many(user_id, reminders)
+    
+    logger.info(f"Запланировано {len(reminders)} уведомлений для пользователя {user_id}")
+
 def cancel_notification(job_id: str) -> bool:
-    try:
-        scheduler.remove_job(job_id)
+    if dispatcher.cancel(job_id):
         logger.debug(f"Задача {job_id} удалена из планировщика")
         return True
-    except JobLookupError:
-        logger.warning(f"Задача {job_id} не найдена в планировщике")
-        return False
\ No newline at end of file
+    
+    # Напоминание ещё не загружено в окно диспетчера: достаточно удаления из базы
+    logger.debug(f"Задача {job_id} отсутствует в окне диспетчера")
+    return False
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import secrets
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiohttp import web
+
+from config.settings import (
+    SHARD_COUNT, SHARD_HEARTBEAT_SECONDS, DELIVERY_GLOBAL_RATE, DROP_PENDING_UPDATES, METRICS_HOST, METRICS_PORT,
+    WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_MAX_CONCURRENCY
+)
+from database.repository import claim_shard, touch_shard, close_pool, flush_writes, shard_for
+from middlewares.lanes import AdmissionSlot
+from utils.telegram import create_bot
+
+logger = logging.getLogger(__name__)
+
+SHARD_QUEUE_SIZE = 10000
+# Сколько ждать запуска воркеров перед регистрацией вебхука
+SHARD_STARTUP_TIMEOUT = 120
+
+# Типы апдейтов, у которых есть поле from с автором
+_USER_UPDATE_FIELDS = (
+    'message', 'edited_message', 'callback_query', 'inline_query', 'chosen_inline_result',
+    'shipping_query', 'pre_checkout_query', 'my_chat_member', 'chat_member', 'chat_join_request',
+)
+
+def extract_user_id(update: Dict[str, Any]) -> int:
+    for field in _USER_UPDATE_FIELDS:
+        payload = update.get(field)
+        if payload and 'from' in payload:
+            return payload['from']['id']
+    return 0
+
+def run_worker(shard: int, updates: multiprocessing.Queue, ready=None):
+    """Точка входа процесса-воркера: обрабатывает апдейты и напоминания своего шарда."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - shard {shard} - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        asyncio.run(_worker_main(shard, updates, ready))
+    except KeyboardInterrupt:
+        pass
+
+def require_sharded_mode(mode: str, shard_count: int):
+    """Вне режима sharded планировщик обслуживает только шард 0: напоминания остальных шардов не отправлялись бы."""
+    if shard_count > 1 and mode != "sharded":
+        raise RuntimeError(f"SHARD_COUNT={shard_count} поддерживается только в режиме BOT_MODE=sharded, сейчас BOT_MODE={mode}")
+
+async def _heartbeat(shard: int, on_lost: Callable[[], Awaitable[None]]):
+    """Обновляет отметку владельца; если шард перехватил другой процесс, вызывает on_lost и завершается."""
+    pid = os.getpid()
+    while True:
+        await asyncio.sleep(SHARD_HEARTBEAT_SECONDS)
+        if not await touch_shard(shard, pid):
+            logger.warning(f"Шард {shard} перехвачен другим процессом, напоминания шарда этот процесс больше не отправляет")
+            await on_lost()
+            return
+
+async def _worker_main(shard: int, updates: multiprocessing.Queue, ready=None):
+    # Импорт здесь: bot.py сам импортирует этот модуль
+    from bot import create_dispatcher
+    from services.notifier import delivery
+    from services.scheduler import dispatcher, setup_scheduler, shutdown_scheduler
+    from utils.cleanup import schedule_smart_cleanup
+    from utils.metrics import start_metrics_server
+
+    bot = create_bot()
+    dp = create_dispatcher()
+
+    # Общий лимит Telegram делится между воркерами поровну
+    delivery.bucket.reset(DELIVERY_GLOBAL_RATE / SHARD_COUNT, 1)
+
+    await claim_shard(shard, os.getpid())
+    await setup_scheduler(bot, shard)
+    if shard == 0:
+        asyncio.create_task(schedule_smart_cleanup())
+    # Два процесса не должны отправлять напоминания одного шарда: потерявший владение останавливает диспетчер
+    heartbeat = asyncio.create_task(_heartbeat(shard, dispatcher.stop))
+    if METRICS_PORT:
+        await start_metrics_server(METRICS_HOST, METRICS_PORT + shard)
+    if ready is not None:
+        ready.set()
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(WEBHOOK_MAX_CONCURRENCY)
+    tasks = set()
+
+    async def feed(raw: str, slot: AdmissionSlot):
+        try:
+            await dp.feed_raw_update(bot, json.loads(raw), admission_slot=slot)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке апдейта: {e}")
+        finally:
+            slot.release()
+
+    try:
+        while True:
+            try:
+                raw = await loop.run_in_executor(None, updates.get, True, 1.0)
+            except queue.Empty:
+                continue
+            if raw is None:
+                break
+
+            await semaphore.acquire()
+            task = asyncio.create_task(feed(raw, AdmissionSlot(semaphore)))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        heartbeat.cancel()
+        await shutdown_scheduler()
+        await bot.session.close()
+        await dp.storage.close()
+        await flush_writes()
+        close_pool()
+
+class ShardRouter:
+    """Фронтовый процесс: принимает вебхук и передаёт апдейт воркеру, владеющему шардом пользователя."""
+
+    def __init__(self, shard_count: int):
+        self.shard_count = shard_count
+        self._context = multiprocessing.get_context("spawn")
+        self.queues: List[multiprocessing.Queue] = [
+            self._context.Queue(maxsize=SHARD_QUEUE_SIZE) for _ in range(shard_count)
+        ]
+        self.processes: List[multiprocessing.Process] = [None] * shard_count
+        # Воркер отмечает готовность, когда диспетчер и планировщик его шарда запущены
+        self.ready = [self._context.Event() for _ in range(shard_count)]
+
+    def start_worker(self, shard: int):
+        process = self._context.Process(
+            target=run_worker,
+            args=(shard, self.queues[shard], self.ready[shard]),
+            name=f"shard-{shard}",
+            daemon=True
+        )
+        process.start()
+        self.processes[shard] = process
+        logger.info(f"Запущен воркер шарда {shard} (pid {process.pid})")
+
+    async def supervise(self):
+        """Перезапускает упавших воркеров; новый процесс подхватит напоминания своего шарда из базы."""
+        while True:
+            await asyncio.sleep(1)
+            for shard, process in enumerate(self.processes):
+                if not process.is_alive():
+                    logger.error(f"Воркер шарда {shard} завершился с кодом {process.exitcode}, перезапуск")
+                    self.start_worker(shard)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if WEBHOOK_SECRET and not secrets.compare_digest(
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), WEBHOOK_SECRET
+        ):
+            return web.Response(body="Unauthorized", status=401)
+
+        raw = await request.text()
+        try:
+            user_id = extract_user_id(json.loads(raw))
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return web.Response(body="Bad Request", status=400)
+        shard = shard_for(user_id)
+
+        try:
+            self.queues[shard].put_nowait(raw)
+        except queue.Full:
+            # Telegram повторит доставку апдейта позже
+            logger.warning(f"Очередь шарда {shard} переполнена")
+            return web.Response(status=503)
+
+        return web.json_response({})
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Ждёт запуска всех воркеров; False, если кто-то не успел за timeout секунд."""
+        deadline = time.monotonic() + timeout
+        return all(event.wait(max(0.0, deadline - time.monotonic())) for event in self.ready)
+
+    def stop(self, timeout: float = 30):
+        for updates in self.queues:
+            updates.put(None)
+        for process in self.processes:
+            if process:
+                process.join(timeout)
+
+async def run_sharded(allowed_updates: Optional[List[str]] = None):
+    router = ShardRouter(SHARD_COUNT)
+    for shard in range(SHARD_COUNT):
+        router.start_worker(shard)
+    supervisor = asyncio.create_task(router.supervise())
+
+    # Вебхук регистрируется после запуска воркеров: иначе первые апдейты ждут импорта и настройки процессов
+    if not await asyncio.get_running_loop().run_in_executor(None, router.wait_ready, SHARD_STARTUP_TIMEOUT):
+        logger.warning(f"Не все воркеры запустились за {SHARD_STARTUP_TIMEOUT} с, вебхук регистрируется без них")
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, router.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+
+    bot = create_bot()
+    try:
+        await bot.set_webhook(
+            f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            max_connections=min(WEBHOOK_MAX_CONCURRENCY, 100),
+            allowed_updates=allowed_updates,
+            drop_pending_updates=DROP_PENDING_UPDATES
+        )
+        logger.info(f"Фронтовый процесс слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}, шардов: {SHARD_COUNT}")
+
+        await asyncio.Event().wait()
+    finally:
+        supervisor.cancel()
+        await runner.cleanup()
+        await bot.session.close()
+        await asyncio.get_running_loop().run_in_executor(None, router.stop)
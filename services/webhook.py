@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Any, Dict
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from config.settings import (
+    WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT,
+    WEBHOOK_MAX_CONCURRENCY, DROP_PENDING_UPDATES
+)
+from middlewares.lanes import AdmissionSlot
+
+logger = logging.getLogger(__name__)
+
+def require_webhook_secret():
+    """Без WEBHOOK_SECRET вебхук принял бы поддельные апдейты от любого, кто знает адрес."""
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("Режим вебхука требует WEBHOOK_SECRET: задайте случайную строку из A-Z, a-z, 0-9, _ и -")
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """Обработчик вебхука: сразу отвечает 200, а апдейт обрабатывается в фоне.
+
+    Одновременно принимается не больше max_concurrency апдейтов; при заполнении
+    ответ задерживается, и Telegram сам притормаживает доставку. Место апдейта
+    (AdmissionSlot) освобождается, когда он встаёт в очередь пользователя
+    (UserLanesMiddleware), и в любом случае - после обработки.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_concurrency: int, **kwargs: Any):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        # Ответ 500 заставил бы Telegram повторять тот же испорченный апдейт
+        try:
+            update = await request.json(loads=bot.session.json_loads)
+        except ValueError:
+            update = None
+        if not isinstance(update, dict):
+            return web.Response(body="Bad Request", status=400)
+
+        await self._semaphore.acquire()
+        slot = AdmissionSlot(self._semaphore)
+        task = asyncio.create_task(self._feed_update(bot, update, slot))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(partial(self._on_update_done, slot))
+
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _feed_update(self, bot: Bot, update: Dict[str, Any], slot: AdmissionSlot):
+        result = await self.dispatcher.feed_raw_update(bot=bot, update=update, admission_slot=slot, **self.data)
+        if isinstance(result, TelegramMethod):
+            await self.dispatcher.silent_call_request(bot=bot, result=result)
+
+    def _on_update_done(self, slot: AdmissionSlot, task: asyncio.Task):
+        self._background_feed_update_tasks.discard(task)
+        slot.release()
+
+        if not task.cancelled() and task.exception():
+            logger.error(f"Ошибка при обработке апдейта из вебхука: {task.exception()}")
+
+    async def close(self):
+        # Дожидаемся уже принятых апдейтов; сессию бота закрывает bot.main после очереди доставки
+        if self._background_feed_update_tasks:
+            await asyncio.gather(*self._background_feed_update_tasks, return_exceptions=True)
+
+async def run_webhook(dp: Dispatcher, bot: Bot, **workflow_data: Dict[str, Any]):
+    app = web.Application()
+
+    BoundedRequestHandler(
+        dp,
+        bot,
+        max_concurrency=WEBHOOK_MAX_CONCURRENCY,
+        secret_token=WEBHOOK_SECRET
+    ).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot, **workflow_data)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+
+    try:
+        await bot.set_webhook(
+            f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            max_connections=min(WEBHOOK_MAX_CONCURRENCY, 100),
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=DROP_PENDING_UPDATES
+        )
+        logger.info(f"Вебхук слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
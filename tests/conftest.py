@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Настройки читаются при импорте config.settings: временная база и токен задаются до импорта модулей бота
+_directory = tempfile.mkdtemp(prefix="reminder_bot_tests_")
+os.environ["DB_NAME"] = os.path.join(_directory, "test.db")
+os.environ.setdefault("BOT_TOKEN", "0:test")
@@ -0,0 +1,49 @@
+import asyncio
+import datetime
+import uuid
+
+from config.settings import DB_NAME
+from database.cache import ReminderCache
+from database.models import init_db
+from database.repository import cache, flush_writes, get_user_notifications, get_user_notifications_page, save_notification
+from utils.timezones import utc_now
+
+def test_add_after_load_does_not_duplicate_row():
+    """Загрузка из базы увидела уже зафиксированную запись раньше, чем запись дошла до кэша."""
+    reminders = ReminderCache()
+    row = (1, "текст", 1_000, "job", None)
+
+    reminders.begin_load(7)
+    reminders.finish_load(7, [row])
+    reminders.add(7, row)
+    reminders.add_many(7, [row, (2, "другой", 2_000, "job2", None)])
+
+    assert [cached[0] for cached in reminders.get(7)] == [1, 2]
+    assert reminders.get_stats()['rows'] == 2
+
+def test_concurrent_saves_and_pages_keep_cache_consistent():
+    init_db(DB_NAME)
+    user_id = 424242
+
+    async def scenario():
+        cache.invalidate(user_id)
+        start = utc_now() + datetime.timedelta(hours=1)
+
+        async def save(index: int):
+            await save_notification(user_id, f"напоминание {index}", start + datetime.timedelta(minutes=index), uuid.uuid4().hex)
+
+        async def read():
+            cache.invalidate(user_id)
+            await get_user_notifications_page(user_id, None, 10)
+
+        # Чтения сбрасывают кэш и загружают его заново, пока записи фиксируются пачками
+        await asyncio.gather(*(save(index) if index % 2 else read() for index in range(200)))
+        await get_user_notifications_page(user_id, None, 10)
+
+        cached = [row[0] for row in cache.get(user_id)]
+        stored = [row[0] for row in await get_user_notifications(user_id)]
+        assert len(cached) == len(set(cached))
+        assert sorted(cached) == sorted(stored)
+        await flush_writes()
+
+    asyncio.run(scenario())
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramMigrateToChat, TelegramNotFound, TelegramUnauthorizedError
+from aiogram.methods import SendMessage
+
+from loadtest.fake_api import FakeBotAPI, FaultProfile
+from services.delivery import DeliveryQueue
+
+RATE = 20
+MESSAGES = 100
+CHATS = 10
+
+async def _burst():
+    # Тестовый API отвечает 429 на всё, что сверх RATE сообщений в секунду, как Telegram
+    api = FakeBotAPI(FaultProfile(global_rate=RATE, retry_after=1))
+    url = await api.start()
+    bot = Bot(token="0:test", session=AiohttpSession(api=TelegramAPIServer.from_base(url)))
+
+    delivered = []
+
+    async def on_delivered(item):
+        delivered.append(item.notification_id)
+
+    async def send(chat_id: int, text: str):
+        await bot.send_message(chat_id, text)
+
+    queue = DeliveryQueue(send, on_delivered=on_delivered, global_rate=RATE, per_chat_interval=0.1, backoff_base=0.1)
+    queue.start()
+    started = time.monotonic()
+    try:
+        # Всплеск: все напоминания наступили одновременно, как в 09:00
+        for index in range(MESSAGES):
+            await queue.put(index % CHATS + 1, f"Напоминание {index}", index)
+        await queue.stop(timeout=60)
+    finally:
+        await bot.session.close()
+        await api.stop()
+
+    return time.monotonic() - started, api, queue, delivered
+
+def test_burst_is_sent_at_the_configured_ceiling_without_losses():
+    elapsed, api, queue, delivered = asyncio.run(_burst())
+
+    sent = [call for call in api.calls if call.method == "sendMessage" and call.status == 200]
+    assert sorted(delivered) == list(range(MESSAGES))
+    assert sorted(call.text for call in sent) == sorted(f"Напоминание {index}" for index in range(MESSAGES))
+
+    # Ни одного 429: очередь не превышает потолок даже в первую секунду всплеска
+    assert queue.stats['rate_limited'] == 0
+    assert not [call for call in api.calls if call.status == 429]
+    # и держит скорость у потолка, а не ниже него
+    assert (MESSAGES - 1) / RATE * 0.95 <= elapsed <= MESSAGES / RATE + 2
+    assert queue.stats['dead_lettered'] == 0
+
+async def _failing():
+    errors = {
+        1: TelegramNotFound(SendMessage(chat_id=1, text=""), "chat not found"),
+        2: TelegramMigrateToChat(SendMessage(chat_id=2, text=""), "group upgraded", migrate_to_chat_id=-100),
+        3: TelegramUnauthorizedError(SendMessage(chat_id=3, text=""), "unauthorized"),
+        4: RuntimeError("unexpected"),
+    }
+    dead = []
+
+    async def send(chat_id: int, text: str):
+        raise errors[chat_id]
+
+    async def on_dead_letter(notification_id, user_id, error):
+        dead.append((notification_id, user_id))
+
+    queue = DeliveryQueue(
+        send, on_dead_letter=on_dead_letter, per_chat_interval=0, backoff_base=0.01, coalesce_window=1,
+        merge=lambda texts: [("\n".join(texts), len(texts))]
+    )
+    # Два напоминания каждого чата объединяются в одно сообщение
+    for index in range(8):
+        await queue.put(index // 2 + 1, f"Напоминание {index}", index)
+    queue.start()
+    await queue.stop(timeout=10)
+    return queue, dead
+
+def test_unexpected_errors_dead_letter_every_part():
+    queue, dead = asyncio.run(_failing())
+
+    assert sorted(dead) == [(index, index // 2 + 1) for index in range(8)]
+    assert queue.stats['dead_lettered'] == 8
+    assert queue.stats['coalesced'] == 4
+    assert queue.stats['retried'] == 0
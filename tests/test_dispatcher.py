@@ -0,0 +1,86 @@
+import asyncio
+import datetime
+import uuid
+
+from config.settings import DB_NAME
+from database.models import init_db
+from database.repository import flush_writes, save_notification
+from services.dispatcher import ReminderDispatcher
+from utils.timezones import to_epoch, utc_now
+
+async def _deliver(reminders):
+    pass
+
+def test_reminder_in_last_second_of_window_is_scheduled():
+    """Срок в той же секунде, что и граница окна, но после неё: раньше не попадал ни в окно, ни в подгрузку."""
+    init_db(DB_NAME)
+
+    async def scenario():
+        dispatcher = ReminderDispatcher(_deliver, lookahead=600, shard=0)
+        await dispatcher.start(utc_now())
+        await dispatcher.stop()
+
+        boundary = dispatcher._loaded_until
+        assert boundary.microsecond == 0
+
+        notification_time = boundary + datetime.timedelta(milliseconds=500)
+        job_id = uuid.uuid4().hex
+        notification_id = await save_notification(1, "граница окна", notification_time, job_id)
+        dispatcher.schedule(1, "граница окна", notification_time, notification_id, job_id)
+        assert job_id in dispatcher._entries
+
+        # Подгрузка следующего окна не теряет напоминание и не кладёт его в кучу второй раз
+        await dispatcher._refill(utc_now() + datetime.timedelta(seconds=600))
+        assert job_id in dispatcher._entries
+        assert sum(1 for _, _, heap_job in dispatcher._heap if heap_job == job_id) == 1
+
+        await flush_writes()
+
+    asyncio.run(scenario())
+
+def test_window_bound_is_whole_second():
+    init_db(DB_NAME)
+
+    async def scenario():
+        dispatcher = ReminderDispatcher(_deliver, lookahead=600.25, shard=0)
+        await dispatcher.start(utc_now())
+        await dispatcher.stop()
+        return dispatcher._loaded_until
+
+    boundary = asyncio.run(scenario())
+    assert boundary.microsecond == 0
+    assert to_epoch(boundary) <= to_epoch(utc_now() + datetime.timedelta(seconds=600.25))
+
+def test_reminder_saved_during_refill_is_not_lost(monkeypatch):
+    """Напоминание сохранено и передано в schedule() после снимка запроса подгрузки, но до её завершения."""
+    import services.dispatcher
+
+    init_db(DB_NAME)
+    original = services.dispatcher.iter_pending_notifications
+    saved = {}
+
+    async def scenario():
+        dispatcher = ReminderDispatcher(_deliver, lookahead=600, shard=0)
+        await dispatcher.start(utc_now())
+        await dispatcher.stop()
+
+        async def racing_query(*args):
+            async for batch in original(*args):
+                yield batch
+            # Запрос уже выполнен: запись, зафиксированная сейчас, в выборку не попадает
+            notification_time = utc_now() + datetime.timedelta(seconds=900)
+            job_id = saved['job_id'] = uuid.uuid4().hex
+            notification_id = await save_notification(2, "во время подгрузки", notification_time, job_id)
+            dispatcher.schedule(2, "во время подгрузки", notification_time, notification_id, job_id)
+
+        monkeypatch.setattr(services.dispatcher, "iter_pending_notifications", racing_query)
+        await dispatcher._refill(utc_now() + datetime.timedelta(seconds=600))
+        monkeypatch.setattr(services.dispatcher, "iter_pending_notifications", original)
+
+        # Следующая подгрузка начинается после границы и эту запись уже не выберет
+        await dispatcher._refill(utc_now() + datetime.timedelta(seconds=1200))
+        await flush_writes()
+        return dispatcher
+
+    dispatcher = asyncio.run(scenario())
+    assert saved['job_id'] in dispatcher._entries
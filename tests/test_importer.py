@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from nlp.importer import ReminderImporter
+
+NOW = datetime(2026, 10, 14, 12, 0)
+
+def _ics(rrule: str):
+    return [
+        "BEGIN:VCALENDAR",
+        "BEGIN:VEVENT",
+        "SUMMARY:Полить цветы",
+        "DTSTART:20261001T090000",
+        f"RRULE:{rrule}",
+        "END:VEVENT",
+        "BEGIN:VEVENT",
+        "SUMMARY:Созвон",
+        "DTSTART:20261020T100000",
+        "END:VEVENT",
+        "END:VCALENDAR",
+    ]
+
+def test_ics_zero_interval_is_skipped():
+    importer = ReminderImporter(now=lambda: NOW)
+
+    results = list(importer.iter_ics(_ics("FREQ=HOURLY;INTERVAL=0")))
+
+    # Событие с INTERVAL=0 не распознано, но не ломает импорт остальных
+    assert [(number, reminder) for number, _, reminder in results][0] == (1, None)
+    assert results[1][2].time == datetime(2026, 10, 20, 10, 0)
+
+def test_ics_negative_interval_is_skipped():
+    importer = ReminderImporter(now=lambda: NOW)
+
+    for rrule in ("FREQ=HOURLY;INTERVAL=-1", "FREQ=DAILY;INTERVAL=-1", "FREQ=WEEKLY;INTERVAL=0"):
+        assert list(importer.iter_ics(_ics(rrule)))[0][2] is None
+
+def test_ics_interval_rule():
+    importer = ReminderImporter(now=lambda: NOW)
+
+    reminder = list(importer.iter_ics(_ics("FREQ=HOURLY;INTERVAL=2")))[0][2]
+
+    assert reminder.time == datetime(2026, 10, 14, 13, 0)
+    assert reminder.rule.next_after(reminder.time, reminder.time) == datetime(2026, 10, 14, 15, 0)
@@ -0,0 +1,19 @@
+from nlp.intent_recognizer import IntentRecognizer
+
+def test_cache_key_keeps_hour_range():
+    recognizer = IntentRecognizer()
+
+    # Первый запрос кладёт в кэш запись с 23:00; 24:00 не должно её переиспользовать
+    assert recognizer.recognize_intent("встреча 23:00")['intent'] == 'create_reminder'
+    assert recognizer.recognize_intent("встреча 24:00") is None
+    assert recognizer.recognize_intent("встреча 99:00") is None
+    assert recognizer.recognize_intent("встреча 19:45")['intent'] == 'create_reminder'
+
+def test_cache_shared_by_different_amounts():
+    recognizer = IntentRecognizer()
+
+    recognizer.recognize_intent("через 5 минут позвонить")
+    result = recognizer.recognize_intent("через 7 минут позвонить")
+
+    assert result['intent'] == 'create_reminder'
+    assert recognizer.cache_stats()['hits'] == 1
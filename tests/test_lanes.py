@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from middlewares.lanes import UserLanesMiddleware
+
+async def _cancel_while_previous_releases():
+    lanes = UserLanesMiddleware()
+    finish = asyncio.Event()
+    handled = []
+
+    async def handler(event, data):
+        if event == "first":
+            await finish.wait()
+        handled.append(event)
+
+    def feed(event):
+        return asyncio.create_task(lanes(handler, event, {'event_from_user': SimpleNamespace(id=1)}))
+
+    first, second = feed("first"), feed("second")
+    await asyncio.sleep(0)
+    assert lanes.get_stats() == {'lanes': 1, 'queued': 1, 'running': 1, 'dropped': 0}
+
+    # Первый апдейт освобождает очередь раньше, чем отменённый второй доходит до своего except
+    finish.set()
+    second.cancel()
+    await first
+    with pytest.raises(asyncio.CancelledError):
+        await second
+
+    stats = lanes.get_stats()
+    # Следующий апдейт пользователя проходит, очередь не сломана
+    await feed("third")
+    return stats, handled, lanes.get_stats()
+
+def test_cancelled_waiting_update_while_previous_releases():
+    stats, handled, after = asyncio.run(_cancel_while_previous_releases())
+
+    assert stats == {'lanes': 0, 'queued': 0, 'running': 0, 'dropped': 0}
+    assert handled == ["first", "third"]
+    assert after == stats
@@ -0,0 +1,56 @@
+import datetime
+import sqlite3
+
+from database import migrations
+
+def test_notifications_fired_before_delivery_tracking_are_marked_delivered(monkeypatch, tmp_path):
+    """Сработавшие до версии 5 напоминания не должны попасть в очередь повторно."""
+    conn = sqlite3.connect(tmp_path / "old.db")
+    with monkeypatch.context() as patch:
+        patch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS[:4])
+        assert migrations.apply_migrations(conn) == 4
+
+    # Версии до 5 сохраняли наивное время сервера адаптером sqlite3 по умолчанию
+    now = datetime.datetime.now()
+    for job_id, notification_time in (("fired", now - datetime.timedelta(days=1)), ("pending", now + datetime.timedelta(days=1))):
+        conn.execute(
+            "INSERT INTO notifications (user_id, text, notification_time, job_id) VALUES (?, ?, ?, ?)",
+            (1, job_id, str(notification_time), job_id)
+        )
+
+    migrations.apply_migrations(conn)
+    rows = dict(conn.execute("SELECT job_id, delivered_at FROM notifications").fetchall())
+    conn.close()
+
+    assert isinstance(rows["fired"], int)
+    assert rows["pending"] is None
+
+def test_existing_database_is_rebuilt_only_by_maintenance_command(tmp_path):
+    """Полный VACUUM существующей базы - отдельная команда, а не шаг запуска."""
+    from database.maintenance import main as maintenance
+    from database.models import init_db
+
+    path = str(tmp_path / "existing.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    migrations.apply_migrations(conn)
+    conn.close()
+
+    init_db(path)
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    conn.close()
+
+    assert maintenance(["vacuum", "--db", path]) == 0
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
+
+def test_new_database_starts_with_incremental_vacuum(tmp_path):
+    from database.models import init_db
+
+    path = str(tmp_path / "new.db")
+    init_db(path)
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
@@ -0,0 +1,26 @@
+import json
+import os
+
+import pytest
+
+from nlp import benchmark
+
+@pytest.fixture(scope="module")
+def report():
+    return benchmark.run()
+
+@pytest.fixture(scope="module")
+def baseline():
+    return json.loads(benchmark.BASELINE_PATH.read_text(encoding="utf-8"))
+
+def test_accuracy_on_corpus(report, baseline):
+    regressions = [
+        regression for regression in benchmark.find_regressions(report, baseline)
+        if regression.split(":")[0].endswith("accuracy")
+    ]
+    assert not regressions
+
+# Пропускная способность зависит от машины: проверяется только там, где снята базовая линия
+@pytest.mark.skipif(os.getenv("NLP_CHECK_THROUGHPUT") != "1", reason="NLP_CHECK_THROUGHPUT=1 включает проверку скорости")
+def test_throughput_against_baseline(report, baseline):
+    assert not benchmark.find_regressions(report, baseline)
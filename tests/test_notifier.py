@@ -0,0 +1,26 @@
+from config.settings import MESSAGE_MAX_LENGTH
+from services.notifier import _length, format_notification, merge_notifications, split_message
+
+def test_split_message_astral_only_text():
+    text = format_notification("😀" * 5000)
+
+    pieces = split_message(text)
+
+    assert len(pieces) > 1
+    assert all(0 < _length(piece) <= MESSAGE_MAX_LENGTH for piece in pieces)
+    assert "".join(pieces) == text
+
+def test_merge_notifications_astral_only_text():
+    messages = merge_notifications([format_notification("😀" * 5000)])
+
+    assert all(_length(text) <= MESSAGE_MAX_LENGTH for text, _ in messages)
+    assert [count for _, count in messages][-1] == 1
+    assert sum(text.count("😀") for text, _ in messages) == 5000
+
+def test_split_message_keeps_words_and_entities():
+    text = format_notification("слово & " * 2000)
+
+    pieces = split_message(text, 500)
+
+    assert all(_length(piece) <= 500 for piece in pieces)
+    assert all(not piece.rstrip().endswith("&amp") for piece in pieces)
@@ -0,0 +1,20 @@
+import sqlite3
+
+import pytest
+
+from database.migrations import apply_migrations
+from database.repository import HOT_QUERIES
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    conn = sqlite3.connect(tmp_path_factory.mktemp("plans") / "plans.db")
+    apply_migrations(conn)
+    yield conn
+    conn.close()
+
+@pytest.mark.parametrize("sql, params", HOT_QUERIES, ids=[sql.split()[0] + str(index) for index, (sql, _) in enumerate(HOT_QUERIES)])
+def test_hot_query_uses_index(conn, sql, params):
+    """Полный просмотр таблицы в плане (SCAN без USING) - пропущенный или неподходящий индекс."""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    scans = [row[-1] for row in plan if row[-1].startswith("SCAN") and "USING" not in row[-1]]
+    assert not scans, f"{sql}: {scans}"
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from config.settings import WEBHOOK_SECRET
+from services.delivery import TokenBucket
+from services import sharding
+from services.sharding import ShardRouter, require_sharded_mode
+
+def test_router_rejects_malformed_updates():
+    router = ShardRouter(2)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET} if WEBHOOK_SECRET else {}
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/webhook", router.handle)
+        async with TestClient(TestServer(app)) as client:
+            statuses = []
+            for body in ("{not json", "[1, 2]", '{"message": {"from": 5}}'):
+                response = await client.post("/webhook", data=body, headers=headers)
+                statuses.append(response.status)
+
+            response = await client.post("/webhook", json={"update_id": 1, "message": {"from": {"id": 3}}}, headers=headers)
+            statuses.append(response.status)
+        return statuses
+
+    assert asyncio.run(scenario()) == [400, 400, 400, 200]
+    assert router.queues[0].get(timeout=1)
+
+def test_bucket_reset_caps_burst_at_new_capacity():
+    bucket = TokenBucket(30, 30)
+    bucket.reset(7.5, 7.5)
+
+    assert bucket.tokens == 7.5
+    assert (bucket.rate, bucket.capacity) == (7.5, 7.5)
+
+def test_several_shards_require_sharded_mode():
+    require_sharded_mode("sharded", 4)
+    require_sharded_mode("polling", 1)
+    # Вне режима sharded напоминания шардов 1..3 никто бы не отправлял
+    with pytest.raises(RuntimeError):
+        require_sharded_mode("polling", 4)
+    with pytest.raises(RuntimeError):
+        require_sharded_mode("webhook", 2)
+
+def test_worker_stops_dispatching_after_losing_shard(monkeypatch):
+    owners = [True, True, False]
+    stopped = []
+
+    async def touch_shard(shard, pid):
+        return owners.pop(0)
+
+    async def on_lost():
+        stopped.append(len(owners))
+
+    monkeypatch.setattr(sharding, "touch_shard", touch_shard)
+    monkeypatch.setattr(sharding, "SHARD_HEARTBEAT_SECONDS", 0)
+
+    asyncio.run(asyncio.wait_for(sharding._heartbeat(1, on_lost), 5))
+
+    # Диспетчер остановлен один раз, сразу после того как шард перехватили
+    assert stopped == [0]
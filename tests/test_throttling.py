@@ -0,0 +1,34 @@
+import asyncio
+
+from aiogram.types import CallbackQuery, User
+
+from middlewares.throttling import ThrottlingMiddleware
+
+class _Query(CallbackQuery):
+    async def answer(self, text=None, **kwargs):
+        self.answers.append(text)
+
+async def _press(middleware, times):
+    handled = []
+    query = _Query(id="1", from_user=User(id=7, is_bot=False, first_name="u"), chat_instance="c")
+    object.__setattr__(query, 'answers', [])
+
+    async def handler(event, data):
+        handled.append(event)
+
+    for _ in range(times):
+        await middleware(handler, query, {})
+    return len(handled), query.answers
+
+def test_throttled_callbacks_are_always_answered():
+    handled, answers = asyncio.run(_press(ThrottlingMiddleware(rate=0.001, burst=1, warning="подождите"), 4))
+
+    # Первое нажатие обработано, предупреждение один раз, остальные нажатия закрыты пустым ответом
+    assert handled == 1
+    assert answers == ["подождите", None, None]
+
+def test_throttled_callbacks_are_answered_without_warning():
+    handled, answers = asyncio.run(_press(ThrottlingMiddleware(rate=0.001, burst=1), 3))
+
+    assert handled == 1
+    assert answers == [None, None]
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from nlp.recurrence import RecurrenceParser
+from nlp.time_parser import TimeParser
+
+NOW = datetime(2026, 10, 14, 12, 0)
+
+def test_fractional_amount_is_relative_time_not_date():
+    parser = TimeParser(now=lambda: NOW)
+
+    assert parser.parse_time("через 1.5 часа позвонить маме") == (datetime(2026, 10, 14, 13, 30), "позвонить маме")
+    assert parser.parse_time("через 2,5 дня") == (datetime(2026, 10, 17, 0, 0), "Напоминание")
+    # Без "через" число с единицей тоже не дата 1 мая
+    assert parser.parse_time("1.5 часа на созвон") is None
+    assert parser.parse_time("встреча 25.12 в 10:00") == (datetime(2026, 12, 25, 10, 0), "встреча")
+
+def test_out_of_range_amounts_are_ignored():
+    parser = TimeParser(now=lambda: NOW)
+
+    assert parser.parse_time("через 99999999999 недель") is None
+    assert parser.parse_time("через 999999999999999999999 минут") is None
+    # Некорректное выражение не мешает корректному рядом
+    assert parser.parse_time("через 3 часа 99999999999999 дней") == (datetime(2026, 10, 14, 15, 0), "99999999999999 дней")
+
+def test_out_of_range_recurrence_interval_is_ignored():
+    parser = RecurrenceParser(now=lambda: NOW)
+
+    assert parser.parse("каждые 99999999999999999999 недель пить воду") is None
+    assert parser.parse("каждые 9999999 недель") is None
+    assert parser.parse("каждые 2 часа")[1] == datetime(2026, 10, 14, 14, 0)
@@ -0,0 +1,41 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from services.webhook import BoundedRequestHandler
+
+def test_webhook_rejects_malformed_updates():
+    dp = Dispatcher()
+    handled = []
+
+    @dp.message()
+    async def on_message(message):
+        handled.append(message.text)
+
+    async def scenario():
+        bot = Bot(token="0:test")
+        app = web.Application()
+        handler = BoundedRequestHandler(dp, bot, max_concurrency=2)
+        handler.register(app, path="/webhook")
+        async with TestClient(TestServer(app)) as client:
+            statuses = []
+            for body in ("{not json", "[1, 2]", '"update"'):
+                response = await client.post("/webhook", data=body)
+                statuses.append(response.status)
+
+            response = await client.post("/webhook", json={
+                "update_id": 1,
+                "message": {
+                    "message_id": 1, "date": 0, "text": "привет",
+                    "chat": {"id": 3, "type": "private"}, "from": {"id": 3, "is_bot": False, "first_name": "u"},
+                },
+            })
+            statuses.append(response.status)
+            await handler.close()
+        await bot.session.close()
+        return statuses
+
+    assert asyncio.run(scenario()) == [400, 400, 400, 200]
+    assert handled == ["привет"]
@@ -3,22 +3,26 @@ import asyncio
 from datetime import datetime, timedelta
 from typing import Optional
 
-from database.repository import clean_old_notifications
-from config.settings import OLD_NOTIFICATION_DAYS
+from database.repository import archive_notifications, vacuum_free_pages
+from config.settings import (
+    CLEANUP_INTERVAL_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_BATCH_PAUSE, VACUUM_PAGES_PER_STEP
+)
 
 logger = logging.getLogger(__name__)
 
 async def run_cleanup():
     """
-    Удаляет уведомления, срок которых истек более OLD_NOTIFICATION_DAYS дней назад.
+    Переносит в архив доставленные уведомления и уведомления, срок которых истек
+    более OLD_NOTIFICATION_DAYS дней назад, затем возвращает освободившееся место.
     """
     try:
-        deleted_count = clean_old_notifications()
-        logger.info(f"Очистка завершена. Удалено {deleted_count} старых уведомлений.")
+        archived_count = await archive_notifications(ARCHIVE_BATCH_SIZE, ARCHIVE_BATCH_PAUSE)
+        await vacuum_free_pages(VACUUM_PAGES_PER_STEP, ARCHIVE_BATCH_PAUSE)
+        logger.info(f"Очистка завершена. В архив перенесено {archived_count} уведомлений.")
     except Exception as e:
         logger.error(f"Ошибка при очистке старых данных: {e}")
 
-async def schedule_periodic_cleanup(interval_hours: int = 24):
+async def schedule_periodic_cleanup(interval_hours: int = CLEANUP_INTERVAL_DAYS * 24):
     while True:
         await run_cleanup()
         await asyncio.sleep(interval_hours * 3600)
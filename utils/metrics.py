@@ -0,0 +1,134 @@
+import bisect
+import logging
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин (секунды): обработчики отвечают за миллисекунды, запросы к SQLite - за десятки микросекунд
+HANDLER_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+Reading = Union[float, Dict[str, float]]
+
+def _format(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами: наблюдение - один bisect и два сложения."""
+
+    __slots__ = ('name', 'help', 'label', 'buckets', '_series')
+
+    def __init__(self, name: str, help: str, label: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        # значение метки -> [счётчики по корзинам (последняя - +Inf), сумма]
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, label_value: str, seconds: float):
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = ([0] * (len(self.buckets) + 1), [0.0])
+
+        series[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        series[1][0] += seconds
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+
+        for label_value, (counts, total) in sorted(self._series.items()):
+            label = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label}}} {total[0]}')
+            lines.append(f'{self.name}_count{{{label}}} {cumulative}')
+
+        return lines
+
+class CollectedMetric:
+    """Gauge или counter, значение которого читается из объекта приложения в момент выгрузки."""
+
+    __slots__ = ('name', 'help', 'kind', 'label', 'read')
+
+    def __init__(self, name: str, help: str, read: Callable[[], Reading], label: Optional[str] = None, kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label = label
+        self.read = read
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        value = self.read()
+
+        if self.label is None:
+            lines.append(f"{self.name} {_format(value)}")
+        else:
+            for label_value, item in sorted(value.items()):
+                lines.append(f'{self.name}{{{self.label}="{label_value}"}} {_format(item)}')
+
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Union[Histogram, CollectedMetric]] = {}
+
+    def histogram(self, name: str, help: str, label: str, buckets: Tuple[float, ...]) -> Histogram:
+        return self._register(Histogram(name, help, label, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], Reading], label: Optional[str] = None) -> CollectedMetric:
+        return self._register(CollectedMetric(name, help, read, label))
+
+    def counter(self, name: str, help: str, read: Callable[[], Reading], label: Optional[str] = None) -> CollectedMetric:
+        return self._register(CollectedMetric(name, help, read, label, kind="counter"))
+
+    def _register(self, metric):
+        # Повторная регистрация (перезапуск компонента в том же процессе) заменяет метрику
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logger.error(f"Ошибка при сборе метрики {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+handler_seconds = registry.histogram(
+    "bot_handler_seconds", "Время выполнения обработчиков апдейтов", "handler", HANDLER_BUCKETS
+)
+db_query_seconds = registry.histogram(
+    "bot_db_query_seconds", "Время выполнения запросов к базе в потоке пула", "query", QUERY_BUCKETS
+)
+db_wait_seconds = registry.histogram(
+    "bot_db_pool_wait_seconds", "Ожидание свободного потока пула соединений", "query", QUERY_BUCKETS
+)
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        body=registry.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+    )
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Поднимает HTTP-эндпоинт /metrics в формате Prometheus."""
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
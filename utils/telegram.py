@@ -0,0 +1,40 @@
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+
+from config.settings import (
+    BOT_TOKEN, TELEGRAM_API_URL, TELEGRAM_POOL_SIZE, TELEGRAM_KEEPALIVE_SECONDS, TELEGRAM_DNS_CACHE_SECONDS,
+    TELEGRAM_TIMEOUT_SECONDS
+)
+
+class TelegramSession(AiohttpSession):
+    """Сессия Bot API с настраиваемым пулом соединений.
+
+    Все запросы идут на один хост, поэтому limit ограничивает и число соединений с ним;
+    keep-alive дольше стандартных 15 секунд aiohttp избавляет рассылку после пауз
+    от новых TLS-рукопожатий.
+    """
+
+    def __init__(self, limit: int = 100, keepalive_timeout: float = 60, dns_cache: int = 3600, **kwargs: Any):
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update(
+            limit_per_host=limit,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_cache,
+        )
+
+def create_bot() -> Bot:
+    """Бот процесса: одна сессия для апдейтов, ответов и рассылки.
+
+    Сессию закрывает владелец (bot.main, воркер шарда) после остановки очереди доставки.
+    """
+    session = TelegramSession(
+        limit=TELEGRAM_POOL_SIZE,
+        keepalive_timeout=TELEGRAM_KEEPALIVE_SECONDS,
+        dns_cache=TELEGRAM_DNS_CACHE_SECONDS,
+        timeout=TELEGRAM_TIMEOUT_SECONDS,
+        api=TelegramAPIServer.from_base(TELEGRAM_API_URL) if TELEGRAM_API_URL else PRODUCTION,
+    )
+    return Bot(token=BOT_TOKEN, session=session)
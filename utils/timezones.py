@@ -0,0 +1,96 @@
+import datetime
+import re
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+from tzlocal import get_localzone_name
+
+from config.settings import DEFAULT_TIMEZONE
+
+UTC = datetime.timezone.utc
+
+# "+3", "-05:30", "UTC+3", "GMT-4"
+_OFFSET_RE = re.compile(r'^(?:utc|gmt)?\s*([+-])\s*(\d{1,2})(?:[:.]?(\d{2}))?$', re.IGNORECASE)
+
+# Смещения поясов лежат в пределах от UTC-12 до UTC+14
+MIN_OFFSET = datetime.timedelta(hours=-12)
+MAX_OFFSET = datetime.timedelta(hours=14)
+
+def utc_now() -> datetime.datetime:
+    return datetime.datetime.now(UTC)
+
+def to_epoch(moment: datetime.datetime) -> int:
+    """Секунды UTC; наивное время считается локальным временем сервера."""
+    return int(moment.timestamp())
+
+def from_epoch(seconds: int) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(seconds, UTC)
+
+@lru_cache(maxsize=1)
+def default_zone_name() -> str:
+    return DEFAULT_TIMEZONE or get_localzone_name()
+
+@lru_cache(maxsize=1024)
+def get_zone(name: Optional[str] = None) -> datetime.tzinfo:
+    """Пояс по имени IANA или смещению "+05:30"; None - пояс по умолчанию."""
+    name = name or default_zone_name()
+    if name[0] in "+-":
+        hours, minutes = name[1:].split(":")
+        offset = datetime.timedelta(hours=int(hours), minutes=int(minutes))
+        return datetime.timezone(-offset if name[0] == "-" else offset, name)
+    return ZoneInfo(name)
+
+def _format_offset(offset: datetime.timedelta) -> str:
+    sign = "-" if offset < datetime.timedelta(0) else "+"
+    minutes = abs(int(offset.total_seconds())) // 60
+    return f"{sign}{minutes // 60:02d}:{minutes % 60:02d}"
+
+@lru_cache(maxsize=1)
+def _zone_names() -> dict:
+    return {name.lower(): name for name in available_timezones()}
+
+def normalize_zone(value: str) -> Optional[str]:
+    """Имя пояса для хранения: каноническое имя IANA или смещение "+HH:MM"; None, если не распознано."""
+    value = value.strip()
+    match = _OFFSET_RE.match(value)
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = datetime.timedelta(hours=int(hours), minutes=int(minutes or 0))
+        if sign == "-":
+            offset = -offset
+        if not MIN_OFFSET <= offset <= MAX_OFFSET or offset.total_seconds() % 900:
+            return None
+        return _format_offset(offset)
+
+    name = _zone_names().get(value.lower().replace(" ", "_"))
+    if name is None:
+        return None
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+    return name
+
+def zone_from_local_time(hour: int, minute: int, now: Optional[datetime.datetime] = None) -> Optional[str]:
+    """Смещение пояса по названному пользователем текущему времени, с точностью до 15 минут."""
+    now = now or utc_now()
+    stated = hour * 60 + minute
+    actual = now.hour * 60 + now.minute
+
+    difference = (stated - actual) % (24 * 60)
+    if difference > MAX_OFFSET.total_seconds() // 60:
+        difference -= 24 * 60
+
+    offset = datetime.timedelta(minutes=round(difference / 15) * 15)
+    if not MIN_OFFSET <= offset <= MAX_OFFSET:
+        return None
+    return _format_offset(offset)
+
+def describe_zone(name: Optional[str] = None) -> str:
+    """"Europe/Moscow (UTC+03:00)" для ответа пользователю."""
+    name = name or default_zone_name()
+    offset = utc_now().astimezone(get_zone(name)).utcoffset()
+    if name[0] in "+-":
+        return f"UTC{name}"
+    return f"{name} (UTC{_format_offset(offset)})"